@@ -1,7 +1,20 @@
-from typing import List
-import json
-from next_watch_ai.llm import GroqLLM, extract_first_json
+import time
+from itertools import zip_longest
+from typing import Any, Dict, List, Optional
+from next_watch_ai.catalog import TitleCatalog, title_key
+from next_watch_ai.features import encode_many, feature_weights, taste_stats
+from next_watch_ai.titles import normalize_title
+from next_watch_ai.vector_index import FingerprintIndex
+from next_watch_ai.llm import GroqLLM
+from next_watch_ai.schemas import CandidateTitles, chat_json
 from next_watch_ai.logging_utils import truncate
+from next_watch_ai.prompt_budget import Section, fit_sections
+from agents.taste_agent import compact_taste
+
+TASTE_TOKENS = 1200
+
+# with fewer neighbours than this, the index alone is not a usable pool
+MIN_INDEX_CANDIDATES = 15
 
 DIRECT_CANDIDATES_SCHEMA = """
 Return ONLY JSON with:
@@ -9,8 +22,12 @@ titles: [strings]  // 30 titles
 """
 
 def propose_candidates(logger, llm: GroqLLM, taste_profile: dict, seed_titles: List[str],
-                       content_type: str, extra_specs: str, n: int = 30) -> List[str]:
+                       content_type: str, extra_specs: str, n: int = 30,
+                       catalog: Optional[TitleCatalog] = None) -> List[str]:
     logger.info("[CandidateAgent] proposing candidate pool via Groq (no web scraping)")
+    ctx = fit_sections([
+        Section("taste", taste_profile, max_tokens=TASTE_TOKENS, compactor=compact_taste),
+    ], logger=logger, label="CandidateAgent")
     prompt = f"""
 You are a film/TV recommender with film-student taste.
 
@@ -18,7 +35,7 @@ Target type: {content_type} (movie/tv/both)
 User extra specs (must respect): {extra_specs}
 
 Taste profile:
-{json.dumps(taste_profile, ensure_ascii=False)}
+{ctx["taste"]}
 
 Seed titles (do NOT include ANY of these):
 {seed_titles}
@@ -32,21 +49,82 @@ Return ONLY JSON.
 
 {DIRECT_CANDIDATES_SCHEMA}
 """
-    out = llm.chat(prompt, temperature=0.4)
-    data = extract_first_json(out)
-    titles = data.get("titles", [])
-    if not isinstance(titles, list):
-        titles = []
-
-    # Deduplicate preserving order
-    seen = set()
+    data = chat_json(logger, llm, prompt, CandidateTitles, "candidates", DIRECT_CANDIDATES_SCHEMA, temperature=0.4)
+    return dedupe_candidates(logger, data["titles"], seed_titles, content_type, catalog)
+
+def dedupe_candidates(logger, titles: List[str], seed_titles: List[str], content_type: str,
+                      catalog: Optional[TitleCatalog] = None) -> List[str]:
+    """
+    Deduplicate preserving order and drop seeds. With a catalog, titles resolve to
+    catalog IDs ("Parasite (2019)" == "Gisaengchung"), come back under their
+    canonical name and year ("Parasite (2019)"), and ones of the wrong
+    content_type are dropped; titles the catalog doesn't know (or can't tell
+    apart) are kept and deduped by normalized title.
+    """
+    def key(t: str):
+        entry = catalog.resolve(t, content_type) if catalog else None
+        return (entry.id if entry else title_key(t)), entry
+
+    seen = {key(s)[0] for s in seed_titles}
     deduped = []
+    wrong_type = dupes = 0
     for t in titles:
-        if isinstance(t, str):
-            k = t.strip().lower()
-            if k and k not in seen and k not in {s.lower() for s in seed_titles}:
-                seen.add(k)
-                deduped.append(t.strip())
+        if not isinstance(t, str) or not t.strip():
+            continue
+        k, entry = key(t.strip())
+        if k in seen:
+            dupes += 1
+            continue
+        seen.add(k)
+        if entry and content_type in ("movie", "tv") and entry.content_type != content_type:
+            wrong_type += 1
+            continue
+        deduped.append(entry.display_title if entry else t.strip())
 
-    logger.info(f"[CandidateAgent] candidates={len(deduped)} sample={deduped[:12]}")
+    logger.info(f"[CandidateAgent] candidates={len(deduped)} dropped dupes/seeds={dupes} "
+                f"wrong_type={wrong_type} sample={deduped[:12]}")
     return deduped
+
+
+def retrieve_candidates(logger, index: Optional[FingerprintIndex], seed_fingerprints: Dict[str, Dict[str, Any]],
+                        seed_titles: List[str], content_type: str, k: int = 30,
+                        exclude: Optional[List[str]] = None, model: Optional[str] = None) -> List[str]:
+    """
+    Nearest neighbours of the seeds' taste centroid in the fingerprint index,
+    among fingerprints made by `model` (the seeds' fingerprint model).
+    """
+    if index is None or not len(index) or not seed_fingerprints:
+        return []
+    t0 = time.monotonic()
+    centroid, variance, count = taste_stats(encode_many(list(seed_fingerprints.values())))
+    skip = {normalize_title(t) for t in list(seed_titles) + list(exclude or [])}
+    hits = index.search(centroid, feature_weights(variance, count), k, content_type, exclude=skip, model=model)
+    logger.info(f"[CandidateAgent] index retrieval: {len(hits)} of {len(index)} indexed "
+                f"in {(time.monotonic() - t0) * 1000:.1f}ms sample={[t for t, _ in hits[:8]]}")
+    return [t for t, _ in hits]
+
+def gather_candidates(logger, llm: GroqLLM, taste_profile: dict, seed_titles: List[str],
+                      content_type: str, extra_specs: str, seed_fingerprints: Dict[str, Dict[str, Any]],
+                      index: Optional[FingerprintIndex] = None, catalog: Optional[TitleCatalog] = None,
+                      source: str = "hybrid", n: int = 30, previous: Optional[List[str]] = None,
+                      fingerprint_model: Optional[str] = None) -> List[str]:
+    """
+    Candidate pool from the LLM, the fingerprint index, or both (interleaved).
+    Index neighbours are limited to fingerprints from `fingerprint_model`.
+    With source="index", or on a revision (`previous` pool given) in hybrid mode,
+    the LLM call is skipped whenever the index returns enough fresh neighbours.
+    """
+    retrieved = []
+    if source != "llm":
+        retrieved = retrieve_candidates(logger, index, seed_fingerprints, seed_titles, content_type,
+                                        k=n, exclude=previous, model=fingerprint_model)
+    if len(retrieved) >= MIN_INDEX_CANDIDATES and (source == "index" or previous):
+        logger.info(f"[CandidateAgent] {len(retrieved)} candidates from the index; LLM generation skipped")
+        return dedupe_candidates(logger, retrieved, seed_titles, content_type, catalog)
+
+    proposed = propose_candidates(logger, llm, taste_profile, seed_titles, content_type, extra_specs,
+                                  n=n, catalog=catalog)
+    if not retrieved:
+        return proposed
+    merged = [t for pair in zip_longest(proposed, retrieved) for t in pair if t]
+    return dedupe_candidates(logger, merged, seed_titles, content_type, catalog)
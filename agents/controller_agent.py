@@ -1,7 +1,11 @@
-import json
 from typing import Any, Dict
-from next_watch_ai.llm import GroqLLM, extract_first_json
+from next_watch_ai.llm import GroqLLM
+from next_watch_ai.schemas import ControllerDecision, chat_json
 from next_watch_ai.logging_utils import truncate
+from next_watch_ai.prompt_budget import Section, fit_sections
+
+# the current picks answer most questions, so critic feedback and taste are compacted first
+CONTEXT_TOKENS = 2200
 
 CONTROLLER_SCHEMA = """
 Return ONLY JSON:
@@ -40,6 +44,16 @@ def controller(logger, llm: GroqLLM, state: Dict[str, Any]) -> Dict[str, Any]:
     #  don't bias Q&A with critic failures
     critic_for_prompt = "" if forced_action == "answer_question" else critic
 
+    ctx = fit_sections([
+        Section("critic", critic_for_prompt or "", priority=1, max_tokens=400),
+        Section("taste", {
+            "taste_summary": taste.get("taste_summary"),
+            "core_signals": taste.get("core_signals", [])[:10],
+            "avoid_signals": taste.get("avoid_signals", [])[:10],
+        }, priority=2, max_tokens=500),
+        Section("cards", cards, priority=3),
+    ], budget=CONTEXT_TOKENS, logger=logger, label="ControllerAgent")
+
     prompt = f"""
 You are the controller of an agentic recommender workflow.
 
@@ -63,17 +77,13 @@ iterations={iters}/{max_iters}
 user_question={user_question}
 
 Critic feedback JSON (if any):
-{critic_for_prompt}
+{ctx["critic"]}
 
 Taste profile (summary fields):
-{json.dumps({
-  "taste_summary": taste.get("taste_summary"),
-  "core_signals": taste.get("core_signals", [])[:10],
-  "avoid_signals": taste.get("avoid_signals", [])[:10],
-}, ensure_ascii=False)}
+{ctx["taste"]}
 
 Current picks:
-{json.dumps(cards, ensure_ascii=False)}
+{ctx["cards"]}
 
 If answering a user_question:
 - directly answer using the "Current picks" and "Taste profile"
@@ -83,8 +93,7 @@ If answering a user_question:
 ONLY output JSON.
 """
 
-    out = llm.chat(prompt, temperature=0.2)
-    data = extract_first_json(out)
+    data = chat_json(logger, llm, prompt, ControllerDecision, "controller", CONTROLLER_SCHEMA)
 
     if forced_action:
         data["action"] = forced_action
@@ -1,7 +1,12 @@
-import json
 from typing import Any, Dict, List
-from next_watch_ai.llm import GroqLLM, extract_first_json
+from next_watch_ai.llm import GroqLLM
+from next_watch_ai.schemas import CriticReport, chat_json
 from next_watch_ai.logging_utils import truncate
+from next_watch_ai.prompt_budget import Section, fit_sections
+from agents.taste_agent import compact_taste
+
+# cards are what gets judged; taste and curator reasons are compacted first
+CONTEXT_TOKENS = 2500
 
 CRITIC_SCHEMA = """
 Return ONLY JSON:
@@ -17,6 +22,11 @@ def critique(logger, llm: GroqLLM, content_type: str, extra_specs: str,
              seed_titles: List[str], taste: Dict[str, Any],
              curated: Dict[str, Any], cards: Dict[str, Any]) -> Dict[str, Any]:
     logger.info("[CriticAgent] evaluating recommendations vs constraints")
+    ctx = fit_sections([
+        Section("taste", taste, priority=1, max_tokens=600, compactor=compact_taste),
+        Section("curated", curated, priority=2, max_tokens=800),
+        Section("cards", cards, priority=3),
+    ], budget=CONTEXT_TOKENS, logger=logger, label="CriticAgent")
 
     prompt = f"""
 You are a critic for a recommender system.
@@ -26,13 +36,13 @@ User extra specs (hard constraints): {extra_specs}
 Seed titles (do not recommend): {seed_titles}
 
 Taste profile:
-{json.dumps(taste, ensure_ascii=False)}
+{ctx["taste"]}
 
 Curated picks:
-{json.dumps(curated, ensure_ascii=False)}
+{ctx["curated"]}
 
 Explanation cards:
-{json.dumps(cards, ensure_ascii=False)}
+{ctx["cards"]}
 
 Evaluate:
 - Do picks match content_type? (movie/tv/both)
@@ -46,7 +56,6 @@ If failing, propose a short suggested_prompt_patch that we can feed to candidate
 
 ONLY output JSON.
 """
-    out = llm.chat(prompt, temperature=0.2)
-    data = extract_first_json(out)
+    data = chat_json(logger, llm, prompt, CriticReport, "critic", CRITIC_SCHEMA)
     logger.info(f"[CriticAgent] verdict={data.get('verdict')} issues={data.get('issues', [])[:4]}")
     return data
\ No newline at end of file
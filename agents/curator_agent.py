@@ -1,7 +1,15 @@
-import json
-from typing import Any, Dict, List
-from next_watch_ai.llm import GroqLLM, extract_first_json
+from typing import Any, Dict, List, Optional
+from next_watch_ai.titles import split_year
+from next_watch_ai.catalog import TitleCatalog
+from next_watch_ai.features import rank_candidates
+from next_watch_ai.fingerprint_store import FingerprintStore
+from next_watch_ai.llm import GroqLLM
+from next_watch_ai.schemas import Curation, chat_json
 from next_watch_ai.logging_utils import truncate
+from next_watch_ai.prompt_budget import Section, fit_sections
+from agents.taste_agent import compact_taste
+
+TASTE_TOKENS = 1000
 
 CURATOR_SCHEMA = """
 Return ONLY JSON:
@@ -16,9 +24,60 @@ Return ONLY JSON:
 }
 """
 
+def shortlist_candidates(logger, candidate_pool: List[str], seed_fingerprints: Dict[str, Dict[str, Any]],
+                         store: FingerprintStore = None, model: str = "", k: int = 15,
+                         catalog: Optional[TitleCatalog] = None, seed_titles: Optional[List[str]] = None,
+                         content_type: str = "both") -> List[str]:
+    """
+    Taste-ranked, diversity-aware (MMR) shortlist of the candidate pool, so the
+    curator reads k titles instead of the whole pool; k <= 0 disables it.
+    Candidates with a stored fingerprint are scored on it. With a catalog, the
+    rest are scored on their genres against the seeds' (seed_titles, default the
+    fingerprinted seeds), and votes add a popularity prior.
+    """
+    if k <= 0 or len(candidate_pool) <= k:
+        return candidate_pool
+    fps = {}
+    if store:
+        for t in candidate_pool:
+            fp = store.find(t, model)
+            if fp:
+                fps[t] = fp
+    genres: Dict[str, Any] = {}
+    votes: Dict[str, int] = {}
+    seed_genres = []
+    if catalog:
+        for t in candidate_pool:
+            entry = catalog.resolve(t, content_type)
+            if entry:
+                genres[t], votes[t] = entry.genres, entry.votes
+        for t in seed_titles or list(seed_fingerprints):
+            entry = catalog.resolve(t, content_type)
+            if entry:
+                seed_genres.append(entry.genres)
+    shortlist, by_fp, by_genre = rank_candidates(candidate_pool, fps, seed_fingerprints, k,
+                                                 candidate_genres=genres, seed_genres=seed_genres,
+                                                 popularity=votes)
+    logger.info(f"[CuratorAgent] shortlist {len(shortlist)} of {len(candidate_pool)} "
+                f"(scored by fingerprint={by_fp}, by genre={by_genre}) sample={shortlist[:8]}")
+    return shortlist
+
+def fallback_curation(logger, shortlist: List[str], n: int = 5) -> Dict[str, Any]:
+    """No-LLM curation for when the run deadline is near: the top of the taste-ranked shortlist."""
+    picks = []
+    for t in shortlist[:n]:
+        title, year = split_year(t)
+        picks.append({"title": title, "year": str(year) if year else None,
+                      "why_selected": ["close match to your taste profile"]})
+    logger.warning(f"[CuratorAgent] deadline fallback: top {len(picks)} of the shortlist")
+    return {"recommendations": picks, "partial": True}
+
 def curate(logger, llm: GroqLLM, taste_profile: Dict[str, Any], candidate_pool: List[str],
            seed_titles: List[str], content_type: str, extra_specs: str) -> Dict[str, Any]:
     logger.info("[CuratorAgent] selecting final 5 (no ranking)")
+    ctx = fit_sections([
+        Section("taste", taste_profile, max_tokens=TASTE_TOKENS, compactor=compact_taste),
+    ], logger=logger, label="CuratorAgent")
     prompt = f"""
 You are a film-student curator. Select 5 recommendations.
 
@@ -26,7 +85,7 @@ Target type: {content_type} (movie/tv/both)
 User extra specs (must respect): {extra_specs}
 
 Taste profile:
-{json.dumps(taste_profile, ensure_ascii=False)}
+{ctx["taste"]}
 
 Seed titles (do NOT recommend these):
 {seed_titles}
@@ -45,7 +104,6 @@ Rules:
 
 ONLY output JSON.
 """
-    out = llm.chat(prompt, temperature=0.2)
-    data = extract_first_json(out)
+    data = chat_json(logger, llm, prompt, Curation, "curator", CURATOR_SCHEMA)
     logger.info(f"[CuratorAgent] selected sample={truncate(str(data), 900)}")
     return data
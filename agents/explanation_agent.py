@@ -1,7 +1,13 @@
-import json
-from typing import Any, Dict
-from next_watch_ai.llm import GroqLLM, extract_first_json
+from typing import Any, Callable, Dict, Optional
+from next_watch_ai.json_stream import JSONStream, JSONStreamError
+from next_watch_ai.llm import GroqLLM
+from next_watch_ai.schemas import Card, Cards, chat_json
 from next_watch_ai.logging_utils import truncate
+from next_watch_ai.prompt_budget import Section, fit_sections
+from agents.taste_agent import compact_taste
+
+# the picks are what the cards are about, so taste is compacted first
+CONTEXT_TOKENS = 2000
 
 
 EXPLAIN_SCHEMA = """
@@ -18,9 +24,25 @@ Return ONLY JSON:
 }
 """
 
+def fallback_cards(logger, curated: Dict[str, Any]) -> Dict[str, Any]:
+    """Bare cards built from the curator's reasons, for when the run deadline leaves no time to write them."""
+    cards = []
+    for rec in (curated or {}).get("recommendations", []) or []:
+        why = [str(w) for w in (rec.get("why_selected") or [])][:3]
+        cards.append({"title": rec.get("title", ""), "year": rec.get("year"),
+                      "why_this_fits": why, "watch_for": ""})
+    logger.warning(f"[ExplanationAgent] deadline fallback: {len(cards)} cards from curator reasons")
+    return {"cards": cards, "partial": True}
+
 def explain(logger, llm: GroqLLM, taste_profile: Dict[str, Any], curated: Dict[str, Any],
-            content_type: str, extra_specs: str) -> Dict[str, Any]:
+            content_type: str, extra_specs: str,
+            on_card: Optional[Callable[[int, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """With on_card, the response is streamed and on_card(index, card) fires as each card completes."""
     logger.info("[ExplanationAgent] writing spoiler-free cards")
+    ctx = fit_sections([
+        Section("taste", taste_profile, priority=1, max_tokens=800, compactor=compact_taste),
+        Section("curated", curated, priority=2),
+    ], budget=CONTEXT_TOKENS, logger=logger, label="ExplanationAgent")
     prompt = f"""
 Write spoiler-free recommendation cards.
 
@@ -28,10 +50,10 @@ Target type: {content_type}
 User extra specs (must respect): {extra_specs}
 
 Taste profile:
-{json.dumps(taste_profile, ensure_ascii=False)}
+{ctx["taste"]}
 
 Selected titles:
-{json.dumps(curated, ensure_ascii=False)}
+{ctx["curated"]}
 
 Rules:
 - No plot spoilers, no twist mention, no ending description.
@@ -43,7 +65,34 @@ Rules:
 
 ONLY output JSON.
 """
-    out = llm.chat(prompt, temperature=0.2)
-    data = extract_first_json(out)
+    if on_card is None:
+        data = chat_json(logger, llm, prompt, Cards, "explanation", EXPLAIN_SCHEMA)
+    else:
+        data = _explain_streaming(logger, llm, prompt, on_card)
     logger.info(f"[ExplanationAgent] cards sample={truncate(str(data), 900)}")
     return data
+
+def _explain_streaming(logger, llm: GroqLLM, prompt: str,
+                       on_card: Callable[[int, Dict[str, Any]], None]) -> Dict[str, Any]:
+    """Stream the cards response, handing each card to on_card as soon as its object closes."""
+    def on_item(path, value):
+        if len(path) == 2 and path[0] == "cards" and isinstance(value, dict):
+            on_card(path[1], Card.model_validate(value).model_dump())
+
+    stream = JSONStream(on_item=on_item, opening="{", first_only=True)
+    failed = []
+
+    def feed(delta: str) -> None:
+        if failed:
+            return
+        try:
+            stream.feed(delta)
+        except JSONStreamError as e:
+            failed.append(e)  # keep the LLM stream going; the full text gets a second parse
+
+    out = llm.chat(prompt, temperature=0.2, on_delta=feed)
+    parsed = stream.values[0] if stream.values else None
+    if parsed is None:
+        logger.warning(f"[ExplanationAgent] streamed parse stopped ({failed[0] if failed else 'truncated'}); "
+                       f"reparsing the full response")
+    return chat_json(logger, llm, prompt, Cards, "explanation", EXPLAIN_SCHEMA, out=out, parsed=parsed)
@@ -1,6 +1,25 @@
-from typing import Any, Dict
-from next_watch_ai.llm import GroqLLM, extract_first_json
+import hashlib
+import json
+from typing import Any, Dict, Optional
+from next_watch_ai.llm import GroqLLM
+from next_watch_ai.evidence import EVIDENCE_QUERY
+from next_watch_ai.schemas import Fingerprint, chat_json
 from next_watch_ai.logging_utils import truncate
+from next_watch_ai.concurrency import BoundedLLM, map_ordered
+from next_watch_ai.titles import normalize_title
+from next_watch_ai.singleflight import SingleFlight
+from next_watch_ai.prompt_budget import JSON_LEVELS, Section, compact_json, fit_sections
+
+# Bump when fingerprints change in ways the prompt text doesn't show (evidence packing,
+# output coercion); prompt, schema hint and output schema changes are picked up by
+# FINGERPRINT_SCHEMA_VERSION on their own.
+FINGERPRINT_REVISION = 2
+
+# research bundles shorter than this are too thin to fingerprint
+MIN_EVIDENCE_CHARS = 400
+
+# token cap for the research evidence in the fingerprint prompt
+EVIDENCE_TOKENS = 2000
 
 FINGERPRINT_SCHEMA_HINT = """
 Return ONLY JSON with these keys:
@@ -47,30 +66,8 @@ confidence: {
 
 non_spoiler_notes: [strings]
 """
-'''
-def fingerprint_one(logger, llm, title, content_type, evidence):
-    prompt = f"""... your existing prompt ..."""
-    out = llm.chat(prompt, temperature=0.2)
-
-    try:
-        data = extract_first_json(out)
-    except ValueError:
-        logger.warning("[FingerprintAgent] Model didn't return JSON. Retrying with stricter reformat prompt...")
-        fix_prompt = f"""
-You MUST output ONLY valid JSON (no prose, no markdown).
-Reformat the following into the required JSON schema.
-
-TEXT:
-{out}
-"""
-        out2 = llm.chat(fix_prompt, temperature=0.0)
-        data = extract_first_json(out2)
 
-    logger.info(f"[FingerprintAgent] result sample={truncate(str(data), 700)}")
-    return data
-'''
-def fingerprint_one(logger, llm, title, content_type, evidence):
-    prompt = f"""
+FINGERPRINT_PROMPT = """
 You are a film student and critic analyzing craft and storytelling style.
 
 Analyze this {content_type}: "{title}"
@@ -80,9 +77,86 @@ Do NOT include spoilers.
 If uncertain, use null and lower confidence.
 
 EVIDENCE:
-{evidence[:9000]}
+{evidence}
 
-{FINGERPRINT_SCHEMA_HINT}
+{schema}
 
 ONLY output valid JSON.
 """
+
+def _schema_version() -> int:
+    """Hash of everything that shapes a fingerprint, so the store never serves one made differently."""
+    parts = [FINGERPRINT_PROMPT, FINGERPRINT_SCHEMA_HINT, EVIDENCE_QUERY, str(EVIDENCE_TOKENS),
+             json.dumps(Fingerprint.model_json_schema(), sort_keys=True), str(FINGERPRINT_REVISION)]
+    return int(hashlib.sha1("\0".join(parts).encode("utf-8")).hexdigest()[:7], 16)
+
+# part of every FingerprintStore key (and the vector index header)
+FINGERPRINT_SCHEMA_VERSION = _schema_version()
+
+# sessions fingerprinting the same (title, content_type) at the same time share one call
+_fingerprint_flight = SingleFlight("fingerprint")
+
+def fingerprint_one(logger, llm, title, content_type, evidence):
+    return _fingerprint_flight.do(
+        (normalize_title(title), content_type, llm.model),
+        lambda: _fingerprint_one(logger, llm, title, content_type, evidence),
+    )
+
+def _fingerprint_one(logger, llm, title, content_type, evidence):
+    prompt = FINGERPRINT_PROMPT.format(
+        content_type=content_type,
+        title=title,
+        evidence=fit_sections([Section("evidence", evidence, max_tokens=EVIDENCE_TOKENS)],
+                              logger=logger, label="FingerprintAgent")["evidence"],
+        schema=FINGERPRINT_SCHEMA_HINT,
+    )
+    data = chat_json(logger, llm, prompt, Fingerprint, "fingerprint", FINGERPRINT_SCHEMA_HINT)
+    logger.info(f"[FingerprintAgent] {title} result sample={truncate(str(data), 700)}")
+    return data
+
+def _drop_low_confidence(fp: Dict[str, Any]) -> Dict[str, Any]:
+    # low_confidence_fields may name a section, a leaf ("pacing") or a path ("narrative_architecture.pacing")
+    low = set((fp.get("confidence") or {}).get("low_confidence_fields") or [])
+    if not low:
+        return fp
+    out = {}
+    for section, fields in fp.items():
+        if section in low:
+            continue
+        if isinstance(fields, dict) and section != "confidence":
+            fields = {k: v for k, v in fields.items() if k not in low and f"{section}.{k}" not in low}
+        out[section] = fields
+    return out
+
+def compact_fingerprint(fp: Dict[str, Any], level: int) -> Optional[Dict[str, Any]]:
+    """Low-confidence fields go first, then confidence/notes/extras, then generic pruning."""
+    if level - 1 > len(JSON_LEVELS):
+        return None
+    fp = _drop_low_confidence(fp)
+    if level >= 2:
+        fp = {k: v for k, v in fp.items() if k not in ("confidence", "non_spoiler_notes", "extras")}
+    return compact_json(fp, max(1, level - 1))
+
+def compact_fingerprints(fps: Dict[str, Dict[str, Any]], level: int) -> Optional[Dict[str, Dict[str, Any]]]:
+    if level - 1 > len(JSON_LEVELS):
+        return None
+    return {t: compact_fingerprint(fp, level) for t, fp in fps.items()}
+
+def fingerprint_many(logger, llm: GroqLLM, evidence: Dict[str, str], content_type: str,
+                     max_workers: int = 5, llm_max_in_flight: int = 4) -> Dict[str, Dict[str, Any]]:
+    """
+    Fingerprint every title with enough evidence concurrently; failures are dropped.
+    Returns fingerprints in the order of `evidence`. An `llm` that is already a
+    BoundedLLM keeps its own (possibly shared) limit.
+    """
+    titles = [t for t, ev in evidence.items() if ev and len(ev) >= MIN_EVIDENCE_CHARS]
+    if max_workers > 1 and not isinstance(llm, BoundedLLM):
+        llm = BoundedLLM(llm, llm_max_in_flight)
+    fps = map_ordered(
+        lambda t: fingerprint_one(logger, llm, t, content_type, evidence[t]),
+        titles,
+        max_workers=max_workers,
+        logger=logger,
+        label="FingerprintAgent",
+    )
+    return {t: fp for t, fp in zip(titles, fps) if fp}
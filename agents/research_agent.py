@@ -1,7 +1,11 @@
-from typing import List
+from typing import Callable, Dict, List, Optional
 from next_watch_ai.llm import GroqLLM, parse_python_list
+from next_watch_ai.evidence import EVIDENCE_QUERY
 from next_watch_ai.firecrawl_utils import scrape_bundle
+from next_watch_ai.concurrency import BoundedLLM, BoundedFirecrawl, map_ordered
 from next_watch_ai.logging_utils import truncate
+from next_watch_ai.titles import normalize_title
+from next_watch_ai.singleflight import SingleFlight
 
 def generate_seed_urls(llm: GroqLLM, title: str, content_type: str, max_urls: int = 5) -> List[str]:
     prompt = f"""
@@ -31,13 +35,57 @@ Return ONLY a Python list of URLs.
     urls = [u.strip() for u in parse_python_list(out) if isinstance(u, str) and u.strip().startswith("http")]
     return urls
 
+# sessions researching the same (title, content_type) at the same time share one run
+_research_flight = SingleFlight("research")
+
 def research_one(logger, llm: GroqLLM, firecrawl, title: str, content_type: str,
-                 max_pages: int = 3) -> str:
+                 max_pages: int = 3, parallel: int = 0,
+                 url_timeout: Optional[float] = None, deadline: Optional[float] = None) -> str:
+    return _research_flight.do(
+        (normalize_title(title), content_type),
+        lambda: _research_one(logger, llm, firecrawl, title, content_type, max_pages, parallel, url_timeout, deadline),
+    )
+
+def _research_one(logger, llm: GroqLLM, firecrawl, title: str, content_type: str,
+                  max_pages: int, parallel: int, url_timeout: Optional[float], deadline: Optional[float]) -> str:
     logger.info(f"[ResearchAgent] researching: {title}")
     urls = generate_seed_urls(llm, title, content_type,max_urls=10)
     logger.info(f"[ResearchAgent] urls({len(urls)}): {urls[:max_pages]}")
     if not urls:
         return ""
-    bundle = scrape_bundle(firecrawl, urls, logger=logger, max_pages=max_pages)
+    bundle = scrape_bundle(firecrawl, urls, logger=logger, max_pages=max_pages,
+                           parallel=parallel, url_timeout=url_timeout, deadline=deadline,
+                           query=EVIDENCE_QUERY)
     logger.info(f"[ResearchAgent] bundle chars={len(bundle)} sample={truncate(bundle, 500)}")
     return bundle
+
+def research_many(logger, llm: GroqLLM, firecrawl, titles: List[str], content_type: str,
+                  max_pages: int = 3, max_workers: int = 5,
+                  llm_max_in_flight: int = 4, scrape_max_in_flight: int = 6,
+                  parallel: int = 0, url_timeout: Optional[float] = None,
+                  deadline: Optional[float] = None,
+                  on_result: Optional[Callable[[str, str], None]] = None) -> Dict[str, str]:
+    """
+    Research several titles concurrently. A title that fails gets "" instead of
+    failing the batch; the returned dict follows the order of `titles`.
+    on_result(title, bundle) is called as soon as each title finishes.
+    An `llm` that is already a BoundedLLM keeps its own (possibly shared) limit.
+    """
+    logger.info(f"[ResearchAgent] researching {len(titles)} titles (workers={max_workers}, "
+                f"llm_in_flight={llm_max_in_flight}, scrape_in_flight={scrape_max_in_flight})")
+    if max_workers > 1:
+        if not isinstance(llm, BoundedLLM):
+            llm = BoundedLLM(llm, llm_max_in_flight)
+        firecrawl = BoundedFirecrawl(firecrawl, scrape_max_in_flight)
+
+    bundles = map_ordered(
+        lambda t: research_one(logger, llm, firecrawl, t, content_type, max_pages=max_pages,
+                               parallel=parallel, url_timeout=url_timeout, deadline=deadline),
+        titles,
+        max_workers=max_workers,
+        logger=logger,
+        label="ResearchAgent",
+        default="",
+        on_result=on_result,
+    )
+    return dict(zip(titles, bundles))
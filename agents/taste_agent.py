@@ -1,7 +1,12 @@
-import json
-from typing import Any, Dict
-from next_watch_ai.llm import GroqLLM, extract_first_json
+from typing import Any, Dict, Optional
+from next_watch_ai.llm import GroqLLM
+from next_watch_ai.schemas import TasteProfile, chat_json
 from next_watch_ai.logging_utils import truncate
+from next_watch_ai.prompt_budget import JSON_LEVELS, Section, compact_json, fit_sections
+from agents.fingerprint_agent import compact_fingerprints
+
+# token cap for all seed fingerprints together
+FINGERPRINTS_TOKENS = 3000
 
 TASTE_SCHEMA_HINT = """
 Return ONLY JSON with keys:
@@ -18,8 +23,21 @@ query_pack: {
 }
 """
 
+def compact_taste(taste: Dict[str, Any], level: int) -> Optional[Dict[str, Any]]:
+    """For downstream prompts: query_pack and secondary signals go first, then generic pruning."""
+    if level - 1 > len(JSON_LEVELS):
+        return None
+    if level >= 1:
+        taste = {k: v for k, v in taste.items() if k != "query_pack"}
+    if level >= 2:
+        taste = {k: v for k, v in taste.items() if k != "secondary_signals"}
+    return compact_json(taste, max(1, level - 1))
+
 def taste_profile(logger, llm: GroqLLM, fingerprints: Dict[str, Dict[str, Any]], content_type: str, extra_specs: str) -> Dict[str, Any]:
     logger.info("[TasteAgent] building taste profile")
+    ctx = fit_sections([
+        Section("fingerprints", fingerprints, max_tokens=FINGERPRINTS_TOKENS, compactor=compact_fingerprints),
+    ], logger=logger, label="TasteAgent")
     prompt = f"""
 You are a film student building a taste profile from the provided titles.
 Infer what the viewer consistently likes in:
@@ -32,14 +50,13 @@ Content target: {content_type}
 User extra specs (must respect): {extra_specs}
 
 Fingerprints (JSON per title):
-{json.dumps(fingerprints, ensure_ascii=False)[:16000]}
+{ctx["fingerprints"]}
 
 {TASTE_SCHEMA_HINT}
 
 ONLY output JSON.
 """
-    out = llm.chat(prompt, temperature=0.2)
-    data = extract_first_json(out)
+    data = chat_json(logger, llm, prompt, TasteProfile, "taste", TASTE_SCHEMA_HINT)
     logger.info(f"[TasteAgent] taste_summary={truncate(data.get('taste_summary',''), 500)}")
     logger.info(f"[TasteAgent] core_signals={data.get('core_signals', [])[:8]}")
     logger.info(f"[TasteAgent] avoid_signals={data.get('avoid_signals', [])[:8]}")
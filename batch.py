@@ -0,0 +1,162 @@
+"""
+Offline batch recommendations over a JSONL request file.
+
+    python -m cli batch cohort.jsonl --out recs.jsonl --workers 8
+
+Input lines: {"id": "...", "content_type": "movie", "seed_titles": [...], "extra_specs": ""}
+(id defaults to the line number). Seed titles are unioned across the batch and each
+unique (title, content type) is researched and fingerprinted once; taste ->
+candidates -> curate -> explain then run per user on a bounded worker pool.
+
+Each user's result is appended to the output as soon as it finishes. Rerunning
+with the same output resumes: users that already have an ok line are skipped.
+"""
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from next_watch_ai.catalog import TitleCatalog, load_catalog, title_key
+from next_watch_ai.concurrency import map_ordered
+from next_watch_ai.deadline import run_deadline
+from next_watch_ai.result_cache import open_run_cache
+from next_watch_ai.routing import make_agent_llms, routes_signature
+from next_watch_ai.tracing import node_span
+from agents.input_agent import normalize_content_type
+from pipeline import make_firecrawl_client, make_store, recommend, research_and_fingerprint
+
+
+def read_requests(logger, path: str) -> List[Dict[str, Any]]:
+    requests, seen = [], set()
+    with open(path, encoding="utf-8") as f:
+        for n, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                raw = json.loads(line)
+                seeds = [str(t).strip() for t in raw.get("seed_titles") or [] if str(t).strip()]
+                if not seeds:
+                    raise ValueError("no seed_titles")
+            except (ValueError, AttributeError) as e:
+                logger.warning(f"[Batch] skipping line {n} of {path}: {e}")
+                continue
+            req_id = str(raw.get("id", n))
+            if req_id in seen:
+                logger.warning(f"[Batch] duplicate id {req_id!r} on line {n}; skipped")
+                continue
+            seen.add(req_id)
+            requests.append({
+                "id": req_id,
+                "content_type": normalize_content_type(raw.get("content_type", "both")),
+                "seed_titles": seeds,
+                "extra_specs": str(raw.get("extra_specs", "") or "").strip(),
+            })
+    return requests
+
+
+def finished_ids(path: str) -> Set[str]:
+    """ids with an ok result in `path`. A torn last line (crash mid-write) is cut off so appends stay valid."""
+    if not os.path.exists(path):
+        return set()
+    with open(path, "rb") as f:
+        data = f.read()
+    cut = data.rfind(b"\n") + 1
+    if cut < len(data):
+        with open(path, "r+b") as f:
+            f.truncate(cut)
+    done = set()
+    for line in data[:cut].decode("utf-8").splitlines():
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            continue
+        if rec.get("ok"):
+            done.add(str(rec.get("id")))
+    return done
+
+
+def seed_key(title: str, catalog: Optional[TitleCatalog], content_type: str) -> str:
+    entry = catalog.resolve(title, content_type) if catalog else None
+    return entry.id if entry else title_key(title)
+
+
+def run_batch(logger, settings, in_path: str, out_path: str, workers: int = 4,
+              llm=None, firecrawl=None) -> Dict[str, int]:
+    requests = read_requests(logger, in_path)
+    done = finished_ids(out_path)
+    todo = [r for r in requests if r["id"] not in done]
+
+    llms = make_agent_llms(settings, logger, llm)
+    firecrawl = firecrawl or make_firecrawl_client(settings)
+    store = make_store(settings, logger)
+    catalog = load_catalog(settings.catalog_path, logger)
+
+    # 1) union of seeds, per content type (research and stored fingerprints depend on it);
+    #    the first spelling seen stands in for every alias of a title
+    unique: Dict[Tuple[str, str], str] = {}
+    for r in todo:
+        for t in r["seed_titles"]:
+            unique.setdefault((seed_key(t, catalog, r["content_type"]), r["content_type"]), t)
+    mentions = sum(len(r["seed_titles"]) for r in todo)
+    logger.info(f"[Batch] {len(todo)} users to run ({len(done)} already in {out_path}); "
+                f"{mentions} seed mentions -> {len(unique)} unique titles")
+
+    # 2) research + fingerprint each unique title once
+    fingerprints: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for content_type in sorted({ct for _, ct in unique}):
+        keyed = {t: k for (k, ct), t in unique.items() if ct == content_type}
+        with node_span("research"):
+            _, fps = research_and_fingerprint(
+                logger, settings, llms["research"], firecrawl, store, content_type, list(keyed),
+                fingerprint_llm=llms["fingerprint"],
+            )
+        for t, fp in fps.items():
+            fingerprints[(keyed[t], content_type)] = fp
+    logger.info(f"[Batch] fingerprinted {len(fingerprints)}/{len(unique)} unique titles")
+
+    # 3) per-user stages on a bounded pool, results appended as they finish
+    run_cache = open_run_cache(settings, logger)
+    model = llm.model if llm else routes_signature(settings)
+    write_lock = threading.Lock()
+    counts = {"users": len(requests), "skipped": len(done), "ok": 0, "failed": 0,
+              "seed_mentions": mentions, "unique_titles": len(unique), "fingerprinted": len(fingerprints)}
+
+    def run_user(r: Dict[str, Any]) -> Dict[str, Any]:
+        ct, seeds = r["content_type"], r["seed_titles"]
+        fps = {}
+        for t in seeds:
+            fp = fingerprints.get((seed_key(t, catalog, ct), ct))
+            if fp:
+                fps[t] = fp
+
+        def compute():
+            with run_deadline(settings.run_deadline_s):
+                return recommend(logger, settings, llms, store, ct, seeds, r["extra_specs"], fps)
+
+        try:
+            if run_cache is None:
+                result = compute()
+            else:
+                result, _ = run_cache.get_or_run(run_cache.key(seeds, ct, r["extra_specs"], model, catalog), compute)
+        except Exception as e:
+            logger.warning(f"[Batch] user {r['id']} failed | {type(e).__name__}: {e}")
+            return {"id": r["id"], "ok": False, "error": f"{type(e).__name__}: {e}"}
+        cards = result.get("cards") or {}
+        return {"id": r["id"], "ok": True, "content_type": ct, "seed_titles": seeds,
+                "taste": result.get("taste", {}), "cards": cards.get("cards", []),
+                "partial": bool(cards.get("partial"))}
+
+    if os.path.dirname(out_path):
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with open(out_path, "a", encoding="utf-8") as out:
+        def write(_req, rec):
+            with write_lock:
+                out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                out.flush()
+                counts["ok" if rec["ok"] else "failed"] += 1
+                n = counts["ok"] + counts["failed"]
+                if n % 25 == 0 or n == len(todo):
+                    logger.info(f"[Batch] {n}/{len(todo)} users written ({counts['failed']} failed)")
+
+        map_ordered(run_user, todo, max_workers=workers, logger=logger, label="Batch", on_result=write)
+    return counts
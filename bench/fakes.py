@@ -0,0 +1,137 @@
+"""
+Offline stand-ins for GroqLLM and FirecrawlApp driven by recorded fixtures.
+
+FakeGroqLLM subclasses GroqLLM and only replaces the network call, so the
+response cache, rate limiter, retries and tracing all run as in production.
+Both fakes inject configurable latency (log-normal around a mean, for a
+realistic tail) and failures.
+"""
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import List, Optional
+from urllib.parse import unquote, urlsplit
+
+from firecrawl import WebsiteNotSupportedError
+
+from next_watch_ai.llm import AsyncGroqLLM
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def _load(name: str):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _sample_latency(rng: random.Random, mean_s: float, jitter: float) -> float:
+    if mean_s <= 0:
+        return 0.0
+    if jitter <= 0:
+        return mean_s
+    # log-normal with the requested mean
+    return rng.lognormvariate(math.log(mean_s) - jitter ** 2 / 2, jitter)
+
+
+class InjectedRateLimit(Exception):
+    """Looks like a Groq 429 to rate_limit.is_retryable, so retries/backoff kick in."""
+    status_code = 429
+    response = SimpleNamespace(status_code=429, headers={})
+
+
+class FakeGroqLLM(AsyncGroqLLM):
+    def __init__(self, model: str = "llama-3.1-8b-instant", latency_s: float = 0.4, jitter: float = 0.5,
+                 failure_rate: float = 0.0, seed: Optional[int] = None, **kwargs):
+        kwargs.setdefault("max_retries", 2)
+        super().__init__(api_key="bench", model=model, **kwargs)
+        self.routes = _load("llm_responses.json")["routes"]
+        self.latency_s = latency_s
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _respond(self, prompt: str, temperature: float):
+        with self._lock:
+            self.calls += 1
+            delay = _sample_latency(self._rng, self.latency_s, self.jitter)
+            fail = self._rng.random() < self.failure_rate
+        return delay, fail, self._completion(prompt)
+
+    def _completion(self, prompt: str):
+        content = '{"action": "answer_question", "rationale": "", "message_to_user": ""}'
+        for route in self.routes:
+            if route["match"] in prompt:
+                m = re.search(r"^Title: (.+)$", prompt, flags=re.MULTILINE)
+                slug = (m.group(1).strip() if m else "Untitled").replace(" ", "_")
+                content = route["response"].replace("{slug}", slug)
+                break
+        usage = SimpleNamespace(prompt_tokens=len(prompt) // 4, completion_tokens=len(content) // 4,
+                                total_tokens=(len(prompt) + len(content)) // 4)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+    def _create(self, prompt: str, temperature: float):
+        delay, fail, resp = self._respond(prompt, temperature)
+        time.sleep(delay)
+        if fail:
+            raise InjectedRateLimit("injected 429")
+        return resp
+
+    async def _acreate(self, prompt: str, temperature: float):
+        delay, fail, resp = self._respond(prompt, temperature)
+        await asyncio.sleep(delay)
+        if fail:
+            raise InjectedRateLimit("injected 429")
+        return resp
+
+    def _create_stream(self, prompt: str, temperature: float, emit):
+        # first token after a third of the latency, the rest spread over the remainder
+        delay, fail, resp = self._respond(prompt, temperature)
+        time.sleep(delay / 3)
+        if fail:
+            raise InjectedRateLimit("injected 429")
+        content = resp.choices[0].message.content
+        pieces = [content[i:i + 16] for i in range(0, len(content), 16)] or [""]
+        for piece in pieces:
+            time.sleep(2 * delay / 3 / len(pieces))
+            emit(piece)
+        return content, resp.usage
+
+
+class FakeFirecrawlApp:
+    """scrape() returns a synthetic page built from fixture sections, or raises like Firecrawl does."""
+    def __init__(self, latency_s: float = 1.5, jitter: float = 0.6, failure_rate: float = 0.15,
+                 seed: Optional[int] = None):
+        self.sections: List[str] = _load("pages.json")["sections"]
+        self.latency_s = latency_s
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def scrape(self, url: str, formats: Optional[List[str]] = None, **kwargs):
+        with self._lock:
+            self.calls += 1
+            delay = _sample_latency(self._rng, self.latency_s, self.jitter)
+            fail = self._rng.random() < self.failure_rate
+        timeout = kwargs.get("timeout")  # ms, as Firecrawl takes it
+        if timeout and delay > timeout / 1000:
+            time.sleep(timeout / 1000)
+            raise TimeoutError(f"injected: scrape timed out after {timeout}ms")
+        time.sleep(delay)
+        if fail:
+            raise WebsiteNotSupportedError("injected: website not supported", status_code=403)
+
+        parts = urlsplit(url)
+        title = unquote(parts.path.rstrip("/").split("/")[-1] or parts.query.split("=")[-1]).replace("_", " ")
+        page_rng = random.Random(url)
+        body = [self.sections[0]] + page_rng.sample(self.sections[1:], k=min(6, len(self.sections) - 1))
+        return {"markdown": "\n\n".join(body).replace("{title}", title or "Untitled")}
@@ -0,0 +1,148 @@
+"""
+Concurrent-session load generator for serve mode. Without --url it starts an
+in-process server (one compiled graph, fake Groq/Firecrawl clients) on a free
+port; with --url it drives an already running `python -m cli serve`.
+
+    python -m bench.load_gen --users 40 --concurrency 16 --max-sessions 4 --max-queue 8
+    python -m bench.load_gen --url http://127.0.0.1:8765 --users 20 --concurrency 4 --asks 1
+"""
+import dataclasses
+import json
+import logging
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from next_watch_ai.cache import MemoryCache
+from next_watch_ai.firecrawl_utils import make_firecrawl
+from server import Service, make_http_server
+from bench.fakes import FakeGroqLLM, FakeFirecrawlApp
+from bench.run_bench import bench_settings, percentile, synthetic_users
+
+app = typer.Typer(add_completion=False)
+console = Console()
+
+
+def post(url: str, payload: Dict[str, Any], timeout: float) -> Tuple[int, Dict[str, Any]]:
+    req = urllib.request.Request(url, data=json.dumps(payload).encode("utf-8"),
+                                 headers={"Content-Type": "application/json"}, method="POST")
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"{}")
+
+
+def get(url: str, timeout: float = 10.0) -> Dict[str, Any]:
+    with urllib.request.urlopen(url, timeout=timeout) as resp:
+        return json.loads(resp.read())
+
+
+@app.command()
+def main(
+    url: str = typer.Option("", help="Running server to load; empty starts an in-process one with fakes."),
+    users: int = typer.Option(20, help="Number of synthetic sessions."),
+    concurrency: int = typer.Option(8, help="Clients sending at the same time."),
+    asks: int = typer.Option(0, help="Follow-up questions per session after its recommendations."),
+    max_retries: int = typer.Option(20, help="Retries per request after a 503 (admission control)."),
+    max_sessions: int = typer.Option(4, help="In-process server: sessions running at once."),
+    max_queue: int = typer.Option(8, help="In-process server: sessions allowed to wait."),
+    llm_latency: float = typer.Option(0.4, help="In-process server: mean fake Groq latency (s)."),
+    scrape_latency: float = typer.Option(1.5, help="In-process server: mean fake Firecrawl latency (s)."),
+    with_caches: bool = typer.Option(False, help="In-process server: enable caches and the fingerprint store."),
+    popular_share: float = typer.Option(0.5, help="Share of seed picks drawn from the 5 most popular titles."),
+    timeout: float = typer.Option(600.0, help="Per-request client timeout (s)."),
+    seed: int = typer.Option(7, help="RNG seed for users, latency and failures."),
+    log_level: str = typer.Option("ERROR", help="Log level for the app logger (in-process server)."),
+):
+    logger = logging.getLogger("next_watch_ai")
+    logger.setLevel(getattr(logging, log_level.upper(), logging.ERROR))
+    if not logger.handlers:
+        logger.addHandler(logging.StreamHandler())
+
+    httpd = None
+    llm: Optional[FakeGroqLLM] = None
+    tmp = tempfile.TemporaryDirectory(prefix="nwa-load-")
+    if not url:
+        settings = dataclasses.replace(bench_settings(with_caches, tmp.name), checkpoint_path="")
+        llm = FakeGroqLLM(settings.groq_model, latency_s=llm_latency, seed=seed,
+                          cache=MemoryCache() if with_caches else None)
+        firecrawl = make_firecrawl("bench", cache_path=settings.scrape_cache_path,
+                                   client=FakeFirecrawlApp(latency_s=scrape_latency, seed=seed))
+        service = Service(logger, settings, llm=llm, firecrawl=firecrawl,
+                          max_sessions=max_sessions, max_queue=max_queue)
+        httpd = make_http_server(service, "127.0.0.1", 0)
+        threading.Thread(target=httpd.serve_forever, name="load-gen-server", daemon=True).start()
+        url = f"http://127.0.0.1:{httpd.server_address[1]}"
+    url = url.rstrip("/")
+
+    lock = threading.Lock()
+    stats = {"rejected": 0, "errors": 0, "partial": 0}
+    latencies, ask_latencies = [], []
+
+    def request(path: str, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        for attempt in range(max_retries + 1):
+            status, body = post(f"{url}{path}", payload, timeout)
+            if status == 503:
+                with lock:
+                    stats["rejected"] += 1
+                time.sleep(min(2.0, 0.1 * 2 ** attempt))
+                continue
+            if status != 200:
+                with lock:
+                    stats["errors"] += 1
+                console.print(f"[red]{path} -> {status}: {body.get('error')}[/red]")
+                return None
+            return body
+        with lock:
+            stats["errors"] += 1
+        return None
+
+    def session(user: Dict[str, Any]) -> None:
+        t0 = time.perf_counter()
+        out = request("/recommend", {**user, "session_id": user["user_id"]})
+        if out is None:
+            return
+        with lock:
+            latencies.append(time.perf_counter() - t0)
+            stats["partial"] += int(bool(out.get("partial")))
+        for _ in range(asks):
+            t1 = time.perf_counter()
+            if request("/ask", {"session_id": user["user_id"], "question": "Which one is the least dark?"}):
+                with lock:
+                    ask_latencies.append(time.perf_counter() - t1)
+
+    population = synthetic_users(users, seed, popular_share)
+    t_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        list(pool.map(session, population))
+    wall = time.perf_counter() - t_start
+    health = get(f"{url}/health")
+
+    if httpd is not None:
+        httpd.shutdown()
+        httpd.server_close()
+    tmp.cleanup()
+
+    table = Table(title=f"serve load: users={users} concurrency={concurrency} url={url}")
+    for col in ("sessions ok", "errors", "503s", "partial", "p50 s", "p95 s", "ask p95 s",
+                "sessions/s", "wall s", "LLM calls"):
+        table.add_column(col, justify="right")
+    table.add_row(str(len(latencies)), str(stats["errors"]), str(stats["rejected"]), str(stats["partial"]),
+                  f"{percentile(latencies, 50):.2f}", f"{percentile(latencies, 95):.2f}",
+                  f"{percentile(ask_latencies, 95):.2f}", f"{len(latencies) / wall if wall else 0.0:.2f}",
+                  f"{wall:.1f}", str(llm.calls) if llm else "-")
+    console.print(table)
+    console.print(f"server: {health}")
+
+
+if __name__ == "__main__":
+    app()
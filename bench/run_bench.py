@@ -0,0 +1,214 @@
+"""
+Offline end-to-end benchmark: N synthetic users through the compiled graph
+and/or run_pipeline, with fake Groq/Firecrawl clients (no keys, no network).
+
+    python -m bench.run_bench --users 20 --concurrency 4
+    python -m bench.run_bench --mode pipeline --llm-latency 0.8 --scrape-fail-rate 0.3
+"""
+import dataclasses
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from next_watch_ai.config import Settings
+from next_watch_ai.cache import MemoryCache
+from next_watch_ai.firecrawl_utils import make_firecrawl
+from next_watch_ai.concurrency import submit_in_context
+from next_watch_ai.tracing import start_trace
+from graph import build_graph, invoke_cached
+from pipeline import run_pipeline
+from bench.fakes import FakeGroqLLM, FakeFirecrawlApp
+
+app = typer.Typer(add_completion=False)
+console = Console()
+
+SEED_POOL = [
+    "Aftersun", "Manchester by the Sea", "Parasite", "Columbus", "Eraserhead",
+    "Twin Peaks", "Inception", "Interstellar", "In the Mood for Love", "Burning",
+    "The Leftovers", "Fleabag", "Paterson", "Lady Bird", "Moonlight",
+    "Succession", "Mulholland Drive", "Portrait of a Lady on Fire", "Atlanta", "Shoplifters",
+]
+
+
+def synthetic_users(n: int, seed: int, popular_share: float) -> List[Dict]:
+    """Users draw 5 seeds; a `popular_share` of picks come from the 5 most popular titles."""
+    rng = random.Random(seed)
+    users = []
+    for i in range(n):
+        seeds: List[str] = []
+        while len(seeds) < 5:
+            pool = SEED_POOL[:5] if rng.random() < popular_share else SEED_POOL
+            t = rng.choice(pool)
+            if t not in seeds:
+                seeds.append(t)
+        users.append({
+            "user_id": f"u{i:04d}",
+            "content_type": rng.choice(["movie", "both", "tv"]),
+            "seed_titles": seeds,
+            "extra_specs": rng.choice(["", "", "character driven", "nothing too violent"]),
+        })
+    return users
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, round(p / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+def bench_settings(with_caches: bool, cache_dir: str) -> Settings:
+    s = Settings(firecrawl_api_key="bench", groq_api_key="bench")
+    if with_caches:
+        return dataclasses.replace(
+            s,
+            scrape_cache_path=f"{cache_dir}/scrape.sqlite",
+            llm_cache="memory",
+            fingerprint_store_path=f"{cache_dir}/fingerprints.sqlite",
+            vector_index_path=f"{cache_dir}/fingerprint_index",
+            run_cache_path=f"{cache_dir}/runs.sqlite",
+        )
+    return dataclasses.replace(s, scrape_cache_path="", llm_cache="off", fingerprint_store_path="",
+                               vector_index_path="", run_cache_path="")
+
+
+def run_users(label: str, users: List[Dict], concurrency: int, run_one: Callable[[Dict], None]) -> Dict:
+    latencies: List[float] = []
+    errors = 0
+
+    def timed(user):
+        t0 = time.perf_counter()
+        run_one(user)
+        return time.perf_counter() - t0
+
+    tracemalloc.start()
+    t_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = [submit_in_context(pool, timed, u) for u in users]
+        for fut in futures:
+            try:
+                latencies.append(fut.result())
+            except Exception as e:
+                errors += 1
+                console.print(f"[red]{label}: run failed | {type(e).__name__}: {e}[/red]")
+    wall = time.perf_counter() - t_start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "mode": label,
+        "users": len(users),
+        "errors": errors,
+        "p50_s": percentile(latencies, 50),
+        "p95_s": percentile(latencies, 95),
+        "mean_s": statistics.fmean(latencies) if latencies else 0.0,
+        "throughput_users_per_s": len(latencies) / wall if wall else 0.0,
+        "wall_s": wall,
+        "peak_mem_mb": peak / (1024 * 1024),
+    }
+
+
+@app.command()
+def main(
+    users: int = typer.Option(10, help="Number of synthetic users."),
+    concurrency: int = typer.Option(1, help="Users run at the same time."),
+    mode: str = typer.Option("both", help="graph, pipeline or both."),
+    llm_latency: float = typer.Option(0.4, help="Mean fake Groq latency (s)."),
+    scrape_latency: float = typer.Option(1.5, help="Mean fake Firecrawl latency (s)."),
+    jitter: float = typer.Option(0.5, help="Log-normal sigma for injected latency (0 = constant)."),
+    llm_fail_rate: float = typer.Option(0.0, help="Fraction of LLM calls failing with a 429."),
+    scrape_fail_rate: float = typer.Option(0.15, help="Fraction of scrapes failing as unsupported."),
+    popular_share: float = typer.Option(0.5, help="Share of seed picks drawn from the 5 most popular titles."),
+    with_caches: bool = typer.Option(False, help="Enable scrape/LLM caches and the fingerprint store."),
+    hedge: bool = typer.Option(False, help="Hedge LLM requests slower than the agent's observed p95."),
+    run_deadline: float = typer.Option(180.0, help="Per-run deadline in seconds (0 = none)."),
+    seed: int = typer.Option(7, help="RNG seed for users, latency and failures."),
+    log_level: str = typer.Option("ERROR", help="Log level for the app logger during the bench."),
+):
+    logger = logging.getLogger("next_watch_ai")
+    logger.setLevel(getattr(logging, log_level.upper(), logging.ERROR))
+    if not logger.handlers:
+        logger.addHandler(logging.StreamHandler())
+
+    population = synthetic_users(users, seed, popular_share)
+    results = []
+
+    with tempfile.TemporaryDirectory(prefix="nwa-bench-") as cache_root:
+        # each mode gets its own caches, store and run cache: sharing them would let the
+        # second mode replay the first one's results instead of being measured
+        def mode_settings(label: str) -> Settings:
+            return dataclasses.replace(bench_settings(with_caches, os.path.join(cache_root, label)),
+                                       run_deadline_s=run_deadline)
+
+        def clients(settings: Settings):
+            llm = FakeGroqLLM(settings.groq_model, latency_s=llm_latency, jitter=jitter,
+                              failure_rate=llm_fail_rate, seed=seed, hedge=hedge,
+                              cache=MemoryCache() if with_caches else None)
+            fake = FakeFirecrawlApp(latency_s=scrape_latency, jitter=jitter,
+                                    failure_rate=scrape_fail_rate, seed=seed)
+            firecrawl = make_firecrawl("bench", cache_path=settings.scrape_cache_path, client=fake)
+            return llm, firecrawl
+
+        if mode in ("graph", "both"):
+            settings = mode_settings("graph")
+            llm, firecrawl = clients(settings)
+            graph, _ = build_graph(logger, settings, llm=llm, firecrawl=firecrawl)
+
+            def run_graph(user):
+                start_trace(user["user_id"])
+                invoke_cached(logger, settings, graph, {
+                    "content_type": user["content_type"],
+                    "seed_titles": user["seed_titles"],
+                    "extra_specs": user["extra_specs"],
+                    "iterations": 0,
+                    "max_iters": 2,
+                }, model=llm.model)
+
+            row = run_users("graph", population, concurrency, run_graph)
+            row.update(llm_calls=llm.calls, hedges=llm.hedges, scrapes=firecrawl_calls(firecrawl))
+            results.append(row)
+
+        if mode in ("pipeline", "both"):
+            settings = mode_settings("pipeline")
+            llm, firecrawl = clients(settings)
+
+            def run_pipe(user):
+                start_trace(user["user_id"])
+                run_pipeline(logger, settings, user["content_type"], user["seed_titles"],
+                             user["extra_specs"], llm=llm, firecrawl=firecrawl)
+
+            row = run_users("pipeline", population, concurrency, run_pipe)
+            row.update(llm_calls=llm.calls, hedges=llm.hedges, scrapes=firecrawl_calls(firecrawl))
+            results.append(row)
+
+    table = Table(title=f"bench: users={users} concurrency={concurrency} caches={'on' if with_caches else 'off'}")
+    for col in ("mode", "users", "errors", "p50 s", "p95 s", "mean s", "users/s", "wall s",
+                "peak MB", "LLM calls", "hedges", "scrapes"):
+        table.add_column(col, justify="left" if col == "mode" else "right")
+    for r in results:
+        table.add_row(r["mode"], str(r["users"]), str(r["errors"]), f"{r['p50_s']:.2f}", f"{r['p95_s']:.2f}",
+                      f"{r['mean_s']:.2f}", f"{r['throughput_users_per_s']:.2f}", f"{r['wall_s']:.1f}",
+                      f"{r['peak_mem_mb']:.1f}", str(r["llm_calls"]), str(r["hedges"]), str(r["scrapes"]))
+    console.print(table)
+
+
+def firecrawl_calls(firecrawl) -> int:
+    # unwrap Traced/Cached wrappers down to the fake
+    while not isinstance(firecrawl, FakeFirecrawlApp):
+        firecrawl = firecrawl.firecrawl
+    return firecrawl.calls
+
+
+if __name__ == "__main__":
+    app()
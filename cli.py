@@ -1,16 +1,44 @@
+import cProfile
+import dataclasses
+import os
+import pstats
+import time
+import uuid
+
 import typer
 from rich import print as rprint
 from rich.console import Console
+from rich.table import Table
 
 from next_watch_ai.config import load_settings
 from next_watch_ai.logging_utils import setup_logging
+from next_watch_ai.tracing import node_span, start_trace
+from next_watch_ai.replay import open_replay
+from next_watch_ai.checkpoints import make_checkpointer
+from next_watch_ai.deadline import run_deadline
 from agents.input_agent import normalize_content_type
 from agents.controller_agent import controller
-from pipeline import run_pipeline
-from graph import build_graph
+from pipeline import run_pipeline, warm_fingerprints
+from graph import build_graph, invoke_cached, revise
+from server import Service, make_http_server, serve_jsonl
+from batch import run_batch
 app = typer.Typer(add_completion=False)
 console = Console()
 
+def print_trace_summary(trace) -> None:
+    table = Table(title=f"Run {trace.run_id}: per-node latency / tokens / cost")
+    for col in ("node", "runs", "wall s", "LLM calls", "LLM s", "prompt tok", "compl tok",
+                "cost $", "scrapes", "scrape s", "scrape KB"):
+        table.add_column(col, justify="left" if col == "node" else "right")
+    for r in trace.summary():
+        table.add_row(
+            r["node"], str(r["runs"] or ""), f"{r['latency_s']:.2f}",
+            str(r["llm_calls"]), f"{r['llm_latency_s']:.2f}",
+            str(r["prompt_tokens"]), str(r["completion_tokens"]), f"{r['cost_usd']:.5f}",
+            str(r["scrapes"]), f"{r['scrape_latency_s']:.2f}", f"{r['scrape_bytes'] / 1024:.1f}",
+        )
+    console.print(table)
+
 def prompt_seeds() -> list[str]:
     console.print("\nEnter 5 titles (one per line). Press Enter after each:")
     seeds = []
@@ -20,71 +48,132 @@ def prompt_seeds() -> list[str]:
             seeds.append(s)
     return seeds
 
-@app.command()
-def run():
-    settings = load_settings()
-    logger = setup_logging(settings.log_level)
+def print_taste(taste) -> None:
+    rprint("\n[bold]YOUR TASTE (film-student summary)[/bold]")
+    rprint(taste.get("taste_summary", ""))
 
-    ct_raw = typer.prompt("Are you inputting movies, TV shows, or both? (movie/tv/both)", default="both")
-    content_type = normalize_content_type(ct_raw)
+    core = taste.get("core_signals", []) or []
+    if core:
+        rprint("\n[bold]Core signals:[/bold]")
+        for s in core[:8]:
+            rprint(f" • {s}")
+
+def print_card(i: int, c) -> None:
+    title = c.get("title", "")
+    year = c.get("year")
+    header = f"{i}. {title}" + (f" ({year})" if year else "")
+    rprint(f"\n[bold]{header}[/bold]")
+    for b in (c.get("why_this_fits", []) or [])[:3]:
+        rprint(f" • {b}")
+    wf = (c.get("watch_for", "") or "").strip()
+    if wf:
+        rprint(f"[dim]Watch for:[/dim] {wf}")
+
+def print_results(result) -> None:
+    cards = (result.get("cards", {}) or {}).get("cards", [])
+    print_taste(result.get("taste", {}))
+    rprint("\n[bold]RECOMMENDATIONS (spoiler-free)[/bold]")
+    for i, c in enumerate(cards, start=1):
+        print_card(i, c)
 
-    seed_titles = prompt_seeds()
+class StreamPrinter:
+    """
+    on_event callback for graph.stream_run: a progress line per finished node, the
+    taste summary as soon as it exists, and each card as soon as it is written.
+    """
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.first_card_s = None
+        self.rounds = 0
+        self.shown = 0  # cards printed in the current explain round
 
-    extra_specs = typer.prompt(
-        "Any other specs? (1–2 sentences, optional)",
-        default="",
-        show_default=False,
-    ).strip()
+    def __call__(self, kind: str, data) -> None:
+        if kind == "card":
+            self._card(data["index"], data["card"])
+            return
+        node, update = data["node"], data["update"]
+        console.print(f"[dim]  ✓ {node} ({time.perf_counter() - self.t0:.1f}s)[/dim]")
+        if node == "taste" and update.get("taste"):
+            print_taste(update["taste"])
+        elif node == "explain":
+            # cards that were not streamed (deadline fallback, unparseable chunk) come from the final state
+            cards = (update.get("cards") or {}).get("cards", []) or []
+            for i in range(self.shown, len(cards)):
+                self._card(i, cards[i])
+            self.shown = 0
 
-    logger.info(f"[CLI] content_type={content_type} seeds={seed_titles} extra_specs={extra_specs}")
+    def _card(self, index: int, card) -> None:
+        if self.shown == 0:
+            self.rounds += 1
+            rprint("\n[bold]RECOMMENDATIONS (spoiler-free)[/bold]" if self.rounds == 1
+                   else "\n[bold]REVISED RECOMMENDATIONS[/bold]")
+        if self.first_card_s is None:
+            self.first_card_s = time.perf_counter() - self.t0
+            console.print(f"[dim]  first card after {self.first_card_s:.1f}s[/dim]")
+        print_card(index + 1, card)
+        self.shown = index + 1
 
-    graph, llm = build_graph(logger, settings)  
+@app.command()
+def run(
+    session: str = typer.Option("", "--session", "-s", help="Resume a saved session instead of starting a new one."),
+    stream: bool = typer.Option(True, "--stream/--no-stream", help="Show node progress and cards as they are produced."),
+):
+    settings = load_settings()
+    logger = setup_logging(settings.log_level)
 
-    #################################
-    compiled_graph, llm = build_graph(logger, settings)
+    checkpointer = make_checkpointer(settings.checkpoint_path, logger)
+    graph, llm = build_graph(logger, settings, checkpointer=checkpointer)
+    session_id = session or uuid.uuid4().hex[:12]
+    config = {"configurable": {"thread_id": session_id}}
+    trace = start_trace()
 
-    png_bytes = compiled_graph.get_graph().draw_mermaid_png()
-    with open("next-watch-ai-workflow.png", "wb") as f:
-        f.write(png_bytes)
+    if session:
+        result = graph.get_state(config).values
+        if not result.get("cards"):
+            raise typer.BadParameter(f"No finished session {session!r} in {settings.checkpoint_path or 'memory'}.")
+        logger.info(f"[CLI] resumed session={session_id}")
+        print_results(result)
+    else:
+        ct_raw = typer.prompt("Are you inputting movies, TV shows, or both? (movie/tv/both)", default="both")
+        content_type = normalize_content_type(ct_raw)
 
-    print("Saved: next-watch-ai-workflow.png")
+        seed_titles = prompt_seeds()
 
-    #################################
-    state = {
-        "content_type": content_type,
-        "seed_titles": seed_titles,
-        "extra_specs": extra_specs,
-        "iterations": 0,
-        "max_iters": 2,
-    }
+        extra_specs = typer.prompt(
+            "Any other specs? (1–2 sentences, optional)",
+            default="",
+            show_default=False,
+        ).strip()
 
-    # Run full pipeline once
-    result = graph.invoke(state)
+        logger.info(f"[CLI] session={session_id} content_type={content_type} seeds={seed_titles} extra_specs={extra_specs}")
 
-    # --- print cards as you already do ---
-    taste = result.get("taste", {})
-    cards = (result.get("cards", {}) or {}).get("cards", [])
+        #################################
+        png_bytes = graph.get_graph().draw_mermaid_png()
+        with open("next-watch-ai-workflow.png", "wb") as f:
+            f.write(png_bytes)
 
-    rprint("\n[bold]YOUR TASTE (film-student summary)[/bold]")
-    rprint(taste.get("taste_summary", ""))
+        print("Saved: next-watch-ai-workflow.png")
 
-    core = taste.get("core_signals", []) or []
-    if core:
-        rprint("\n[bold]Core signals:[/bold]")
-        for s in core[:8]:
-            rprint(f" • {s}")
+        #################################
+        state = {
+            "content_type": content_type,
+            "seed_titles": seed_titles,
+            "extra_specs": extra_specs,
+            "iterations": 0,
+            "max_iters": 2,
+        }
 
-    rprint("\n[bold]RECOMMENDATIONS (spoiler-free)[/bold]")
-    for i, c in enumerate(cards, start=1):
-        title = c.get("title", "")
-        year = c.get("year")
-        header = f"{i}. {title}" + (f" ({year})" if year else "")
-        rprint(f"\n[bold]{header}[/bold]")
-        for b in (c.get("why_this_fits", []) or [])[:3]:
-            rprint(f" • {b}")
-        wf = (c.get("watch_for", "") or "").strip()
-        if wf:
-            rprint(f"[dim]Watch for:[/dim] {wf}")
+        replay_log = open_replay(settings.replay_mode, settings.replay_path)
+        if replay_log and not replay_log.replaying:
+            replay_log.record_run(state)
+
+        # Run full pipeline once
+        printer = StreamPrinter() if stream else None
+        result = invoke_cached(logger, settings, graph, state, config, on_event=printer)
+        if printer is None or printer.rounds == 0:  # not streamed, or served from the run cache
+            print_results(result)
+
+    rprint(f"\n[dim]Session {session_id} saved; resume with: python -m cli run --session {session_id}[/dim]")
 
     # Follow-up Q&A 
     while True:
@@ -95,23 +184,127 @@ def run():
         state_for_qa = dict(result)
         state_for_qa["user_question"] = q
 
-        ctl = controller(logger, llm, state_for_qa)  
+        with node_span("qa"):
+            ctl = controller(logger, llm, state_for_qa)
         answer = ctl.get("message_to_user", "")
 
         rprint(f"\n[bold]Answer:[/bold]\n{answer}")
         action = ctl.get("action", "answer_question")
         if action in ("revise_candidates", "revise_curation"):
-            #  restart a clean pipeline using only the true inputs + (optionally) updated extra_specs
-            new_state = {
-                "content_type": result["content_type"],
-                "seed_titles": result["seed_titles"],
-                "extra_specs": result.get("extra_specs", ""),
-                "iterations": 0,
-                "max_iters": state["max_iters"],
-            }
-            result = graph.invoke(new_state)
-    rprint("\n[dim]Logs are saved in ./logs/[/dim]")
+            # re-enter the checkpointed session at candidates/curate; research,
+            # fingerprints and taste come from the checkpoint
+            printer = StreamPrinter() if stream else None
+            with run_deadline(settings.run_deadline_s):
+                result = revise(graph, config, action, on_event=printer)
+            if printer is None:
+                print_results(result)
+
+    trace_path = trace.save("logs")
+    print_trace_summary(trace)
+    rprint(f"\n[dim]Logs are saved in ./logs/ (trace: {trace_path})[/dim]")
     
 
+@app.command()
+def serve(
+    host: str = typer.Option("127.0.0.1", help="HTTP bind address."),
+    port: int = typer.Option(8765, help="HTTP port."),
+    stdin: bool = typer.Option(False, "--stdin", help="Read JSONL requests from stdin instead of serving HTTP."),
+):
+    """Serve many sessions from one process: one compiled graph, shared clients and caches."""
+    settings = load_settings()
+    logger = setup_logging(settings.log_level)
+    service = Service(logger, settings, max_sessions=settings.serve_max_sessions,
+                      max_queue=settings.serve_max_queue)
+    if stdin:
+        serve_jsonl(service)
+        return
+    httpd = make_http_server(service, host, port)
+    logger.info(f"[Server] listening on http://{host}:{port} (sessions={settings.serve_max_sessions} "
+                f"queue={settings.serve_max_queue})")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+@app.command()
+def batch(
+    input_path: str = typer.Argument(..., help="JSONL file, one request per line."),
+    out: str = typer.Option("logs/batch_results.jsonl", "--out", "-o", help="Results JSONL (appended; reruns resume)."),
+    workers: int = typer.Option(4, "--workers", "-w", help="Users run at the same time."),
+):
+    """Recommend for a cohort: each unique seed title is researched once, then users run on a bounded pool."""
+    settings = load_settings()
+    logger = setup_logging(settings.log_level)
+    trace = start_trace()
+
+    counts = run_batch(logger, settings, input_path, out, workers=workers)
+    rprint(f"\n[bold]{counts['ok']} users done, {counts['failed']} failed, {counts['skipped']} already in {out}[/bold]")
+    rprint(f"[dim]{counts['seed_mentions']} seed mentions -> {counts['unique_titles']} unique titles "
+           f"({counts['fingerprinted']} fingerprinted)[/dim]")
+    print_trace_summary(trace)
+
+
+@app.command()
+def warm(
+    titles: list[str] = typer.Argument(None, help="Titles to fingerprint."),
+    file: str = typer.Option("", "--file", "-f", help="Text file with one title per line."),
+    content_type: str = typer.Option("both", "--content-type", "-t", help="movie/tv/both"),
+):
+    """Precompute fingerprints for a list of titles so later runs skip research for them."""
+    settings = load_settings()
+    logger = setup_logging(settings.log_level)
+
+    all_titles = list(titles or [])
+    if file:
+        with open(file, encoding="utf-8") as f:
+            all_titles += [line.strip() for line in f if line.strip()]
+    if not all_titles:
+        raise typer.BadParameter("Pass titles as arguments or with --file.")
+
+    fps = warm_fingerprints(logger, settings, normalize_content_type(content_type), all_titles)
+    rprint(f"\n[bold]Fingerprinted {len(fps)}/{len(all_titles)} titles[/bold]")
+    missing = [t for t in all_titles if t not in fps]
+    if missing:
+        rprint(f"[dim]Not enough evidence for: {', '.join(missing)}[/dim]")
+
+
+@app.command()
+def replay(
+    path: str = typer.Argument(..., help="Recording made with REPLAY_MODE=record."),
+    profile: bool = typer.Option(False, "--profile", help="Run under cProfile and print the hottest functions."),
+    top: int = typer.Option(25, help="Functions to show with --profile."),
+):
+    """Re-run recorded runs from a recording: no network, deterministic, at memory speed."""
+    os.environ["REPLAY_MODE"] = "replay"
+    os.environ["REPLAY_PATH"] = path
+    settings = load_settings()
+    if profile:
+        # cProfile only sees the calling thread, so keep every stage on it
+        settings = dataclasses.replace(settings, research_workers=1, stream_fingerprints=False, scrape_parallel=0)
+    logger = setup_logging(settings.log_level)
+
+    replay_log = open_replay(settings.replay_mode, settings.replay_path)
+    if not replay_log.runs:
+        raise typer.BadParameter(f"No recorded runs in {path}.")
+    graph, _ = build_graph(logger, settings)
+
+    profiler = cProfile.Profile() if profile else None
+    for i, state in enumerate(replay_log.runs, start=1):
+        t0 = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        result = graph.invoke(dict(state))
+        if profiler:
+            profiler.disable()
+        n_cards = len((result.get("cards", {}) or {}).get("cards", []) or [])
+        rprint(f"Run {i}/{len(replay_log.runs)}: {time.perf_counter() - t0:.3f}s, {n_cards} cards")
+
+    if profiler:
+        pstats.Stats(profiler).strip_dirs().sort_stats("cumulative").print_stats(top)
+
+
 if __name__ == "__main__":
     app()
@@ -1,43 +1,147 @@
 # next_watch_ai/graph.py
 from __future__ import annotations
-from typing import Any, Dict
+import uuid
+from typing import Any, Callable, Dict, Optional
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.config import get_config, get_stream_writer
 from langgraph.graph import StateGraph, END
 
 from next_watch_ai.graph_state import WatchState
-from next_watch_ai.llm import GroqLLM
-from next_watch_ai.firecrawl_utils import make_firecrawl
-from agents.research_agent import research_one
-from agents.fingerprint_agent import fingerprint_one
+from next_watch_ai.routing import make_agent_llms, routes_signature
+from next_watch_ai.catalog import load_catalog
+from next_watch_ai.tracing import traced_node
+from next_watch_ai.result_cache import open_run_cache
+from next_watch_ai import deadline
+from agents.fingerprint_agent import fingerprint_many
 from agents.taste_agent import taste_profile
-from agents.candidate_agent import propose_candidates
-from agents.curator_agent import curate
-from agents.explanation_agent import explain
+from agents.candidate_agent import gather_candidates
+from agents.curator_agent import curate, fallback_curation, shortlist_candidates
+from agents.explanation_agent import explain, fallback_cards
 from agents.critic_agent import critique
 from agents.controller_agent import controller
-import json 
+from pipeline import (
+    DEADLINE_RESERVE_S, make_firecrawl_client, make_store, research_and_fingerprint, within_deadline,
+)
 
 
-def build_graph(logger, settings):
-    llm = GroqLLM(api_key=settings.groq_api_key, model=settings.groq_model)
-    firecrawl = make_firecrawl(settings.firecrawl_api_key)
+REVISION_ENTRY = {
+    # action -> node whose output we pretend just happened, so the run resumes after it
+    "revise_candidates": "taste",      # re-enter at candidates
+    "revise_curation": "candidates",   # re-enter at curate
+}
+
+StreamCallback = Callable[[str, Dict[str, Any]], None]
+
+def stream_run(graph, state: Optional[Dict[str, Any]], config: Optional[Dict[str, Any]],
+               on_event: StreamCallback) -> Dict[str, Any]:
+    """
+    graph.invoke via graph.stream: on_event("node", {"node", "update"}) fires as each
+    node finishes and on_event("card", {"index", "card"}) as each explanation card
+    completes. Returns the final state.
+    """
+    config = dict(config or {})
+    config["configurable"] = {**config.get("configurable", {}), "stream_cards": True}
+    values = dict(state or {})
+    for mode, chunk in graph.stream(state, config, stream_mode=["updates", "custom"]):
+        if mode == "custom":
+            if "card" in chunk:
+                on_event("card", chunk)
+            continue
+        for node, update in chunk.items():
+            values.update(update or {})
+            on_event("node", {"node": node, "update": update or {}})
+    return graph.get_state(config).values if graph.checkpointer else values
+
+def revise(graph, config: Dict[str, Any], action: str, updates: Dict[str, Any] = None,
+           on_event: StreamCallback = None) -> Dict[str, Any]:
+    """
+    Resume a checkpointed session at `candidates` or `curate`, reusing the stored
+    research, fingerprints and taste instead of re-running the whole graph.
+    """
+    values = {"iterations": 0, "revision_done": False, **(updates or {})}
+    graph.update_state(config, values, as_node=REVISION_ENTRY[action])
+    if on_event:
+        return stream_run(graph, None, config, on_event)
+    return graph.invoke(None, config)
+
+def invoke_cached(logger, settings, graph, state: Dict[str, Any], config: Dict[str, Any] = None,
+                  model: str = "", on_event: StreamCallback = None) -> Dict[str, Any]:
+    """
+    graph.invoke behind the run cache and the run deadline. A cache hit is written
+    into the session checkpoint (when `config` names a thread) so follow-up questions
+    and revisions work as after a real run. Background refreshes run under the run
+    deadline on a throwaway thread id that is deleted from the checkpointer afterwards.
+    With on_event, the run is streamed (see stream_run); cache hits produce no events.
+    """
+    def run():
+        with deadline.run_deadline(settings.run_deadline_s):
+            if on_event:
+                return stream_run(graph, state, config, on_event)
+            return graph.invoke(state, config)
+
+    run_cache = open_run_cache(settings, logger)
+    if run_cache is None:
+        return run()
+    key = run_cache.key(state["seed_titles"], state["content_type"], state.get("extra_specs", ""),
+                        model or routes_signature(settings), catalog=load_catalog(settings.catalog_path, logger))
+
+    def refresh():
+        # a checkpointed graph needs a thread; this one is throwaway, so it's deleted afterwards
+        checkpointer = graph.checkpointer if isinstance(graph.checkpointer, BaseCheckpointSaver) else None
+        thread_id = f"refresh-{uuid.uuid4().hex[:12]}"
+        try:
+            with deadline.run_deadline(settings.run_deadline_s):
+                return graph.invoke(dict(state), {"configurable": {"thread_id": thread_id}} if checkpointer else None)
+        finally:
+            if checkpointer:
+                checkpointer.delete_thread(thread_id)
+
+    result, status = run_cache.get_or_run(key, run, refresh)
+    if status == "miss":
+        return result
+    values = {**state, **result, "critic_ran": True, "revision_done": False}
+    if config:
+        graph.update_state(config, values, as_node="controller")
+    return values
+
+def build_graph(logger, settings, llm=None, firecrawl=None, checkpointer=None):
+    # clients can be injected (benchmarks, replay); otherwise built from settings
+    llms = make_agent_llms(settings, logger, llm)
+    firecrawl = firecrawl or make_firecrawl_client(settings)
+    store = make_store(settings, logger)
+
+    catalog = load_catalog(settings.catalog_path, logger)
 
     def n_research(state: WatchState) -> WatchState:
-        research = {}
-        for t in state["seed_titles"]:
-            research[t] = research_one(logger, llm, firecrawl, t, state["content_type"], max_pages=3)
-        return {"research": research}
+        # fingerprints stream out of research per title (or come from the store);
+        # the fingerprint node only fills gaps
+        research, fps = research_and_fingerprint(
+            logger, settings, llms["research"], firecrawl, store,
+            state["content_type"],
+            state["seed_titles"],
+            fingerprint_llm=llms["fingerprint"],
+        )
+        return {"research": research, "fingerprints": fps}
 
     def n_fingerprint(state: WatchState) -> WatchState:
-        fps = {}
-        for t in state["seed_titles"]:
-            ev = (state.get("research", {}) or {}).get(t, "")
-            if ev and len(ev) >= 400:
-                fps[t] = fingerprint_one(logger, llm, t, state["content_type"], ev)
-        return {"fingerprints": fps}
+        fps = dict(state.get("fingerprints", {}) or {})
+        research = state.get("research", {}) or {}
+        missing = {t: research.get(t, "") for t in state["seed_titles"] if t not in fps}
+        if missing:
+            new_fps = fingerprint_many(
+                logger, llms["fingerprint"], missing, state["content_type"],
+                max_workers=settings.research_workers,
+                llm_max_in_flight=settings.llm_max_in_flight,
+            )
+            for t, fp in new_fps.items():
+                fps[t] = fp
+                if store:
+                    store.put(t, state["content_type"], llms["fingerprint"].model, fp)
+        return {"fingerprints": {t: fps[t] for t in state["seed_titles"] if t in fps}}
 
     def n_taste(state: WatchState) -> WatchState:
         taste = taste_profile(
-            logger, llm,
+            logger, llms["taste"],
             state.get("fingerprints", {}),
             state["content_type"],
             state.get("extra_specs", "")
@@ -49,42 +153,59 @@ def build_graph(logger, settings):
         #logger.info(f"TASTE LENGTH: {len(json.dumps(state['taste']))}")
         
 
-        cand = propose_candidates(
-            logger, llm,
+        cand = gather_candidates(
+            logger, llms["candidates"],
             state["taste"],
             state["seed_titles"],
             state["content_type"],
             state.get("extra_specs", ""),
-            n=30
+            state.get("fingerprints", {}) or {},
+            index=store.index if store else None,
+            catalog=catalog,
+            source=settings.candidate_source,
+            n=30,
+            previous=state.get("candidates") or None,
+            fingerprint_model=llms["fingerprint"].model,
         )
         return {"candidates": cand}
 
     def n_curate(state: WatchState) -> WatchState:
         # curate from existing candidates; does NOT require new scraping.
-        curated = curate(
-            logger, llm,
+        shortlist = shortlist_candidates(
+            logger, state.get("candidates", []), state.get("fingerprints", {}) or {},
+            store=store, model=llms["fingerprint"].model, k=settings.curate_shortlist,
+            catalog=catalog, seed_titles=state["seed_titles"], content_type=state["content_type"],
+        )
+        curated = within_deadline(logger, "curate", lambda: curate(
+            logger, llms["curator"],
             state["taste"],
-            state.get("candidates", []),
+            shortlist,
             state["seed_titles"],
             state["content_type"],
             state.get("extra_specs", "")
-        )
+        ), lambda: fallback_curation(logger, shortlist))
         return {"curated": curated}
 
     def n_explain(state: WatchState) -> WatchState:
-        cards = explain(
-            logger, llm,
+        # under stream_run, cards go out to the caller one by one as the LLM writes them
+        on_card = None
+        if get_config().get("configurable", {}).get("stream_cards"):
+            writer = get_stream_writer()
+            on_card = lambda i, card: writer({"index": i, "card": card})
+        cards = within_deadline(logger, "explain", lambda: explain(
+            logger, llms["explain"],
             state["taste"],
             state["curated"],
             state["content_type"],
-            state.get("extra_specs", "")
-        )
+            state.get("extra_specs", ""),
+            on_card=on_card,
+        ), lambda: fallback_cards(logger, state["curated"]))
         #logger.info(f"CARDS LENGTH: {len(json.dumps(state['cards']))}")
         return {"cards": cards}
 
     def n_critic(state: WatchState) -> WatchState:
         critic_json = critique(
-            logger, llm,
+            logger, llms["critic"],
             content_type=state["content_type"],
             extra_specs=state.get("extra_specs", ""),
             seed_titles=state["seed_titles"],
@@ -96,7 +217,8 @@ def build_graph(logger, settings):
         return {"critic_feedback": critic_json, "critic_ran": True}
 
     def n_controller(state: WatchState) -> WatchState:
-        ctl = controller(logger, llm, dict(state))
+        ctl = within_deadline(logger, "controller", lambda: controller(logger, llms["controller"], dict(state)),
+                              lambda: {"action": "accept", "rationale": "run deadline reached"})
         action = ctl.get("action", "accept")
 
         # only one revise after critic
@@ -120,9 +242,12 @@ def build_graph(logger, settings):
 
     #Route after explain to either critic (only once) or controller 
     def route_after_explain(state: WatchState) -> str:
-        # Critic runs ONLY once
+        # Critic runs ONLY once, and is the first thing dropped when the run deadline is near
         if state.get("critic_ran", False):
             return "controller"
+        if deadline.expired(DEADLINE_RESERVE_S["critic"]):
+            logger.warning(f"[Graph] run deadline: skipping critic ({deadline.remaining():.1f}s left)")
+            return "controller"
         return "critic"
 
     #  Updated controller routing 
@@ -146,14 +271,14 @@ def build_graph(logger, settings):
         return END
 
     g = StateGraph(WatchState)
-    g.add_node("research", n_research)
-    g.add_node("fingerprint", n_fingerprint)
-    g.add_node("taste", n_taste)
-    g.add_node("candidates", n_candidates)
-    g.add_node("curate", n_curate)
-    g.add_node("explain", n_explain)
-    g.add_node("critic", n_critic)
-    g.add_node("controller", n_controller)
+    g.add_node("research", traced_node("research", n_research))
+    g.add_node("fingerprint", traced_node("fingerprint", n_fingerprint))
+    g.add_node("taste", traced_node("taste", n_taste))
+    g.add_node("candidates", traced_node("candidates", n_candidates))
+    g.add_node("curate", traced_node("curate", n_curate))
+    g.add_node("explain", traced_node("explain", n_explain))
+    g.add_node("critic", traced_node("critic", n_critic))
+    g.add_node("controller", traced_node("controller", n_controller))
 
     g.set_entry_point("research")
     g.add_edge("research", "fingerprint")
@@ -177,4 +302,4 @@ def build_graph(logger, settings):
         END: END
     })
 
-    return g.compile(), llm
+    return g.compile(checkpointer=checkpointer), llms["controller"]
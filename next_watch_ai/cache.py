@@ -0,0 +1,179 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class MemoryCache:
+    """
+    In-process LRU key/value cache (str -> str) with the same interface as SQLiteCache.
+    """
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl_s: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (value, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: str, ttl_s: Optional[float] = None) -> None:
+        ttl = self.ttl_s if ttl_s is None else ttl_s
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, size, None if ttl is None else time.time() + ttl)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+    def _drop(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        rate = (self.hits / total) if total else 0.0
+        return f"hits={self.hits} misses={self.misses} hit_rate={rate:.0%}"
+
+
+class SQLiteCache:
+    """
+    Small on-disk key/value cache (str -> str) backed by a single SQLite file.
+
+    - entries expire after their TTL (ttl_s=None means never)
+    - total stored bytes are capped at max_bytes; least recently used entries go first
+    - hits/misses are counted so callers can report them
+    Safe to share between threads.
+
+    Hits don't write: their access times are buffered and flushed with the next
+    set(), or once TOUCH_BATCH are pending or TOUCH_FLUSH_S has passed (a crash
+    loses at most those, which only steer eviction). The byte total is summed
+    once at open and kept up to date in memory afterwards.
+    """
+    TOUCH_BATCH = 64
+    TOUCH_FLUSH_S = 5.0
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, ttl_s: Optional[float] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}  # key -> accessed_at not yet written
+        self._flushed_at = time.monotonic()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " expires_at REAL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache(accessed_at)")
+        self._db.commit()
+        self._bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._delete(key)
+                self._db.commit()
+                self.misses += 1
+                return None
+            self._touched[key] = now
+            if len(self._touched) >= self.TOUCH_BATCH or time.monotonic() - self._flushed_at >= self.TOUCH_FLUSH_S:
+                self._flush_touched()
+                self._db.commit()
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: str, ttl_s: Optional[float] = None) -> None:
+        ttl = self.ttl_s if ttl_s is None else ttl_s
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._delete(key)
+            self._db.execute(
+                "INSERT INTO cache (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, None if ttl is None else now + ttl, now),
+            )
+            self._bytes += size
+            self._flush_touched()
+            self._evict(now)
+            self._db.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._delete(key)
+            self._db.commit()
+
+    def _delete(self, key: str) -> None:
+        self._touched.pop(key, None)
+        for (size,) in self._db.execute("DELETE FROM cache WHERE key = ? RETURNING size", (key,)).fetchall():
+            self._bytes -= size
+
+    def _flush_touched(self) -> None:
+        if self._touched:
+            self._db.executemany("UPDATE cache SET accessed_at = ? WHERE key = ?",
+                                 [(t, k) for k, t in self._touched.items()])
+            self._touched.clear()
+        self._flushed_at = time.monotonic()
+
+    def _evict(self, now: float) -> None:
+        if self._bytes <= self.max_bytes:
+            return
+        for (size,) in self._db.execute(
+                "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ? RETURNING size", (now,)).fetchall():
+            self._bytes -= size
+        if self._bytes <= self.max_bytes:
+            return
+        for key, size in self._db.execute("SELECT key, size FROM cache ORDER BY accessed_at ASC").fetchall():
+            self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._bytes -= size
+            if self._bytes <= self.max_bytes:
+                break
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        rate = (self.hits / total) if total else 0.0
+        return f"hits={self.hits} misses={self.misses} hit_rate={rate:.0%}"
@@ -0,0 +1,248 @@
+import csv
+import os
+import re
+import sys
+import threading
+import time
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from next_watch_ai.titles import normalize_title, split_year
+
+# catalog type column -> our content_type; anything else (episodes, shorts, games) is skipped
+TYPE_MAP = {
+    "movie": "movie", "tvMovie": "movie", "film": "movie",
+    "tvSeries": "tv", "tvMiniSeries": "tv", "tv": "tv", "series": "tv",
+}
+
+_ARTICLE_RE = re.compile(r"^(the|a|an) ")
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    id: str
+    title: str
+    year: Optional[int]
+    content_type: str  # "movie" | "tv"
+    votes: int = 0
+    genres: Tuple[str, ...] = ()
+
+    @property
+    def display_title(self) -> str:
+        """Title with its year, so same-named films stay distinct: 'Parasite (2019)'."""
+        return f"{self.title} ({self.year})" if self.year else self.title
+
+
+def title_key(title: str) -> str:
+    """Lookup key: normalized, year suffix and leading article removed."""
+    return _ARTICLE_RE.sub("", normalize_title(split_year(title)[0]))
+
+def _trigrams(key: str) -> set:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def _genres(value: Any) -> Tuple[str, ...]:
+    # "Crime,Drama" in title.basics (\N when unknown); ',' or '|' in the simple layout
+    if not isinstance(value, str):
+        return ()
+    return tuple(g.strip().lower() for g in re.split(r"[,|]", value) if g.strip() and g.strip() != "\\N")
+
+def _read_rows(path: str) -> Iterator[Dict[str, Any]]:
+    if path.endswith(".parquet"):
+        import pandas as pd  # optional: only needed for Parquet dumps
+        yield from pd.read_parquet(path).to_dict("records")
+        return
+    csv.field_size_limit(sys.maxsize)
+    opener = open
+    if path.endswith(".gz"):
+        import gzip
+        opener = gzip.open
+    with opener(path, "rt", encoding="utf-8", newline="") as f:
+        yield from csv.DictReader(f, delimiter="\t", quoting=csv.QUOTE_NONE)
+
+def ratings_path_for(path: str) -> Optional[str]:
+    """IMDb's title.ratings dump next to a title.basics one, if present."""
+    if not os.path.basename(path).startswith("title.basics"):
+        return None
+    for name in ("title.ratings.tsv.gz", "title.ratings.tsv"):
+        candidate = os.path.join(os.path.dirname(path), name)
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+def read_votes(path: str) -> Dict[str, int]:
+    """tconst -> numVotes from an IMDb title.ratings dump."""
+    return {str(row["tconst"]): _int(row.get("numVotes")) or 0 for row in _read_rows(path)}
+
+def parse_rows(rows: Iterable[Dict[str, Any]],
+               votes: Optional[Dict[str, int]] = None) -> Iterator[Tuple[CatalogEntry, List[str]]]:
+    """
+    Accepts IMDb title.basics layout (tconst, titleType, primaryTitle, originalTitle,
+    startYear, isAdult, genres[, numVotes]) or a simple id/title/year/type[/aliases/
+    votes/genres] layout with '|'-separated aliases. title.basics has no votes; pass `votes`
+    (from title.ratings) to fill them in. Yields (entry, alternative titles).
+    """
+    votes = votes or {}
+    for row in rows:
+        ctype = TYPE_MAP.get(str(row.get("titleType") or row.get("type") or ""))
+        title = str(row.get("primaryTitle") or row.get("title") or "").strip()
+        if not ctype or not title or str(row.get("isAdult", "0")) == "1":
+            continue
+        aliases = [str(a).strip() for a in str(row.get("aliases") or "").split("|") if str(a).strip()]
+        original = str(row.get("originalTitle") or "").strip()
+        if original and original != title:
+            aliases.append(original)
+        entry_id = str(row.get("tconst") or row.get("id"))
+        entry = CatalogEntry(
+            id=entry_id,
+            title=title,
+            year=_int(row.get("startYear", row.get("year"))),
+            content_type=ctype,
+            votes=_int(row.get("numVotes", row.get("votes"))) or votes.get(entry_id, 0),
+            genres=_genres(row.get("genres")),
+        )
+        yield entry, aliases
+
+
+class TitleCatalog:
+    """
+    Offline title catalog. Exact lookups go through a normalized-key dict; misses
+    fall back to a trigram index scored by Dice similarity. The index is built on
+    the first fuzzy lookup (seconds on a full IMDb dump) and each fuzzy lookup
+    then costs a few to a few tens of milliseconds.
+    """
+    def __init__(self, rows: Iterable[Tuple[CatalogEntry, List[str]]], min_similarity: float = 0.7):
+        self.min_similarity = min_similarity
+        self.entries: List[CatalogEntry] = []
+        self._key_ids: Dict[str, int] = {}
+        self._keys: List[str] = []
+        self._key_entries: List[List[int]] = []
+        self._trigram_index: Optional[Dict[str, array]] = None
+        self._trigram_counts: Optional[array] = None
+        self._lock = threading.Lock()
+
+        for entry, aliases in rows:
+            idx = len(self.entries)
+            self.entries.append(entry)
+            for name in {title_key(entry.title), *(title_key(a) for a in aliases)}:
+                if not name:
+                    continue
+                kid = self._key_ids.get(name)
+                if kid is None:
+                    kid = self._key_ids[name] = len(self._keys)
+                    self._keys.append(name)
+                    self._key_entries.append([])
+                self._key_entries[kid].append(idx)
+
+    @classmethod
+    def from_file(cls, path: str, ratings_path: Optional[str] = None, **kwargs) -> "TitleCatalog":
+        votes = read_votes(ratings_path) if ratings_path else None
+        return cls(parse_rows(_read_rows(path), votes), **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _build_trigrams(self) -> None:
+        with self._lock:
+            if self._trigram_index is not None:
+                return
+            index: Dict[str, array] = {}
+            counts = array("H")
+            for kid, key in enumerate(self._keys):
+                grams = _trigrams(key)
+                counts.append(min(len(grams), 65535))
+                for g in grams:
+                    postings = index.get(g)
+                    if postings is None:
+                        postings = index[g] = array("I")
+                    postings.append(kid)
+            self._trigram_counts = counts
+            self._trigram_index = index
+
+    def _fuzzy(self, key: str, max_postings: int = 50000) -> List[int]:
+        if self._trigram_index is None:
+            self._build_trigrams()
+        grams = _trigrams(key)
+        postings = sorted((self._trigram_index.get(g, ()) for g in grams), key=len)
+        # very common trigrams ("the", " a ") add cost but little signal; skip them when others exist
+        useful = [p for p in postings if len(p) <= max_postings] or postings[:1]
+        hits = Counter()
+        for p in useful:
+            hits.update(p)
+        best_kid, best_score = None, 0.0
+        for kid, shared in hits.most_common(200):
+            score = 2 * shared / (len(grams) + self._trigram_counts[kid])
+            if score > best_score:
+                best_kid, best_score = kid, score
+        if best_kid is None or best_score < self.min_similarity:
+            return []
+        return self._key_entries[best_kid]
+
+    def resolve(self, title: str, content_type: Optional[str] = None) -> Optional[CatalogEntry]:
+        """
+        Free-text title -> best catalog entry, or None. A year in the text and a
+        content_type ("movie"/"tv"; "both" means no preference) break ties,
+        then popularity (votes). None too when the match is ambiguous (two best
+        entries tie, e.g. same-named films and no votes to tell them apart) or
+        the text's year matches no entry, so the caller keeps the raw title.
+        """
+        _, year = split_year(title)
+        key = title_key(title)
+        if not key:
+            return None
+        kid = self._key_ids.get(key)
+        ids = self._key_entries[kid] if kid is not None else self._fuzzy(key)
+        if not ids:
+            return None
+        prefer_type = content_type if content_type in ("movie", "tv") else None
+
+        def rank(i: int):
+            e = self.entries[i]
+            year_match = year is not None and e.year is not None and abs(e.year - year) <= 1
+            return (year_match, prefer_type is not None and e.content_type == prefer_type, e.votes)
+
+        ranked = sorted(ids, key=rank, reverse=True)
+        best = rank(ranked[0])
+        if year is not None and not best[0] and self.entries[ranked[0]].year is not None:
+            return None
+        if len(ranked) > 1 and rank(ranked[1]) == best:
+            return None
+        return self.entries[ranked[0]]
+
+
+_catalogs: Dict[str, Optional[TitleCatalog]] = {}
+_catalogs_lock = threading.Lock()
+
+def load_catalog(path: str, logger=None) -> Optional[TitleCatalog]:
+    """Process-wide catalog per path; None (with a warning) if the path is unset or unreadable."""
+    if not path:
+        return None
+    with _catalogs_lock:
+        if path not in _catalogs:
+            catalog = None
+            if not os.path.exists(path):
+                if logger:
+                    logger.warning(f"[Catalog] {path} not found; candidates are deduped by title only")
+            else:
+                t0 = time.monotonic()
+                ratings = ratings_path_for(path)
+                try:
+                    catalog = TitleCatalog.from_file(path, ratings_path=ratings)
+                except Exception as e:
+                    if logger:
+                        logger.warning(f"[Catalog] failed to load {path} | {type(e).__name__}: {e}")
+                else:
+                    if logger:
+                        logger.info(f"[Catalog] loaded {len(catalog)} titles from {path} "
+                                    f"(votes from {ratings or 'none'}) in {time.monotonic() - t0:.1f}s")
+            _catalogs[path] = catalog
+        return _catalogs[path]
@@ -0,0 +1,23 @@
+import os
+import sqlite3
+
+
+def make_checkpointer(path: str, logger=None):
+    """
+    LangGraph checkpointer for WatchState sessions.
+    SQLite-backed (survives restarts) when langgraph-checkpoint-sqlite is installed
+    and a path is given; otherwise in-memory for the life of the process.
+    """
+    if path:
+        try:
+            from langgraph.checkpoint.sqlite import SqliteSaver
+        except ImportError:
+            if logger:
+                logger.warning("[Checkpoints] langgraph-checkpoint-sqlite not installed; sessions are in-memory only")
+        else:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            return SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+
+    from langgraph.checkpoint.memory import InMemorySaver
+    return InMemorySaver()
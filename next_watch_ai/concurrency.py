@@ -0,0 +1,85 @@
+import contextvars
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence
+
+
+class BoundedLLM:
+    """
+    Wraps an LLM client so at most `limit` chat calls are in flight at once.
+    Anything other than chat() is passed through to the wrapped client.
+    """
+    def __init__(self, llm, limit: int = 1, semaphore: Optional[threading.Semaphore] = None):
+        self.llm = llm
+        self._sem = semaphore or threading.BoundedSemaphore(max(1, limit))
+
+    def chat(self, *args, **kwargs) -> str:
+        with self._sem:
+            return self.llm.chat(*args, **kwargs)
+
+    def sharing(self, llm) -> "BoundedLLM":
+        """`llm` bounded by this same limit: calls through either count against it."""
+        return BoundedLLM(llm, semaphore=self._sem)
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+
+class BoundedFirecrawl:
+    """
+    Wraps a Firecrawl client so at most `limit` scrape calls are in flight at once.
+    """
+    def __init__(self, firecrawl, limit: int):
+        self.firecrawl = firecrawl
+        self._sem = threading.BoundedSemaphore(max(1, limit))
+
+    def scrape(self, *args, **kwargs):
+        with self._sem:
+            return self.firecrawl.scrape(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.firecrawl, name)
+
+
+def submit_in_context(pool: Executor, fn: Callable, *args, **kwargs) -> Future:
+    """pool.submit that carries the caller's contextvars (run trace, current node) into the worker."""
+    ctx = contextvars.copy_context()
+    return pool.submit(ctx.run, fn, *args, **kwargs)
+
+
+def map_ordered(
+    fn: Callable[[Any], Any],
+    items: Sequence[Any],
+    max_workers: int,
+    logger=None,
+    label: str = "Concurrency",
+    default: Any = None,
+    on_result: Optional[Callable[[Any, Any], None]] = None,
+) -> List[Any]:
+    """
+    Run fn over items on a thread pool and return results in input order.
+    A failing item is logged and replaced by `default`; it never fails the batch.
+    on_result(item, result) fires as each item finishes (completion order).
+    """
+    results: List[Any] = [default] * len(items)
+
+    def run(i: int):
+        item = items[i]
+        try:
+            results[i] = fn(item)
+        except Exception as e:
+            if logger:
+                logger.warning(f"[{label}] failed for {item!r} | {type(e).__name__}: {e}")
+            results[i] = default
+        if on_result:
+            on_result(item, results[i])
+
+    if max_workers <= 1 or len(items) <= 1:
+        for i in range(len(items)):
+            run(i)
+        return results
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+        for fut in [submit_in_context(pool, run, i) for i in range(len(items))]:
+            fut.result()
+    return results
@@ -10,13 +10,79 @@ class Settings:
     groq_api_key: str
     groq_model: str = "llama-3.1-8b-instant"#"llama-3.3-70b-versatile"
     log_level: str = "INFO"
+    # per-agent model routing (see next_watch_ai/routing.py): tier models default to
+    # groq_model; MODEL_ROUTES is inline JSON or a JSON file path with per-agent overrides
+    groq_fast_model: str = ""
+    groq_quality_model: str = ""
+    model_routes: str = ""
+    # Groq rate limiting shared by every client in the process (0 disables a bucket);
+    # groq_max_in_flight is the process-wide cap across every run and session
+    groq_rpm: int = 30
+    groq_tpm: int = 0
+    groq_max_in_flight: int = 8
+    groq_max_retries: int = 4
+    # per-request LLM timeout (0 = client default); with llm_hedge, a request slower than
+    # the calling agent's observed p95 gets a duplicate and the first answer wins
+    llm_timeout_s: float = 60.0
+    llm_hedge: bool = False
+    # overall budget for one run (0 = none): past it the curator, explanation cards,
+    # critic and controller degrade to cheaper fallbacks instead of waiting on the LLM
+    run_deadline_s: float = 180.0
+    # research concurrency (research_workers=1 keeps the old sequential behaviour);
+    # llm_max_in_flight caps one run's research + fingerprint calls together and is
+    # clamped to groq_max_in_flight, which every run shares
+    research_workers: int = 5
+    llm_max_in_flight: int = 4
+    scrape_max_in_flight: int = 6
+    # start each title's fingerprint as soon as its research finishes
+    stream_fingerprints: bool = True
+    # speculative parallel scraping inside scrape_bundle (scrape_parallel<=1 is sequential)
+    scrape_parallel: int = 3
+    scrape_url_timeout: float = 20.0
+    scrape_deadline: float = 45.0
+    # on-disk scrape cache (empty path disables it)
+    scrape_cache_path: str = "cache/scrape.sqlite"
+    scrape_cache_ttl_hours: float = 168.0
+    scrape_cache_max_mb: int = 256
+    # LLM response cache: "memory", "disk" or "off"
+    llm_cache: str = "disk"
+    llm_cache_path: str = "cache/llm.sqlite"
+    llm_cache_max_mb: int = 64
+    llm_cache_all_temperatures: bool = False
+    # fingerprints reused across runs (empty path disables the store)
+    fingerprint_store_path: str = "cache/fingerprints.sqlite"
+    # offline title catalog (IMDb title.basics TSV or Parquet) for candidate dedup; empty disables it
+    catalog_path: str = ""
+    # nearest-neighbour index over stored fingerprints (empty path disables it) and where
+    # candidates come from: "llm", "index" (LLM only when the index is too thin) or "hybrid"
+    vector_index_path: str = "cache/fingerprint_index"
+    candidate_source: str = "hybrid"
+    # candidates pre-ranked (taste similarity + MMR) before the curator sees them; 0 disables
+    curate_shortlist: int = 15
+    # whole-run result cache (empty path disables it); stale hours > 0 enables
+    # stale-while-revalidate: serve the old cards, refresh in the background
+    run_cache_path: str = "cache/runs.sqlite"
+    run_cache_ttl_hours: float = 24.0
+    run_cache_stale_hours: float = 0.0
+    run_cache_max_mb: int = 32
+    # serve mode: sessions running at once, and how many more may wait before requests are refused
+    serve_max_sessions: int = 8
+    serve_max_queue: int = 32
+    # LangGraph session checkpoints (empty path keeps them in memory)
+    checkpoint_path: str = "cache/checkpoints.sqlite"
+    # record/replay of LLM + scrape traffic: "" (off), "record" or "replay"
+    replay_mode: str = ""
+    replay_path: str = "logs/replay.jsonl.gz"
 
 def load_settings() -> Settings:
     firecrawl = os.getenv("FIRECRAWL_API_KEY", "").strip()
     groq = os.getenv("GROQ_API_KEY", "").strip()
-    if not firecrawl:
+    replay_mode = os.getenv("REPLAY_MODE", "").strip().lower()
+    groq_max_in_flight = int(os.getenv("GROQ_MAX_IN_FLIGHT", "8"))
+    # replaying a recording makes no network calls, so keys are optional
+    if not firecrawl and replay_mode != "replay":
         raise RuntimeError("Missing FIRECRAWL_API_KEY in environment (.env).")
-    if not groq:
+    if not groq and replay_mode != "replay":
         raise RuntimeError("Missing GROQ_API_KEY in environment (.env).")
 
     return Settings(
@@ -24,4 +90,45 @@ def load_settings() -> Settings:
         groq_api_key=groq,
         groq_model=os.getenv("GROQ_MODEL", "llama-3.1-8b-instant").strip(),
         log_level=os.getenv("LOG_LEVEL", "INFO").strip().upper(),
+        groq_fast_model=os.getenv("GROQ_FAST_MODEL", "").strip(),
+        groq_quality_model=os.getenv("GROQ_QUALITY_MODEL", "").strip(),
+        model_routes=os.getenv("MODEL_ROUTES", "").strip(),
+        groq_rpm=int(os.getenv("GROQ_RPM", "30")),
+        groq_tpm=int(os.getenv("GROQ_TPM", "0")),
+        groq_max_in_flight=groq_max_in_flight,
+        groq_max_retries=int(os.getenv("GROQ_MAX_RETRIES", "4")),
+        llm_timeout_s=float(os.getenv("LLM_TIMEOUT_S", "60")),
+        llm_hedge=os.getenv("LLM_HEDGE", "").strip().lower() in ("1", "true", "yes"),
+        run_deadline_s=float(os.getenv("RUN_DEADLINE_S", "180")),
+        research_workers=int(os.getenv("RESEARCH_WORKERS", "5")),
+        # a run can't have more calls in flight than the process allows
+        llm_max_in_flight=min(int(os.getenv("LLM_MAX_IN_FLIGHT", "4")), max(1, groq_max_in_flight)),
+        scrape_max_in_flight=int(os.getenv("SCRAPE_MAX_IN_FLIGHT", "6")),
+        stream_fingerprints=os.getenv("STREAM_FINGERPRINTS", "1").strip().lower() in ("1", "true", "yes"),
+        # recording and replaying scrape sequentially: with parallel fetching, which URLs make it
+        # into the evidence (and so into every later prompt) depends on timing, and replays miss
+        scrape_parallel=1 if replay_mode else int(os.getenv("SCRAPE_PARALLEL", "3")),
+        scrape_url_timeout=float(os.getenv("SCRAPE_URL_TIMEOUT", "20")),
+        scrape_deadline=float(os.getenv("SCRAPE_DEADLINE", "45")),
+        scrape_cache_path=os.getenv("SCRAPE_CACHE_PATH", "cache/scrape.sqlite").strip(),
+        scrape_cache_ttl_hours=float(os.getenv("SCRAPE_CACHE_TTL_HOURS", "168")),
+        scrape_cache_max_mb=int(os.getenv("SCRAPE_CACHE_MAX_MB", "256")),
+        llm_cache=os.getenv("LLM_CACHE", "disk").strip().lower(),
+        llm_cache_path=os.getenv("LLM_CACHE_PATH", "cache/llm.sqlite").strip(),
+        llm_cache_max_mb=int(os.getenv("LLM_CACHE_MAX_MB", "64")),
+        llm_cache_all_temperatures=os.getenv("LLM_CACHE_ALL_TEMPERATURES", "").strip().lower() in ("1", "true", "yes"),
+        fingerprint_store_path=os.getenv("FINGERPRINT_STORE_PATH", "cache/fingerprints.sqlite").strip(),
+        catalog_path=os.getenv("CATALOG_PATH", "").strip(),
+        vector_index_path=os.getenv("VECTOR_INDEX_PATH", "cache/fingerprint_index").strip(),
+        candidate_source=os.getenv("CANDIDATE_SOURCE", "hybrid").strip().lower(),
+        curate_shortlist=int(os.getenv("CURATE_SHORTLIST", "15")),
+        run_cache_path=os.getenv("RUN_CACHE_PATH", "cache/runs.sqlite").strip(),
+        run_cache_ttl_hours=float(os.getenv("RUN_CACHE_TTL_HOURS", "24")),
+        run_cache_stale_hours=float(os.getenv("RUN_CACHE_STALE_HOURS", "0")),
+        run_cache_max_mb=int(os.getenv("RUN_CACHE_MAX_MB", "32")),
+        serve_max_sessions=int(os.getenv("SERVE_MAX_SESSIONS", "8")),
+        serve_max_queue=int(os.getenv("SERVE_MAX_QUEUE", "32")),
+        checkpoint_path=os.getenv("CHECKPOINT_PATH", "cache/checkpoints.sqlite").strip(),
+        replay_mode=replay_mode,
+        replay_path=os.getenv("REPLAY_PATH", "logs/replay.jsonl.gz").strip(),
     )
@@ -0,0 +1,46 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# absolute time.monotonic() by which the current run should finish (None = no deadline)
+_deadline: ContextVar[Optional[float]] = ContextVar("next_watch_deadline", default=None)
+
+# an LLM call never gets less than this, so stages that can't be skipped still get a short try
+MIN_CALL_TIMEOUT_S = 5.0
+
+
+@contextmanager
+def run_deadline(seconds: Optional[float]):
+    """
+    Give the run started inside this block `seconds` to finish (<= 0 or None: no deadline).
+    Like the run trace, it follows the context into graph nodes and submit_in_context workers.
+    A deadline already set by an outer block is kept if it is earlier.
+    """
+    deadline = time.monotonic() + seconds if seconds and seconds > 0 else None
+    outer = _deadline.get()
+    if outer is not None and (deadline is None or outer < deadline):
+        deadline = outer
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining() -> Optional[float]:
+    """Seconds left before the run deadline (negative once past it), or None without one."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+def expired(reserve_s: float = 0.0) -> bool:
+    """True when less than `reserve_s` seconds are left, i.e. a step that needs that long should be skipped."""
+    left = remaining()
+    return left is not None and left < reserve_s
+
+def call_timeout(timeout_s: Optional[float]) -> Optional[float]:
+    """Per-call timeout: `timeout_s`, cut to the time left in the run (never below MIN_CALL_TIMEOUT_S)."""
+    left = remaining()
+    if left is None:
+        return timeout_s
+    left = max(left, MIN_CALL_TIMEOUT_S)
+    return left if not timeout_s else min(timeout_s, left)
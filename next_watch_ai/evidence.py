@@ -0,0 +1,193 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z]+")
+_IMAGE_RE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_LINK_RE = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+_BARE_URL_RE = re.compile(r"https?://\S+")
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*)$")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+_SUFFIXES = ("ations", "ation", "ings", "ing", "ions", "ion", "ers", "er", "ors", "or",
+             "ies", "ed", "ly", "s", "y", "al")
+STOPWORDS = frozenset("""
+a an and are as at be been but by for from has have he her his in into is it its of on or
+she that the their them they this to was were which while who will with not also only
+""".split())
+
+CHUNK_CHARS = 800
+MIN_CHUNK_CHARS = 120
+
+# what research evidence is ranked against: the fingerprint schema's field names and
+# enum values (keep in step with agents/fingerprint_agent.FINGERPRINT_SCHEMA_HINT),
+# plus the words reviews use for craft and reception
+EVIDENCE_QUERY = (
+    "authorship voice director style screenwriter style cinematography style editing style"
+    " narrative architecture structure inciting incident timing pacing slow moderate fast"
+    " ending ambiguous resolved ironic circular conflict internal external mixed"
+    " themes subtext primary themes motifs worldview bleak hopeful mixed moral stance compassionate cynical neutral"
+    " style tone realism stylized humor style deadpan dark broad dread style psychological cosmic social bodily"
+    " performance style naturalistic theatrical dialogue density narrative mode linear nonlinear elliptical"
+    " intensity curve gradual spiky constant"
+    " directed director written screenplay cinematographer camera shot lighting score music"
+    " editing performance acting tone mood atmosphere visual reception critics critical praised review"
+    " influence inspired genre structure"
+)
+
+
+def _stem(word: str) -> str:
+    for suf in _SUFFIXES:
+        if word.endswith(suf) and len(word) - len(suf) >= 4:
+            return word[:-len(suf)]
+    return word
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(w) for w in _TOKEN_RE.findall(text.lower()) if len(w) > 2 and w not in STOPWORDS]
+
+
+def _clean(md: str) -> str:
+    md = _IMAGE_RE.sub("", md)
+    md = _LINK_RE.sub(r"\1", md)
+    return _BARE_URL_RE.sub("", md)
+
+def _is_boilerplate(raw: str) -> bool:
+    # navigation menus, link lists, tables and infobox rows: mostly markup, few sentences
+    lines = [l for l in raw.splitlines() if l.strip()]
+    if not lines:
+        return True
+    links = raw.count("](")
+    listy = sum(1 for l in lines if l.lstrip().startswith(("*", "-", "|", "+")))
+    words = len(_TOKEN_RE.findall(_clean(raw).lower()))
+    return links * 4 > words or (listy / len(lines) > 0.6 and words / len(lines) < 12)
+
+def _split_long(text: str, max_chars: int) -> List[str]:
+    if len(text) <= max_chars:
+        return [text]
+    pieces, cur = [], ""
+    for sentence in _SENTENCE_END_RE.split(text):
+        if cur and len(cur) + len(sentence) + 1 > max_chars:
+            pieces.append(cur)
+            cur = sentence
+        else:
+            cur = f"{cur} {sentence}" if cur else sentence
+    if cur:
+        pieces.append(cur)
+    return pieces
+
+def chunk_markdown(md: str, max_chars: int = CHUNK_CHARS) -> List[Tuple[str, str]]:
+    """
+    Split page markdown into (heading, paragraph) chunks, dropping boilerplate.
+    Short paragraphs are merged with the next one under the same heading.
+    """
+    chunks: List[Tuple[str, str]] = []
+    heading, buf = "", ""
+
+    def flush():
+        nonlocal buf
+        if buf:
+            for piece in _split_long(buf, max_chars):
+                chunks.append((heading, piece))
+        buf = ""
+
+    for raw in re.split(r"\n\s*\n", md or ""):
+        raw = raw.strip()
+        if not raw:
+            continue
+        m = _HEADING_RE.match(raw.splitlines()[0])
+        if m:
+            flush()
+            heading = _clean(m.group(2)).strip(" #*")
+            raw = "\n".join(raw.splitlines()[1:]).strip()
+            if not raw:
+                continue
+        if _is_boilerplate(raw):
+            continue
+        text = " ".join(_clean(raw).split())
+        if not text:
+            continue
+        buf = f"{buf} {text}" if buf else text
+        if len(buf) >= MIN_CHUNK_CHARS:
+            flush()
+    flush()
+    return chunks
+
+
+def bm25_scores(docs: Sequence[List[str]], query: Iterable[str], k1: float = 1.5, b: float = 0.75) -> List[float]:
+    n = len(docs)
+    if not n:
+        return []
+    avgdl = sum(len(d) for d in docs) / n or 1.0
+    df = Counter(t for d in docs for t in set(d))
+    terms = set(query)
+    scores = []
+    for d in docs:
+        tf = Counter(d)
+        norm = k1 * (1 - b + b * len(d) / avgdl)
+        s = 0.0
+        for t in terms:
+            if t in tf:
+                idf = math.log(1 + (n - df[t] + 0.5) / (df[t] + 0.5))
+                s += idf * tf[t] * (k1 + 1) / (tf[t] + norm)
+        scores.append(s)
+    return scores
+
+
+def _shingles(tokens: List[str], n: int = 4) -> set:
+    if len(tokens) < n:
+        return {tuple(tokens)}
+    return {tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1)}
+
+def _near_duplicate(a: set, b: set, threshold: float) -> bool:
+    return bool(a and b) and len(a & b) / len(a | b) >= threshold
+
+
+def pack_evidence(
+    pages: List[Tuple[str, str]],
+    query: str,
+    total_chars: int = 9000,
+    per_source_chars: Optional[int] = None,
+    dedup_threshold: float = 0.5,
+) -> str:
+    """
+    Build a research bundle from (url, markdown) pages: chunk every page, rank
+    chunks with BM25 against `query` (heading words count double), drop
+    near-duplicates across sources, and greedily pack the best chunks into
+    total_chars. Output keeps the 'SOURCE: url' layout, sources in page order
+    and chunks in page order within a source.
+    """
+    items = []  # (page index, chunk index, text, tokens)
+    for p, (_, md) in enumerate(pages):
+        for c, (heading, text) in enumerate(chunk_markdown(md)):
+            items.append((p, c, text, tokenize(heading) * 2 + tokenize(text)))
+    if not items:
+        return ""
+
+    scores = bm25_scores([it[3] for it in items], set(tokenize(query)))
+    order = sorted(range(len(items)), key=lambda i: (-scores[i], items[i][0], items[i][1]))
+
+    picked: Dict[int, List[int]] = {}
+    used = {p: 0 for p in range(len(pages))}
+    kept_shingles: List[set] = []
+    total = 0
+    for i in order:
+        p, _, text, tokens = items[i]
+        cost = len(text) + 2 + (0 if p in picked else len(pages[p][0]) + 10)
+        if total + cost > total_chars:
+            continue
+        if per_source_chars is not None and used[p] + len(text) > per_source_chars:
+            continue
+        sh = _shingles(tokens)
+        if any(_near_duplicate(sh, k, dedup_threshold) for k in kept_shingles):
+            continue
+        kept_shingles.append(sh)
+        picked.setdefault(p, []).append(i)
+        used[p] += len(text)
+        total += cost
+
+    blocks = []
+    for p in sorted(picked):
+        body = "\n\n".join(items[i][2] for i in sorted(picked[p], key=lambda i: items[i][1]))
+        blocks.append(f"SOURCE: {pages[p][0]}\n{body}")
+    return "\n\n".join(blocks)
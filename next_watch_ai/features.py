@@ -0,0 +1,215 @@
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from next_watch_ai.evidence import tokenize
+
+# Mirrors the enums of FINGERPRINT_SCHEMA_HINT (agents/fingerprint_agent.py); bump
+# FEATURE_VERSION whenever this layout changes so persisted vectors are rebuilt.
+FEATURE_VERSION = 1
+
+CATEGORICAL: List[Tuple[str, str, List[str]]] = [
+    ("narrative_architecture", "inciting_incident_timing", ["early", "mid", "late"]),
+    ("narrative_architecture", "pacing", ["slow", "moderate", "fast"]),
+    ("narrative_architecture", "ending_type", ["ambiguous", "resolved", "ironic", "circular"]),
+    ("narrative_architecture", "conflict_type", ["internal", "external", "mixed"]),
+    ("themes_subtext", "worldview", ["bleak", "hopeful", "mixed"]),
+    ("themes_subtext", "moral_stance", ["compassionate", "cynical", "neutral"]),
+    ("style_tone", "humor_style", ["none", "deadpan", "dark", "broad"]),
+    ("style_tone", "dread_style", ["psychological", "cosmic", "social", "bodily"]),
+    ("style_tone", "performance_style", ["naturalistic", "theatrical"]),
+    ("extras", "dialogue_density", ["low", "med", "high"]),
+    ("extras", "narrative_mode", ["linear", "nonlinear", "elliptical"]),
+    ("extras", "intensity_curve", ["gradual", "spiky", "constant"]),
+]
+NUMERIC: List[Tuple[str, str]] = [("style_tone", "realism_vs_stylized")]
+# free-text fields are feature-hashed into one bag-of-words block
+TEXT: List[Tuple[str, str]] = [
+    ("authorship_voice", "director_style"),
+    ("authorship_voice", "screenwriter_style"),
+    ("authorship_voice", "cinematography_style"),
+    ("authorship_voice", "editing_style"),
+    ("narrative_architecture", "structure_type"),
+    ("themes_subtext", "primary_themes"),
+    ("themes_subtext", "motifs"),
+]
+TEXT_DIMS = 64
+
+FEATURE_DIM = sum(len(v) for _, _, v in CATEGORICAL) + len(NUMERIC) + TEXT_DIMS
+
+
+def _field(fp: Dict[str, Any], section: str, name: str, low: set) -> Any:
+    if section in low or name in low or f"{section}.{name}" in low:
+        return None
+    block = fp.get(section)
+    return block.get(name) if isinstance(block, dict) else None
+
+def encode_fingerprint(fp: Dict[str, Any]) -> np.ndarray:
+    """
+    Fixed-length float32 vector: one-hot blocks for the enum fields, the numeric
+    fields, and a hashed bag of words over the style/theme lists. Missing, unknown
+    or low-confidence fields are NaN so aggregates can ignore them.
+    """
+    vec = np.full(FEATURE_DIM, np.nan, dtype=np.float32)
+    low = set(((fp or {}).get("confidence") or {}).get("low_confidence_fields") or [])
+    i = 0
+    for section, name, values in CATEGORICAL:
+        value = _field(fp, section, name, low)
+        if isinstance(value, str) and value.strip().lower() in values:
+            vec[i:i + len(values)] = 0.0
+            vec[i + values.index(value.strip().lower())] = 1.0
+        i += len(values)
+    for section, name in NUMERIC:
+        value = _field(fp, section, name, low)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            vec[i] = min(1.0, max(0.0, float(value)))
+        i += 1
+
+    words: List[str] = []
+    for section, name in TEXT:
+        value = _field(fp, section, name, low)
+        for text in (value if isinstance(value, list) else [value]):
+            if isinstance(text, str):
+                words.extend(tokenize(text))
+    if words:
+        bag = np.zeros(TEXT_DIMS, dtype=np.float32)
+        for w in words:
+            bag[zlib.crc32(w.encode("utf-8")) % TEXT_DIMS] += 1.0
+        vec[i:i + TEXT_DIMS] = bag / np.linalg.norm(bag)
+    return vec
+
+def encode_many(fps: Sequence[Dict[str, Any]]) -> np.ndarray:
+    if not fps:
+        return np.zeros((0, FEATURE_DIM), dtype=np.float32)
+    return np.stack([encode_fingerprint(fp) for fp in fps])
+
+
+def taste_stats(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """NaN-aware (centroid, variance, observed count) per feature over the seed vectors."""
+    mask = ~np.isnan(matrix)
+    count = mask.sum(axis=0)
+    filled = np.where(mask, matrix, 0.0)
+    denom = np.maximum(count, 1)
+    centroid = filled.sum(axis=0) / denom
+    variance = (np.where(mask, matrix - centroid, 0.0) ** 2).sum(axis=0) / denom
+    return centroid.astype(np.float32), variance.astype(np.float32), count
+
+def feature_weights(variance: np.ndarray, count: np.ndarray) -> np.ndarray:
+    # features the seeds agree on matter most; never-observed features not at all
+    return np.where(count > 0, 1.0 / (variance + 0.05), 0.0).astype(np.float32)
+
+def taste_similarity(matrix: np.ndarray, centroid: np.ndarray, weights: np.ndarray,
+                     min_coverage: float = 0.25) -> np.ndarray:
+    """
+    Similarity in [0, 1] of every row to the taste centroid (one weighted distance
+    over the whole matrix). Rows observing less than `min_coverage` of the weight
+    are NaN: not enough known about them to score.
+    """
+    mask = ~np.isnan(matrix)
+    w = mask * weights
+    covered = w.sum(axis=1)
+    dist = (w * np.where(mask, matrix - centroid, 0.0) ** 2).sum(axis=1) / np.maximum(covered, 1e-9)
+    sim = 1.0 / (1.0 + 4.0 * dist)
+    sim[covered < min_coverage * weights.sum()] = np.nan
+    return sim
+
+
+def mmr_order(relevance: np.ndarray, vectors: np.ndarray, k: int, lam: float = 0.7) -> List[int]:
+    """
+    Maximal marginal relevance: repeatedly take the row maximizing
+    lam * relevance - (1 - lam) * (max cosine similarity to rows already taken).
+    Zero rows (nothing known) carry no redundancy penalty.
+    """
+    n = len(relevance)
+    k = min(k, n)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit = np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+    sims = unit @ unit.T
+    max_sim = np.zeros(n, dtype=np.float32)
+    taken = np.zeros(n, dtype=bool)
+    order: List[int] = []
+    for _ in range(k):
+        mmr = lam * relevance - (1 - lam) * max_sim
+        mmr[taken] = -np.inf
+        j = int(np.argmax(mmr))
+        order.append(j)
+        taken[j] = True
+        max_sim = np.maximum(max_sim, sims[j])
+    return order
+
+
+def genre_vectors(genre_lists: Sequence[Sequence[str]], vocabulary: Sequence[str]) -> np.ndarray:
+    """Unit-length multi-hot rows over `vocabulary`; zero rows where no genre is known."""
+    pos = {g: i for i, g in enumerate(vocabulary)}
+    G = np.zeros((len(genre_lists), len(vocabulary)), dtype=np.float32)
+    for r, genres in enumerate(genre_lists):
+        for g in genres:
+            if g in pos:
+                G[r, pos[g]] = 1.0
+    norms = np.linalg.norm(G, axis=1, keepdims=True)
+    return np.divide(G, norms, out=G, where=norms > 0)
+
+
+def rank_candidates(
+    candidates: List[str],
+    candidate_fps: Dict[str, Dict[str, Any]],
+    seed_fps: Dict[str, Dict[str, Any]],
+    k: int,
+    prior_weight: float = 0.3,
+    lam: float = 0.7,
+    candidate_genres: Optional[Dict[str, Sequence[str]]] = None,
+    seed_genres: Optional[Sequence[Sequence[str]]] = None,
+    popularity: Optional[Dict[str, int]] = None,
+) -> Tuple[List[str], int, int]:
+    """
+    Pre-rank the candidate pool for the curator and return (shortlist, number
+    scored by fingerprint, number scored by genre only). Relevance mixes taste
+    similarity with a prior from the LLM's own order (averaged with catalog
+    popularity, log votes, where `popularity` knows the title). Taste similarity
+    comes from a stored fingerprint when the candidate has one, else from the
+    cosine between its catalog genres and the seeds' genre profile; candidates
+    with neither get the median. MMR then keeps the shortlist varied.
+    """
+    if not candidates:
+        return [], 0, 0
+    n = len(candidates)
+    prior = 1.0 - np.arange(n, dtype=np.float32) / n
+    if popularity:
+        votes = np.array([popularity.get(t, 0) for t in candidates], dtype=np.float32)
+        has_votes = votes > 0
+        if has_votes.any():
+            pop = np.log1p(votes) / np.log1p(votes.max())
+            prior = np.where(has_votes, (prior + pop) / 2, prior)
+    seeds = encode_many(list(seed_fps.values()))
+    X = encode_many([candidate_fps.get(t) or {} for t in candidates])
+
+    if len(seeds):
+        centroid, variance, count = taste_stats(seeds)
+        sim = taste_similarity(X, centroid, feature_weights(variance, count))
+    else:
+        centroid, sim = np.zeros(FEATURE_DIM, dtype=np.float32), np.full(n, np.nan)
+    known = ~np.isnan(sim)
+
+    candidate_genres = candidate_genres or {}
+    seed_genres = [g for g in (seed_genres or []) if g]
+    vocabulary = sorted({g for gs in seed_genres for g in gs} | {g for gs in candidate_genres.values() for g in gs})
+    G = genre_vectors([candidate_genres.get(t, ()) for t in candidates], vocabulary)
+    by_genre = np.zeros(n, dtype=bool)
+    if seed_genres and vocabulary:
+        profile = genre_vectors(seed_genres, vocabulary).mean(axis=0)
+        if np.linalg.norm(profile) > 0:
+            gsim = G @ (profile / np.linalg.norm(profile))
+            by_genre = ~known & (np.linalg.norm(G, axis=1) > 0)
+            sim = np.where(by_genre, gsim, sim)
+
+    scored = ~np.isnan(sim)
+    fill = float(np.median(sim[scored])) if scored.any() else 0.5
+    relevance = (1 - prior_weight) * np.where(scored, sim, fill) + prior_weight * prior
+
+    # diversity is measured on taste-centred fingerprint vectors (zero rows where
+    # unknown) next to the genre vectors
+    centred = np.where(np.isnan(X), 0.0, X - centroid) * known[:, None]
+    vectors = np.hstack([centred, G]).astype(np.float32)
+    order = mmr_order(relevance.astype(np.float32), vectors, k, lam)
+    return [candidates[i] for i in order], int(known.sum()), int(by_genre.sum())
@@ -0,0 +1,89 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from next_watch_ai.titles import normalize_title, split_year
+
+
+class FingerprintStore:
+    """
+    Durable fingerprint store keyed by (normalized title, content_type, model, schema version).
+    Unlike the caches, entries never expire: a fingerprint only goes stale when the
+    schema version or model changes, and both are part of the key.
+    An optional `index` (vector_index.FingerprintIndex) receives every put().
+    """
+    def __init__(self, path: str, schema_version: int, index=None):
+        self.path = path
+        self.schema_version = schema_version
+        self.index = index
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints ("
+            " title_key TEXT NOT NULL,"
+            " content_type TEXT NOT NULL,"
+            " model TEXT NOT NULL,"
+            " schema_version INTEGER NOT NULL,"
+            " title TEXT NOT NULL,"
+            " data TEXT NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " PRIMARY KEY (title_key, content_type, model, schema_version))"
+        )
+        self._db.commit()
+
+    def get(self, title: str, content_type: str, model: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM fingerprints WHERE title_key = ? AND content_type = ? AND model = ? AND schema_version = ?",
+                (normalize_title(title), content_type, model, self.schema_version),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def find(self, title: str, model: str) -> Optional[Dict[str, Any]]:
+        """
+        Like get() but for any content_type (candidate titles carry none). A title
+        with a year ("Parasite (2019)") also matches one stored without it.
+        """
+        keys = [normalize_title(title)]
+        bare = split_year(title)[0]
+        if bare != title.strip():
+            keys.append(normalize_title(bare))
+        with self._lock:
+            for key in keys:
+                row = self._db.execute(
+                    "SELECT data FROM fingerprints WHERE title_key = ? AND model = ? AND schema_version = ?"
+                    " ORDER BY updated_at DESC LIMIT 1",
+                    (key, model, self.schema_version),
+                ).fetchone()
+                if row:
+                    return json.loads(row[0])
+        return None
+
+    def put(self, title: str, content_type: str, model: str, fingerprint: Dict[str, Any]) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (normalize_title(title), content_type, model, self.schema_version,
+                 title.strip(), json.dumps(fingerprint, ensure_ascii=False), time.time()),
+            )
+            self._db.commit()
+        if self.index is not None:
+            self.index.add(title, content_type, model, fingerprint)
+
+    def items(self, model: Optional[str] = None) -> Iterator[Tuple[str, str, str, Dict[str, Any]]]:
+        """Yield (title, content_type, model, fingerprint) for the current schema version."""
+        sql = "SELECT title, content_type, model, data FROM fingerprints WHERE schema_version = ?"
+        args = [self.schema_version]
+        if model:
+            sql += " AND model = ?"
+            args.append(model)
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+        for title, content_type, fp_model, data in rows:
+            yield title, content_type, fp_model, json.loads(data)
@@ -1,9 +1,134 @@
-from typing import Dict,List 
-from firecrawl import FirecrawlApp
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict,List,Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from firecrawl import FirecrawlApp, WebsiteNotSupportedError
 
+from next_watch_ai.cache import SQLiteCache
+from next_watch_ai.concurrency import submit_in_context
+from next_watch_ai.evidence import pack_evidence
+from next_watch_ai.hedge import LatencyTracker
+from next_watch_ai import tracing
 
-def make_firecrawl(api_key: str) -> FirecrawlApp:
-    return FirecrawlApp(api_key=api_key)
+# latencies of successful scrapes across bundles; the median sets when a slow URL
+# gets a speculative companion in _scrape_parallel
+_scrape_latency = LatencyTracker(window=200, min_samples=10)
+
+
+def make_firecrawl(api_key: str, cache_path: str = "", cache_ttl_s: float = 7 * 24 * 3600,
+                   cache_max_bytes: int = 256 * 1024 * 1024, negative_ttl_s: float = 24 * 3600,
+                   client=None, replay=None):
+    # `client` lets callers wrap their own Firecrawl-compatible object (e.g. bench fakes)
+    # `replay` is a ReplayLog: record every result, or serve them back with no network
+    from next_watch_ai.replay import RecordingFirecrawl, ReplayFirecrawl  # avoids an import cycle
+
+    if replay is not None and replay.replaying:
+        return TracedFirecrawl(ReplayFirecrawl(replay))
+
+    client = SampledFirecrawl(client or FirecrawlApp(api_key=api_key))
+    if cache_path:
+        cache = SQLiteCache(cache_path, max_bytes=cache_max_bytes, ttl_s=cache_ttl_s)
+        client = CachedFirecrawl(client, cache, negative_ttl_s=negative_ttl_s)
+    if replay is not None:
+        client = RecordingFirecrawl(client, replay)
+    return TracedFirecrawl(client)
+
+class TracedFirecrawl:
+    """Records latency and bytes of every scrape() into the current run trace."""
+    def __init__(self, firecrawl):
+        self.firecrawl = firecrawl
+
+    def scrape(self, url: str, formats: Optional[List[str]] = None, **kwargs):
+        t0 = time.monotonic()
+        try:
+            res = self.firecrawl.scrape(url=url, formats=formats or ["markdown"], **kwargs)
+        except Exception as e:
+            tracing.record("scrape", url=url, latency_s=round(time.monotonic() - t0, 4), bytes=0,
+                           error=type(e).__name__)
+            raise
+        size = len(extract_markdown(res).encode("utf-8")) + len(extract_html(res).encode("utf-8"))
+        tracing.record("scrape", url=url, latency_s=round(time.monotonic() - t0, 4), bytes=size)
+        return res
+
+    def __getattr__(self, name):
+        return getattr(self.firecrawl, name)
+
+class SampledFirecrawl:
+    """
+    Adds the latency of every successful network scrape() to _scrape_latency.
+    Sits under the cache, so cache hits don't drag the median down.
+    """
+    def __init__(self, firecrawl):
+        self.firecrawl = firecrawl
+
+    def scrape(self, url: str, formats: Optional[List[str]] = None, **kwargs):
+        t0 = time.monotonic()
+        res = self.firecrawl.scrape(url=url, formats=formats, **kwargs)
+        _scrape_latency.add("scrape", time.monotonic() - t0)
+        return res
+
+    def __getattr__(self, name):
+        return getattr(self.firecrawl, name)
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form used for cache keys: lower-case scheme/host, no fragment,
+    no trailing slash, tracking params dropped and the query sorted.
+    """
+    parts = urlsplit(url.strip())
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not k.lower().startswith("utm_"))
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, urlencode(query), ""))
+
+class CachedFirecrawl:
+    """
+    Drop-in wrapper around FirecrawlApp that answers scrape() from a SQLiteCache.
+
+    Results are stored as {format: text} dicts, which extract_markdown/extract_html
+    already understand. URLs that raised WebsiteNotSupportedError are cached as
+    negative entries (shorter TTL) and re-raise without a network call.
+    """
+    def __init__(self, firecrawl: FirecrawlApp, cache: SQLiteCache, negative_ttl_s: float = 24 * 3600):
+        self.firecrawl = firecrawl
+        self.cache = cache
+        self.negative_ttl_s = negative_ttl_s
+        self.negative_hits = 0
+
+    def scrape(self, url: str, formats: Optional[List[str]] = None, **kwargs):
+        formats = list(formats or ["markdown"])
+        key = hashlib.sha256(f"{normalize_url(url)}|{','.join(sorted(formats))}".encode("utf-8")).hexdigest()
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            entry = json.loads(cached)
+            if "error" in entry:
+                self.negative_hits += 1
+                raise WebsiteNotSupportedError(f"(cached) {entry['error']}", status_code=403)
+            return entry
+
+        try:
+            res = self.firecrawl.scrape(url=url, formats=formats, **kwargs)
+        except WebsiteNotSupportedError as e:
+            self.cache.set(key, json.dumps({"error": str(e)}), ttl_s=self.negative_ttl_s)
+            raise
+
+        entry = {}
+        if "markdown" in formats:
+            entry["markdown"] = extract_markdown(res)
+        if "html" in formats:
+            entry["html"] = extract_html(res)
+        if any(entry.values()):
+            self.cache.set(key, json.dumps(entry, ensure_ascii=False))
+        return entry
+
+    def log_stats(self, logger) -> None:
+        logger.info(f"[Firecrawl] scrape cache {self.cache.stats()} negative_hits={self.negative_hits}")
+
+    def __getattr__(self, name):
+        return getattr(self.firecrawl, name)
 
 def extract_markdown(scrape_result) -> str:
     if scrape_result is None:
@@ -42,11 +167,22 @@ def scrape_bundle(
     max_pages: int = 3,
     per_source_chars: int = 2500,
     total_chars: int = 9000,
+    parallel: int = 0,
+    url_timeout: Optional[float] = None,
+    deadline: Optional[float] = None,
+    query: str = "",
 ) -> str:
     """
     Scrape up to max_pages URLs; skip unsupported/blocked URLs instead of crashing.
+    parallel > 1 switches to speculative parallel fetching (see _scrape_parallel).
+    With a query, pages are chunked and the most relevant chunks packed into
+    total_chars (see evidence.pack_evidence) instead of keeping each page's head.
     """
-    chunks = []
+    if parallel > 1:
+        return _scrape_parallel(firecrawl, urls, logger, max_pages, per_source_chars, total_chars,
+                                parallel, url_timeout, deadline, query)
+
+    pages = []
     scraped_ok = 0
 
     for url in urls:
@@ -58,7 +194,7 @@ def scrape_bundle(
             md = extract_markdown(res)
 
             if md:
-                chunks.append(f"SOURCE: {url}\n{md[:per_source_chars]}")
+                pages.append((url, md))
                 scraped_ok += 1
             else:
                 if logger:
@@ -71,7 +207,108 @@ def scrape_bundle(
                 logger.warning(f"[Firecrawl] Skipping URL (scrape failed): {url} | {type(e).__name__}: {e}")
             continue
 
-    bundle = "\n\n".join(chunks)
     if logger:
         logger.info(f"[Firecrawl] scrape_bundle complete: kept={scraped_ok} of requested={max_pages}, tried={len(urls)}")
-    return bundle[:total_chars]
\ No newline at end of file
+    return _assemble(pages, per_source_chars, total_chars, query, logger)
+
+def _assemble(pages, per_source_chars, total_chars, query, logger) -> str:
+    if not query:
+        return "\n\n".join(f"SOURCE: {url}\n{md[:per_source_chars]}" for url, md in pages)[:total_chars]
+    bundle = pack_evidence(pages, query, total_chars=total_chars, per_source_chars=per_source_chars)
+    if logger:
+        logger.info(f"[Evidence] packed {len(bundle)} of {sum(len(md) for _, md in pages)} scraped chars")
+    return bundle
+
+def _scrape_parallel(firecrawl, urls, logger, max_pages, per_source_chars, total_chars,
+                     parallel, url_timeout, deadline, query="") -> str:
+    """
+    Launch the first `parallel` URLs together and start the next URL whenever one
+    fails, comes back empty or exceeds url_timeout. A URL still running past the
+    median observed scrape latency stops counting against `parallel`, so the next
+    URL starts alongside it (at most 2 * parallel in flight). Stops as soon as
+    max_pages good pages are in (or the total deadline passes) and abandons
+    whatever is still running; url_timeout is passed to the scrape call too, so
+    an abandoned request ends (and frees its BoundedFirecrawl slot) by then.
+    Sources are kept in the order of `urls`.
+    """
+    kwargs = {"timeout": int(url_timeout * 1000)} if url_timeout else {}
+
+    def fetch(url):
+        return extract_markdown(firecrawl.scrape(url=url, formats=["markdown"], **kwargs))
+
+    soft = _scrape_latency.percentile("scrape", 50)
+    if soft is not None and url_timeout is not None:
+        soft = min(soft, url_timeout)
+
+    started = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=max(1, len(urls)))
+    pending = {}  # future -> (index, url, launched_at)
+    kept = {}     # index -> markdown
+    next_i = 0
+
+    def launch():
+        nonlocal next_i
+        now = time.monotonic()
+        slow = [url for _, url, t0 in pending.values() if soft is not None and now - t0 >= soft]
+        while (next_i < len(urls) and len(pending) < 2 * parallel
+               and len(pending) - len(slow) < min(parallel, max_pages - len(kept))):
+            url = urls[next_i]
+            if len(pending) >= parallel and logger:
+                logger.info(f"[Firecrawl] {slow[0]} slower than p50 ({soft:.2f}s); also starting {url}")
+            pending[submit_in_context(pool, fetch, url)] = (next_i, url, now)
+            next_i += 1
+
+    try:
+        launch()
+        while pending and len(kept) < max_pages:
+            now = time.monotonic()
+            timeouts = []
+            if deadline is not None:
+                timeouts.append(started + deadline - now)
+            if url_timeout is not None:
+                timeouts.append(min(t0 for _, _, t0 in pending.values()) + url_timeout - now)
+            if soft is not None:
+                fresh = [t0 + soft - now for _, _, t0 in pending.values() if now - t0 < soft]
+                if fresh:
+                    timeouts.append(min(fresh))
+            timeout = max(0.0, min(timeouts)) if timeouts else None
+
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            for fut in sorted(done, key=lambda f: pending[f][0]):
+                i, url, _ = pending.pop(fut)
+                try:
+                    md = fut.result()
+                except Exception as e:
+                    if logger:
+                        logger.warning(f"[Firecrawl] Skipping URL (scrape failed): {url} | {type(e).__name__}: {e}")
+                    continue
+                if not md:
+                    if logger:
+                        logger.info(f"[Firecrawl] Empty markdown: {url}")
+                    continue
+                if len(kept) < max_pages:
+                    kept[i] = md
+
+            now = time.monotonic()
+            if url_timeout is not None:
+                for fut, (i, url, t0) in list(pending.items()):
+                    if now - t0 >= url_timeout:
+                        fut.cancel()
+                        del pending[fut]
+                        if logger:
+                            logger.warning(f"[Firecrawl] Skipping URL (timed out after {url_timeout}s): {url}")
+            if deadline is not None and now - started >= deadline:
+                if logger:
+                    logger.warning(f"[Firecrawl] scrape_bundle deadline of {deadline}s reached; "
+                                   f"abandoning {len(pending)} in-flight URL(s)")
+                break
+            launch()
+    finally:
+        for fut in pending:
+            fut.cancel()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    if logger:
+        logger.info(f"[Firecrawl] scrape_bundle complete: kept={len(kept)} of requested={max_pages}, "
+                    f"tried={next_i} of {len(urls)}, elapsed={time.monotonic() - started:.2f}s")
+    return _assemble([(urls[i], kept[i]) for i in sorted(kept)], per_source_chars, total_chars, query, logger)
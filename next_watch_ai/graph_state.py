@@ -23,6 +23,8 @@ class WatchState(TypedDict, total=False):
     controller_rationale: str
     iterations: int
     max_iters: int
+    critic_ran: bool
+    revision_done: bool
 
     # conversational follow-up
     user_question: Optional[str]
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from next_watch_ai.concurrency import submit_in_context
+
+T = TypeVar("T")
+
+# hedged requests run here so the caller can wait on "first of two"; shared by every client
+_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge")
+
+
+class LatencyTracker:
+    """
+    Rolling window of request latencies per key (the agent/graph node making the call).
+    percentile() is None until a key has min_samples, so nothing is hedged on a cold start.
+    """
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, key: str, latency_s: float) -> None:
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(latency_s)
+
+    def percentile(self, key: str, p: float = 95) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(round(p / 100 * (len(samples) - 1))))]
+
+
+def hedged_call(fn: Callable[[], T], delay_s: float, hedge: Optional[Callable[[], T]] = None,
+                on_hedge: Optional[Callable[[], None]] = None) -> T:
+    """
+    Run fn(); if it hasn't answered after delay_s, also start hedge() (default fn) and
+    return whichever succeeds first. The loser is cancelled if it hasn't started;
+    a blocking HTTP call already in flight can't be interrupted, so its result is dropped.
+    Raises the first error only if both fail.
+    """
+    first = submit_in_context(_pool, fn)
+    try:
+        return first.result(timeout=delay_s)
+    except FutureTimeout:
+        pass
+    if on_hedge:
+        on_hedge()
+    pending = {first, submit_in_context(_pool, hedge or fn)}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            if fut.exception() is None:
+                for other in pending:
+                    other.cancel()
+                return fut.result()
+            error = error or fut.exception()
+    raise error
+
+
+async def ahedged_call(fn: Callable[[], Awaitable[T]], delay_s: float,
+                       hedge: Optional[Callable[[], Awaitable[T]]] = None,
+                       on_hedge: Optional[Callable[[], None]] = None) -> T:
+    """Async hedged_call; here the losing request really is cancelled."""
+    first = asyncio.ensure_future(fn())
+    done, _ = await asyncio.wait({first}, timeout=delay_s)
+    if done:
+        return first.result()
+    if on_hedge:
+        on_hedge()
+    pending = {first, asyncio.ensure_future((hedge or fn)())}
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,142 @@
+"""
+Local repair of almost-JSON model output: trailing or missing commas, unquoted
+keys and string values, single/smart quotes, Python literals, // comments and
+truncation. The repaired text is parsed again instead of re-prompting the model.
+"""
+import re
+from typing import Any, List, Tuple
+
+from next_watch_ai.json_stream import parse_first
+
+_BARE = re.compile(r"""[^\s,:\[\]{}"'“”‘’]+""")
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(\.\d+)?([eE][+-]?\d+)?")
+_LITERALS = {"true": "true", "false": "false", "null": "null",
+             "True": "true", "False": "false", "None": "null", "undefined": "null"}
+# opening quote -> characters that close it
+_QUOTES = {'"': '"', "“": '”"', "”": '”"', "'": "'’", "‘": "'’", "’": "'’"}
+
+# what a container expects next
+KEY, COLON, VALUE, COMMA = range(4)
+
+
+def repair_json(text: str) -> str:
+    """
+    Rewrite the first {...} object in `text` as valid JSON, as far as it can be
+    recovered. A truncated object is cut back to its last complete value and the
+    open strings/arrays/objects are closed. Raises ValueError if there's no object.
+    """
+    start = text.find("{")
+    if start < 0:
+        raise ValueError("No JSON object in model output.")
+    out: List[str] = []
+    stack: List[list] = []   # [closer, expecting] per open container
+    safe: Tuple[int, str] = (0, "")  # output length and closers where the text could be cut and closed
+    i, n = start, len(text)
+
+    def begin_value() -> None:
+        if not stack:
+            return
+        frame = stack[-1]
+        if frame[1] == COMMA:
+            out.append(",")
+            frame[1] = KEY if frame[0] == "}" else VALUE
+        if frame[1] == KEY:       # a value where a key belongs: treat it as the key
+            return
+        if frame[1] == COLON:
+            out.append(":")
+
+    def end_value(complete: bool = True) -> None:
+        nonlocal safe
+        if stack:
+            frame = stack[-1]
+            frame[1] = COLON if frame[1] == KEY else COMMA
+            if frame[1] == COMMA and complete:
+                safe = (len(out), "".join(f[0] for f in reversed(stack)))
+
+    while i < n:
+        ch = text[i]
+        if ch.isspace():
+            out.append(ch)
+            i += 1
+        elif text.startswith("//", i):
+            j = text.find("\n", i)
+            i = n if j < 0 else j
+        elif text.startswith("/*", i):
+            j = text.find("*/", i + 2)
+            i = n if j < 0 else j + 2
+        elif ch in "{[":
+            begin_value()
+            out.append(ch)
+            stack.append(["}" if ch == "{" else "]", KEY if ch == "{" else VALUE])
+            if len(stack) == 1:
+                # only the outer object may come back empty; a nested container cut short
+                # before its first complete value is dropped, not closed as a made-up {} or []
+                safe = (len(out), stack[0][0])
+            i += 1
+        elif ch in "}]":
+            if stack:
+                _drop_trailing_comma(out)
+                out.append(stack.pop()[0])  # the closer the container needs, even if a different one was written
+                if not stack:
+                    return "".join(out)
+                end_value()
+            i += 1
+        elif ch == ",":
+            if stack and stack[-1][1] == COMMA:
+                out.append(",")
+                stack[-1][1] = KEY if stack[-1][0] == "}" else VALUE
+            i += 1  # doubled or leading commas are dropped
+        elif ch == ":":
+            if stack and stack[-1][1] == COLON:
+                out.append(":")
+                stack[-1][1] = VALUE
+            i += 1
+        elif ch in _QUOTES:
+            closers = _QUOTES[ch]
+            j = i + 1
+            while j < n and text[j] not in closers:
+                j += 2 if text[j] == "\\" else 1
+            body = text[i + 1:min(j, n)]
+            if ch != '"':
+                body = re.sub(r'(?<!\\)"', r'\\"', body).replace("\\'", "'")
+            begin_value()
+            if j >= n:   # truncated inside a string: nothing after it can be kept
+                break
+            out.append('"' + body + '"')
+            end_value()
+            i = j + 1
+        else:
+            m = _BARE.match(text, i)
+            if not m:
+                i += 1
+                continue
+            tok = m.group()
+            begin_value()
+            at_key = bool(stack) and stack[-1][1] == KEY
+            if not at_key and tok in _LITERALS:
+                out.append(_LITERALS[tok])
+            elif not at_key and _NUMBER.fullmatch(tok):
+                out.append(tok)
+            else:
+                out.append('"' + tok.replace("\\", "\\\\").replace('"', '\\"') + '"')
+            end_value(complete=m.end() < n)  # a token running into the end may be cut short
+            i = m.end()
+
+    # truncated: keep everything up to the last complete value, then close what is open
+    length, closers = safe
+    del out[length:]
+    _drop_trailing_comma(out)
+    return "".join(out) + closers
+
+
+def _drop_trailing_comma(out: List[str]) -> None:
+    k = len(out) - 1
+    while k >= 0 and out[k].isspace():
+        k -= 1
+    if k >= 0 and out[k] == ",":
+        del out[k]
+
+
+def parse_repaired(text: str) -> Any:
+    """parse_first over repair_json(text)."""
+    return parse_first(repair_json(text), opening="{")
@@ -0,0 +1,321 @@
+import json
+import re
+from json.decoder import scanstring
+from typing import Any, Callable, List, Optional, Tuple
+
+# runs of characters that need no attention inside a string / between tokens
+_STRING_RUN = re.compile(r'[^"\\“”]*')
+_SPACE_RUN = re.compile(r"\s*")
+_NUMBER_RUN = re.compile(r"[-+0-9.eE]*")
+_WORD_RUN = re.compile(r"[A-Za-z]*")
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(\.\d+)?([eE][+-]?\d+)?")
+_LITERALS = {"true": True, "false": False, "null": None}
+
+OPEN_QUOTES = '"“'
+# the quote that ends a string opened with each; a plain " inside “…” is text
+_CLOSERS = {'"': '"', "“": "”"}
+
+# what the parser expects next
+VALUE, VALUE_OR_END, KEY, KEY_OR_END, COLON, COMMA_OR_END = range(6)
+# what it is in the middle of
+SKIP, MAIN, STRING, NUMBER, WORD, DONE = range(6)
+
+Path = Tuple[Any, ...]
+
+# C-accelerated decoder for the common case of a well-formed value (control characters allowed)
+_decoder = json.JSONDecoder(strict=False)
+
+
+class JSONStreamError(ValueError):
+    """Malformed JSON, with the absolute offset (and line/column) of the offending character."""
+    def __init__(self, msg: str, offset: int, line: int, column: int):
+        super().__init__(f"{msg} at offset {offset} (line {line}, column {column})")
+        self.offset = offset
+        self.line = line
+        self.column = column
+
+
+class JSONStream:
+    """
+    Push parser for model output: feed() text chunks as they arrive and values are
+    built as their tokens close, so nothing is re-scanned and the input is never
+    copied as a whole.
+
+    Text outside JSON (prose, ``` fences) is skipped until a character in `opening`
+    starts a top-level value. Each completed top-level value is appended to .values
+    and passed to on_value(value); with first_only, parsing stops after the first.
+    on_item(path, value) fires as each array element closes, at any depth, with
+    path the keys/indices leading to it (e.g. ("cards", 2)).
+
+    Smart quotes are repaired on the fly: outside strings a “…” pair delimits a
+    string like "…" does. Inside a "-quoted string smart quotes are kept as text,
+    and inside a “…” string so is a plain ".
+    """
+    def __init__(self, on_value: Optional[Callable[[Any], None]] = None,
+                 on_item: Optional[Callable[[Path, Any], None]] = None,
+                 opening: str = "{[", first_only: bool = False):
+        self.on_value = on_value
+        self.on_item = on_item
+        self.opening = opening
+        self.first_only = first_only
+        self.values: List[Any] = []
+        self.offset = 0          # characters consumed before the current chunk
+        self.start: Optional[int] = None  # offset where the current top-level value began
+        self._line = 1
+        self._line_start = 0
+        self._chunk = ""
+        self._mode = SKIP
+        self._expect = VALUE
+        self._stack: List[list] = []   # [container, pending key] per open object/array
+        self._tok: List[str] = []      # pieces of the token in progress
+        self._closers = '"'
+        self._is_key = False
+        self._esc = False
+
+    @property
+    def done(self) -> bool:
+        return self._mode == DONE
+
+    def feed(self, chunk: str, pos: int = 0) -> None:
+        """Parse chunk[pos:] (pos lets a caller skip a prefix without slicing)."""
+        self._chunk = chunk
+        i, n = pos, len(chunk)
+        while i < n and self._mode != DONE:
+            mode = self._mode
+            if mode == SKIP:
+                i = self._skip(chunk, i)
+            elif mode == STRING:
+                i = self._string(chunk, i)
+            elif mode == NUMBER or mode == WORD:
+                m = (_NUMBER_RUN if mode == NUMBER else _WORD_RUN).match(chunk, i)
+                self._tok.append(m.group())
+                i = m.end()
+                if i < n:
+                    self._finish_scalar(i)
+            else:
+                i = self._main(chunk, i)
+        self._advance(chunk, min(i, n))
+
+    def close(self) -> None:
+        """End of input: finish a trailing top-level scalar, or raise if a value is still open."""
+        self._chunk = ""
+        if self._mode in (NUMBER, WORD) and not self._stack:
+            self._finish_scalar(0)
+        if self._mode not in (SKIP, DONE):
+            what = "string" if self._mode == STRING else "object" if self._in_object() else "array"
+            raise self._error(f"Truncated JSON: unterminated {what}", 0)
+
+    # ---- scanning ------------------------------------------------------------
+
+    def _skip(self, chunk: str, i: int) -> int:
+        hits = [j for j in (chunk.find(c, i) for c in self.opening) if j >= 0]
+        if not hits:
+            return len(chunk)
+        j = min(hits)
+        self.start = self.offset + j
+        self._mode = MAIN
+        self._expect = VALUE
+        return j
+
+    def _string(self, chunk: str, i: int) -> int:
+        if self._esc:
+            self._esc = False
+            self._tok.append(chunk[i])
+            return i + 1
+        m = _STRING_RUN.match(chunk, i)
+        if m.end() > i:
+            self._tok.append(m.group())
+        i = m.end()
+        if i >= len(chunk):
+            return i
+        ch = chunk[i]
+        if ch == "\\":
+            self._tok.append(ch)
+            self._esc = True
+        elif ch in self._closers:
+            self._mode = MAIN
+            raw = "".join(self._tok) + '"'
+            self._tok = []
+            try:
+                text, _ = scanstring(raw, 0, False)
+            except ValueError as e:
+                raise self._error(f"Bad string escape ({e.args[0].split(':')[0]})", i)
+            if self._is_key:
+                self._stack[-1][1] = text
+                self._expect = COLON
+            else:
+                self._value(text)
+        elif ch == '"':
+            self._tok.append('\\"')  # a plain quote inside a “smart-quoted” string is text
+        else:
+            self._tok.append(ch)     # a smart quote inside a "-quoted string is text
+        return i + 1
+
+    def _main(self, chunk: str, i: int) -> int:
+        i = _SPACE_RUN.match(chunk, i).end()
+        if i >= len(chunk):
+            return i
+        ch = chunk[i]
+        expect = self._expect
+        if expect in (VALUE, VALUE_OR_END):
+            if ch == "]" and expect == VALUE_OR_END:
+                self._close()
+            elif ch == "{":
+                self._stack.append([{}, None])
+                self._expect = KEY_OR_END
+            elif ch == "[":
+                self._stack.append([[], None])
+                self._expect = VALUE_OR_END
+            elif ch in OPEN_QUOTES:
+                self._open_string(ch, is_key=False)
+            elif ch == "-" or ch.isdigit():
+                self._mode = NUMBER
+                return i
+            elif ch.isalpha():
+                self._mode = WORD
+                return i
+            else:
+                raise self._error(f"Expecting value, got {ch!r}", i)
+        elif expect in (KEY, KEY_OR_END):
+            if ch == "}" and expect == KEY_OR_END:
+                self._close()
+            elif ch in OPEN_QUOTES:
+                self._open_string(ch, is_key=True)
+            else:
+                raise self._error(f"Expecting property name in double quotes, got {ch!r}", i)
+        elif expect == COLON:
+            if ch != ":":
+                raise self._error(f"Expecting ':' delimiter, got {ch!r}", i)
+            self._expect = VALUE
+        else:  # COMMA_OR_END
+            in_object = self._in_object()
+            if ch == ",":
+                self._expect = KEY if in_object else VALUE
+            elif ch == ("}" if in_object else "]"):
+                self._close()
+            else:
+                raise self._error(f"Expecting ',' or {'}' if in_object else ']'!r}, got {ch!r}", i)
+        return i + 1
+
+    def _open_string(self, quote: str, is_key: bool) -> None:
+        self._mode = STRING
+        self._closers = _CLOSERS[quote]
+        self._is_key = is_key
+
+    def _finish_scalar(self, i: int) -> None:
+        tok = "".join(self._tok)
+        self._tok = []
+        self._mode = MAIN
+        if tok in _LITERALS:
+            return self._value(_LITERALS[tok])
+        m = _NUMBER.fullmatch(tok)
+        if not m:
+            raise self._error(f"Invalid literal {tok!r}", i - len(tok))
+        self._value(float(tok) if m.group(1) or m.group(2) else int(tok))
+
+    # ---- building ------------------------------------------------------------
+
+    def _in_object(self) -> bool:
+        return bool(self._stack) and isinstance(self._stack[-1][0], dict)
+
+    def _close(self) -> None:
+        container, _ = self._stack.pop()
+        self._value(container)
+
+    def _value(self, value: Any) -> None:
+        if not self._stack:
+            self.values.append(value)
+            if self.on_value:
+                self.on_value(value)
+            self.start = None
+            self._mode = DONE if self.first_only else SKIP
+            return
+        frame = self._stack[-1]
+        container = frame[0]
+        if isinstance(container, dict):
+            container[frame[1]] = value
+        else:
+            if self.on_item:
+                self.on_item(self._path() + (len(container),), value)
+            container.append(value)
+        self._expect = COMMA_OR_END
+
+    def _path(self) -> Path:
+        # keys/indices of the open containers below the innermost one
+        return tuple(f[1] if isinstance(f[0], dict) else len(f[0]) for f in self._stack[:-1])
+
+    # ---- positions -----------------------------------------------------------
+
+    def _advance(self, chunk: str, consumed: int) -> None:
+        nl = chunk.count("\n", 0, consumed)
+        if nl:
+            self._line += nl
+            self._line_start = self.offset + chunk.rfind("\n", 0, consumed) + 1
+        self.offset += consumed
+
+    def _error(self, msg: str, i: int) -> JSONStreamError:
+        # i indexes the chunk being fed; line info so far covers the chunks before it
+        chunk = self._chunk
+        line, line_start = self._line, self._line_start
+        nl = chunk.count("\n", 0, i)
+        if nl:
+            line += nl
+            line_start = self.offset + chunk.rfind("\n", 0, i) + 1
+        return JSONStreamError(msg, self.offset + i, line, self.offset + i - line_start + 1)
+
+
+def parse_first(text: str, opening: str = "{") -> Any:
+    """
+    First complete JSON value in `text` starting with a character in `opening`.
+    Each candidate is tried with the C decoder in place, then with JSONStream, which
+    repairs smart quotes and pinpoints errors. A malformed candidate is skipped as a
+    whole (never retried from a nested value inside it); one that runs into the end
+    of the text is truncated, and its error is raised right away.
+    """
+    start, first_error = 0, None
+    while True:
+        hits = [j for j in (text.find(c, start) for c in opening) if j >= 0]
+        if not hits:
+            break
+        start = min(hits)
+        try:
+            return _decoder.raw_decode(text, start)[0]
+        except ValueError:
+            pass
+        stream = JSONStream(opening=opening, first_only=True)
+        try:
+            stream.feed(text, start)
+        except JSONStreamError as e:
+            first_error = first_error or e
+            end = _span_end(text, start)
+            if end is None:
+                raise e
+            start = end
+            continue
+        stream.close()  # raises if the value is still open at the end of the text
+        if stream.values:
+            return stream.values[0]
+        start += 1
+    if first_error:
+        raise first_error
+    raise ValueError(f"No JSON value starting with {opening!r} found in model output.")
+
+
+def _span_end(text: str, start: int) -> Optional[int]:
+    """Offset just past the bracket that balances text[start], or None if the text ends first."""
+    depth, i, n = 0, start, len(text)
+    while i < n:
+        ch = text[i]
+        if ch in OPEN_QUOTES:
+            closers = _CLOSERS[ch]
+            i += 1
+            while i < n and text[i] not in closers:
+                i += 2 if text[i] == "\\" else 1
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return None
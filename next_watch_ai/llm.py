@@ -1,63 +1,350 @@
 import ast
+import asyncio
+import hashlib
 import json
+import logging
 import re
-from typing import Any, Dict, List
-from groq import Groq
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from groq import Groq, AsyncGroq
+
+from next_watch_ai.cache import MemoryCache, SQLiteCache
+from next_watch_ai import deadline, tracing
+from next_watch_ai.hedge import LatencyTracker, ahedged_call, hedged_call
+from next_watch_ai.json_stream import parse_first
+from next_watch_ai.replay import open_replay
+from next_watch_ai.singleflight import SingleFlight
+from next_watch_ai.rate_limit import (
+    RateLimiter, backoff_delay, estimate_tokens, is_retryable, retry_after_s, shared_limiter,
+)
+
+log = logging.getLogger("next_watch_ai.llm")
+
+# identical deterministic prompts in flight at once (e.g. two sessions seeding the
+# same title) share one API call; shared by every client in the process
+_chat_flight = SingleFlight("llm")
 
 class GroqLLM:
-    def __init__(self, api_key: str, model: str):
-        self.client = Groq(api_key=api_key)
+    """
+    Thin Groq chat wrapper with an optional response cache and rate limiter.
+
+    Only deterministic (temperature 0) calls are served from the cache by default;
+    cache_all_temperatures=True opts every call in. Per call, use_cache=False
+    bypasses the cache and use_cache=True forces it regardless of temperature.
+
+    With a limiter, calls wait for request/token budget and an in-flight slot;
+    429s and 5xx are retried with jittered exponential backoff (honouring retry-after).
+
+    Concurrent temperature-0 calls with the same model and prompt are coalesced
+    into one request (next_watch_ai.singleflight), except use_cache=False calls,
+    which always make their own.
+
+    Each request times out after timeout_s, cut to what is left of the run deadline
+    (next_watch_ai.deadline). With hedge=True, a request still running after the
+    p95 latency observed for the calling agent gets a duplicate, and the first
+    answer wins (next_watch_ai.hedge); the duplicate shares the original's limiter slot.
+
+    chat(..., on_delta=fn) streams: fn gets each piece of text as it arrives and the
+    full text is still returned. Streamed calls are cached and recorded like any
+    other, but are never coalesced or hedged, and only retried before the first token.
+    """
+    def __init__(self, api_key: str, model: str, cache=None, cache_all_temperatures: bool = False,
+                 limiter: Optional[RateLimiter] = None, max_retries: int = 4, replay=None,
+                 max_tokens: Optional[int] = None, timeout_s: Optional[float] = None, hedge: bool = False):
+        # retries are handled here so they go through the shared limiter
+        self.client = Groq(api_key=api_key, max_retries=0)
         self.model = model
+        self.cache = cache
+        self.cache_all_temperatures = cache_all_temperatures
+        self.limiter = limiter
+        self.max_retries = max_retries
+        # completion cap sent to Groq (None = model default)
+        self.max_tokens = max_tokens
+        # ReplayLog: record every response, or answer from a recording (no network)
+        self.replay = replay
+        self.timeout_s = timeout_s
+        self.hedge = hedge
+        self.hedges = 0
+        self.latency = LatencyTracker()
+
+    def chat(self, prompt: str, temperature: float = 0.2, use_cache: Optional[bool] = None,
+             on_delta: Optional[Callable[[str], None]] = None) -> str:
+        if self.replay is not None and self.replay.replaying:
+            content = self.replay.take("llm", self.cache_key(prompt, temperature))
+            if on_delta and content:
+                on_delta(content)
+            return content
+        if on_delta is not None:
+            content = self._chat_stream(prompt, temperature, use_cache, on_delta)
+        elif temperature == 0 and use_cache is not False:
+            content = _chat_flight.do(self.cache_key(prompt, temperature),
+                                      lambda: self._chat(prompt, temperature, use_cache))
+        else:
+            content = self._chat(prompt, temperature, use_cache)
+        if self.replay is not None:
+            self.replay.add("llm", self.cache_key(prompt, temperature), content)
+        return content
+
+    def _chat(self, prompt: str, temperature: float, use_cache: Optional[bool]) -> str:
+        key, hit = self._cache_lookup(prompt, temperature, use_cache)
+        if hit is not None:
+            return hit
+
+        t0 = time.monotonic()
+        est = estimate_tokens(prompt, self.max_tokens or 512)
+        for attempt in range(self.max_retries + 1):
+            try:
+                if self.limiter:
+                    with self.limiter.slot(est):
+                        resp = self._send(prompt, temperature)
+                else:
+                    resp = self._send(prompt, temperature)
+                break
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+        return self._finish(resp, key, est, t0)
+
+    def _chat_stream(self, prompt: str, temperature: float, use_cache: Optional[bool],
+                     on_delta: Callable[[str], None]) -> str:
+        key, hit = self._cache_lookup(prompt, temperature, use_cache)
+        if hit is not None:
+            on_delta(hit)
+            return hit
+
+        t0 = time.monotonic()
+        est = estimate_tokens(prompt, self.max_tokens or 512)
+        for attempt in range(self.max_retries + 1):
+            started = []
+
+            def emit(delta: str) -> None:
+                started.append(True)
+                on_delta(delta)
+
+            try:
+                if self.limiter:
+                    with self.limiter.slot(est):
+                        content, usage = self._create_stream(prompt, temperature, emit)
+                else:
+                    content, usage = self._create_stream(prompt, temperature, emit)
+                break
+            except Exception as e:
+                # text already handed to the caller can't be taken back
+                delay = None if started else self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+        resp = SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+        return self._finish(resp, key, est, t0)
+
+    def _create_stream(self, prompt: str, temperature: float, emit: Callable[[str], None]) -> Tuple[str, Any]:
+        """Streamed completion: emit() each text delta; returns (content, usage)."""
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            temperature=temperature,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True,
+            **self._create_kwargs(),
+        )
+        parts, usage, finish_reason = [], None, None
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                emit(delta)
+            if chunk.choices:
+                finish_reason = getattr(chunk.choices[0], "finish_reason", None) or finish_reason
+            x_groq = getattr(chunk, "x_groq", None)
+            usage = getattr(chunk, "usage", None) or getattr(x_groq, "usage", None) or usage
+        self._check_length(finish_reason, usage)
+        return "".join(parts), usage
+
+    def _send(self, prompt: str, temperature: float):
+        """One request, hedged once the calling agent has a latency history."""
+        agent = tracing.current_node() or "-"
+
+        def timed():
+            t0 = time.monotonic()
+            resp = self._create(prompt, temperature)
+            self.latency.add(agent, time.monotonic() - t0)
+            return resp
+
+        delay = self.latency.percentile(agent) if self.hedge else None
+        if delay is None:
+            return timed()
+        return hedged_call(timed, delay, hedge=lambda: self._create(prompt, temperature),
+                           on_hedge=lambda: self._on_hedge(agent, delay))
+
+    def _on_hedge(self, agent: str, delay: float) -> None:
+        self.hedges += 1
+        tracing.record("hedge", model=self.model, after_s=round(delay, 4))
+        log.info(f"[LLM] hedging {agent} request on model={self.model} after p95={delay:.2f}s")
 
-    def chat(self, prompt: str, temperature: float = 0.2) -> str:
-        resp = self.client.chat.completions.create(
+    def _create(self, prompt: str, temperature: float):
+        return self.client.chat.completions.create(
             model=self.model,
             temperature=temperature,
             messages=[{"role": "user", "content": prompt}],
+            **self._create_kwargs(),
         )
-        return resp.choices[0].message.content
+
+    def _create_kwargs(self) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {"max_tokens": self.max_tokens} if self.max_tokens else {}
+        timeout = deadline.call_timeout(self.timeout_s)
+        if timeout:
+            kwargs["timeout"] = timeout
+        return kwargs
+
+    def _retry_delay(self, e: Exception, attempt: int) -> Optional[float]:
+        if attempt >= self.max_retries or not is_retryable(e) or deadline.expired():
+            return None
+        delay = backoff_delay(attempt, retry_after_s(e))
+        log.warning(f"[LLM] {type(e).__name__} on model={self.model}; retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+        return delay
+
+    def _cache_lookup(self, prompt: str, temperature: float, use_cache: Optional[bool]):
+        if self.cache is None or use_cache is False:
+            return None, None
+        if not (use_cache or temperature == 0 or self.cache_all_temperatures):
+            return None, None
+        key = self.cache_key(prompt, temperature)
+        hit = self.cache.get(key)
+        if hit is None:
+            return key, None
+        entry = json.loads(hit)
+        tracing.record("llm", model=self.model, cached=True, latency_s=0.0, prompt_tokens=0, completion_tokens=0)
+        log.info(f"[LLM] cache hit model={self.model} temp={temperature} "
+                 f"saved~{entry.get('latency_s', 0.0):.2f}s ({self.cache.stats()})")
+        return key, entry["content"]
+
+    def _check_length(self, finish_reason: Optional[str], usage) -> None:
+        if finish_reason == "length":
+            log.warning(f"[LLM] {tracing.current_node() or '-'}: output cut off at the length limit "
+                        f"(max_tokens={self.max_tokens or 'model default'}, "
+                        f"completion_tokens={getattr(usage, 'completion_tokens', None)}) on model={self.model}")
+
+    def _finish(self, resp, key: Optional[str], est: int, t0: float) -> str:
+        usage = getattr(resp, "usage", None)
+        self._check_length(getattr(resp.choices[0], "finish_reason", None), usage)
+        if self.limiter:
+            self.limiter.settle(est, getattr(usage, "total_tokens", None))
+        content = resp.choices[0].message.content
+        tracing.record(
+            "llm", model=self.model, cached=False,
+            latency_s=round(time.monotonic() - t0, 4),
+            prompt_tokens=getattr(usage, "prompt_tokens", None),
+            completion_tokens=getattr(usage, "completion_tokens", None),
+        )
+        if key is not None and content:
+            self.cache.set(key, json.dumps({"content": content, "latency_s": time.monotonic() - t0}))
+        return content
+
+    def cache_key(self, prompt: str, temperature: float) -> str:
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        key = f"{self.model}|{float(temperature)}|{prompt_hash}"
+        return f"{key}|{self.max_tokens}" if self.max_tokens else key
+
+class AsyncGroqLLM(GroqLLM):
+    """
+    Async variant of GroqLLM: achat() awaits AsyncGroq under the same cache,
+    limiter and retry policy. chat() is inherited, so sync agents keep working
+    with the same object (the sync facade).
+    """
+    def __init__(self, api_key: str, model: str, **kwargs):
+        super().__init__(api_key, model, **kwargs)
+        self.aclient = AsyncGroq(api_key=api_key, max_retries=0)
+
+    async def achat(self, prompt: str, temperature: float = 0.2, use_cache: Optional[bool] = None) -> str:
+        if self.replay is not None and self.replay.replaying:
+            return self.replay.take("llm", self.cache_key(prompt, temperature))
+        if temperature == 0 and use_cache is not False:
+            content = await _chat_flight.ado(self.cache_key(prompt, temperature),
+                                             lambda: self._achat(prompt, temperature, use_cache))
+        else:
+            content = await self._achat(prompt, temperature, use_cache)
+        if self.replay is not None:
+            self.replay.add("llm", self.cache_key(prompt, temperature), content)
+        return content
+
+    async def _achat(self, prompt: str, temperature: float, use_cache: Optional[bool]) -> str:
+        key, hit = self._cache_lookup(prompt, temperature, use_cache)
+        if hit is not None:
+            return hit
+
+        t0 = time.monotonic()
+        est = estimate_tokens(prompt, self.max_tokens or 512)
+        for attempt in range(self.max_retries + 1):
+            try:
+                if self.limiter:
+                    async with self.limiter.aslot(est):
+                        resp = await self._asend(prompt, temperature)
+                else:
+                    resp = await self._asend(prompt, temperature)
+                break
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+        return self._finish(resp, key, est, t0)
+
+    async def _asend(self, prompt: str, temperature: float):
+        agent = tracing.current_node() or "-"
+
+        async def timed():
+            t0 = time.monotonic()
+            resp = await self._acreate(prompt, temperature)
+            self.latency.add(agent, time.monotonic() - t0)
+            return resp
+
+        delay = self.latency.percentile(agent) if self.hedge else None
+        if delay is None:
+            return await timed()
+        return await ahedged_call(timed, delay, hedge=lambda: self._acreate(prompt, temperature),
+                                  on_hedge=lambda: self._on_hedge(agent, delay))
+
+    async def _acreate(self, prompt: str, temperature: float):
+        return await self.aclient.chat.completions.create(
+            model=self.model,
+            temperature=temperature,
+            messages=[{"role": "user", "content": prompt}],
+            **self._create_kwargs(),
+        )
+
+def make_llm_cache(settings):
+    """The response cache settings.llm_cache asks for, or None."""
+    max_bytes = settings.llm_cache_max_mb * 1024 * 1024
+    if settings.llm_cache == "memory":
+        return MemoryCache(max_bytes=max_bytes)
+    if settings.llm_cache == "disk":
+        return SQLiteCache(settings.llm_cache_path, max_bytes=max_bytes)
+    return None
+
+def make_llm(settings, model: Optional[str] = None, asynchronous: bool = False,
+             max_tokens: Optional[int] = None, cache=None) -> GroqLLM:
+    """A client; pass `cache` to share one response cache between clients (keys include the model)."""
+    cls = AsyncGroqLLM if asynchronous else GroqLLM
+    return cls(
+        api_key=settings.groq_api_key,
+        model=model or settings.groq_model,
+        cache=cache if cache is not None else make_llm_cache(settings),
+        cache_all_temperatures=settings.llm_cache_all_temperatures,
+        limiter=shared_limiter(settings.groq_rpm, settings.groq_tpm, settings.groq_max_in_flight),
+        max_retries=settings.groq_max_retries,
+        replay=open_replay(settings.replay_mode, settings.replay_path),
+        max_tokens=max_tokens,
+        timeout_s=settings.llm_timeout_s or None,
+        hedge=settings.llm_hedge,
+    )
 
 def extract_first_json(text: str) -> Dict[str, Any]:
+    """First JSON object in model output (prose and ``` fences around it are ignored)."""
     if not text:
         raise ValueError("Empty model output.")
-
-    # Prefer fenced JSON if present
-    fenced = re.search(r"```(?:json)?\s*(\{.*\})\s*```", text, flags=re.DOTALL | re.IGNORECASE)
-    if fenced:
-        candidate = fenced.group(1)
-        candidate = candidate.replace("“", "\"").replace("”", "\"").replace("’", "'")
-        return json.loads(candidate)
-
-    # Find first balanced {...}
-    start = text.find("{")
-    if start == -1:
-        raise ValueError("No JSON object found in model output.")
-
-    depth = 0
-    in_str = False
-    esc = False
-    for i in range(start, len(text)):
-        ch = text[i]
-        if in_str:
-            if esc:
-                esc = False
-            elif ch == "\\":
-                esc = True
-            elif ch == '"':
-                in_str = False
-        else:
-            if ch == '"':
-                in_str = True
-            elif ch == "{":
-                depth += 1
-            elif ch == "}":
-                depth -= 1
-                if depth == 0:
-                    candidate = text[start:i+1]
-                    candidate = candidate.replace("“", "\"").replace("”", "\"").replace("’", "'")
-                    return json.loads(candidate)
-
-    raise ValueError("Found '{' but never found a complete balanced JSON object.")
+    return parse_first(text, opening="{")
 
 
 
@@ -0,0 +1,159 @@
+import json
+import math
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_encoder = None
+_encoder_loaded = False
+
+
+def _get_encoder():
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        _encoder_loaded = True
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoder = None
+    return _encoder
+
+def count_tokens(text: str) -> int:
+    """
+    Token count with tiktoken's cl100k_base when installed (close to Llama's BPE),
+    otherwise a word/punctuation heuristic that holds up better on JSON than chars/4.
+    """
+    if not text:
+        return 0
+    enc = _get_encoder()
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    # ~1 token per punctuation mark, 1 per short word, +1 per extra 4 chars of a long word
+    return sum(1 + max(0, len(w) - 4) // 4 if w[0].isalnum() or w[0] == "_" else 1
+               for w in _WORD_RE.findall(text))
+
+
+def render(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _shorten(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars].rsplit(" ", 1)[0]
+    return cut.rstrip(" ,;:") + "…"
+
+def _prune(value: Any, max_items: Optional[int], max_chars: Optional[int]) -> Any:
+    if isinstance(value, dict):
+        out = {}
+        for k, v in value.items():
+            v = _prune(v, max_items, max_chars)
+            if v not in (None, "", [], {}):
+                out[k] = v
+        return out
+    if isinstance(value, list):
+        items = [_prune(v, max_items, max_chars) for v in value]
+        items = [v for v in items if v not in (None, "", [], {})]
+        return items[:max_items] if max_items is not None else items
+    if isinstance(value, str) and max_chars is not None:
+        return _shorten(value, max_chars)
+    return value
+
+# (max list items, max string chars) per compaction level; level 1 only drops empty values
+JSON_LEVELS = [(None, None), (8, 300), (4, 160), (2, 80), (1, 40)]
+
+def compact_json(value: Any, level: int) -> Optional[Any]:
+    """Structurally smaller copy of a JSON-able value, or None when out of levels."""
+    if level > len(JSON_LEVELS):
+        return None
+    max_items, max_chars = JSON_LEVELS[level - 1]
+    return _prune(value, max_items, max_chars)
+
+
+def compact_text(text: str, level: int) -> Optional[str]:
+    """
+    Shrink plain text (e.g. a research bundle of 'SOURCE:' blocks) by dropping
+    trailing paragraphs of every block, so each source keeps its opening.
+    """
+    blocks = re.split(r"\n\n(?=SOURCE: )", text or "")
+    keep = 0.75 ** level
+    out, shrunk = [], False
+    for block in blocks:
+        units = block.split("\n\n")
+        sep = "\n\n"
+        if len(units) <= 2:
+            units, sep = block.split("\n"), "\n"
+        n = max(1, math.ceil(len(units) * keep))
+        if n < len(units):
+            shrunk = True
+        out.append(sep.join(units[:n]))
+    return "\n\n".join(out) if shrunk else None
+
+
+@dataclass
+class Section:
+    """
+    One variable part of a prompt.
+    priority: higher survives longer when the total budget is exceeded.
+    max_tokens: cap for this section alone.
+    compactor(value, level) -> smaller value, or None when it cannot shrink further.
+    """
+    name: str
+    value: Any
+    priority: int = 1
+    max_tokens: Optional[int] = None
+    compactor: Optional[Callable[[Any, int], Any]] = None
+
+    def __post_init__(self):
+        if self.compactor is None:
+            self.compactor = compact_text if isinstance(self.value, str) else compact_json
+        self.level = 0
+        self.current = self.value
+        self.text = render(self.value)
+        self.tokens = count_tokens(self.text)
+        self.original_tokens = self.tokens
+
+    def shrink(self) -> bool:
+        # a level may not actually save anything (nothing to prune yet); keep going until it does
+        while True:
+            self.level += 1
+            smaller = self.compactor(self.value, self.level)
+            if smaller is None:
+                return False
+            text = render(smaller)
+            tokens = count_tokens(text)
+            if tokens < self.tokens:
+                self.current, self.text, self.tokens = smaller, text, tokens
+                return True
+
+
+def fit_sections(sections: List[Section], budget: Optional[int] = None, logger=None,
+                 label: str = "Prompt") -> Dict[str, str]:
+    """
+    Render each section within its own max_tokens, then, while the sum is over
+    `budget`, compact the lowest-priority (largest on ties) section that can
+    still shrink. Returns {name: rendered text}.
+    """
+    for s in sections:
+        while s.max_tokens is not None and s.tokens > s.max_tokens and s.shrink():
+            pass
+
+    if budget is not None:
+        live = list(sections)
+        while live and sum(s.tokens for s in sections) > budget:
+            s = min(live, key=lambda x: (x.priority, -x.tokens))
+            if not s.shrink():
+                live.remove(s)
+
+    if logger:
+        changed = [f"{s.name} {s.original_tokens}->{s.tokens}" for s in sections if s.level]
+        if changed:
+            logger.info(f"[{label}] compacted {', '.join(changed)} tokens")
+        over = [s.name for s in sections if s.max_tokens is not None and s.tokens > s.max_tokens]
+        if over:
+            logger.warning(f"[{label}] still over budget after compaction: {over}")
+    return {s.name: s.text for s in sections}
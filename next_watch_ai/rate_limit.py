@@ -0,0 +1,129 @@
+import asyncio
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled at `per_minute` tokens per minute.
+    reserve() always succeeds and returns how long the caller must wait before
+    using what it reserved, so concurrent callers queue up instead of racing.
+    """
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, n: float = 1.0) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= min(n, self.capacity)
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def refund(self, n: float) -> None:
+        """Give back (n > 0) or take more (n < 0) tokens once the real cost is known."""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + n)
+
+
+class RateLimiter:
+    """
+    Requests/min + tokens/min buckets and a max-in-flight gate, shared by every
+    client that holds it. Usable from threads (slot) and coroutines (aslot).
+    """
+    def __init__(self, requests_per_min: float = 0, tokens_per_min: float = 0, max_in_flight: int = 8):
+        self.requests = TokenBucket(requests_per_min) if requests_per_min else None
+        self.tokens = TokenBucket(tokens_per_min) if tokens_per_min else None
+        self._gate = threading.BoundedSemaphore(max(1, max_in_flight))
+
+    def _delay(self, est_tokens: int) -> float:
+        delay = 0.0
+        if self.requests:
+            delay = max(delay, self.requests.reserve(1))
+        if self.tokens:
+            delay = max(delay, self.tokens.reserve(est_tokens))
+        return delay
+
+    def settle(self, est_tokens: int, actual_tokens: Optional[int]) -> None:
+        if self.tokens and actual_tokens is not None:
+            self.tokens.refund(est_tokens - actual_tokens)
+
+    @contextmanager
+    def slot(self, est_tokens: int = 0):
+        self._gate.acquire()
+        try:
+            delay = self._delay(est_tokens)
+            if delay:
+                time.sleep(delay)
+            yield
+        finally:
+            self._gate.release()
+
+    @asynccontextmanager
+    async def aslot(self, est_tokens: int = 0):
+        # the gate is a threading semaphore so sync and async callers share it;
+        # poll it instead of blocking the event loop
+        while not self._gate.acquire(blocking=False):
+            await asyncio.sleep(0.01)
+        try:
+            delay = self._delay(est_tokens)
+            if delay:
+                await asyncio.sleep(delay)
+            yield
+        finally:
+            self._gate.release()
+
+
+_shared: Optional[RateLimiter] = None
+_shared_lock = threading.Lock()
+
+def shared_limiter(requests_per_min: float, tokens_per_min: float, max_in_flight: int) -> RateLimiter:
+    """Process-wide limiter: every client built through make_llm draws from the same budget."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = RateLimiter(requests_per_min, tokens_per_min, max_in_flight)
+        return _shared
+
+
+def estimate_tokens(text: str, completion_tokens: int = 512) -> int:
+    # rough pre-flight estimate (~4 chars/token); corrected after the call via settle()
+    return len(text or "") // 4 + completion_tokens
+
+def retry_after_s(exc: Exception) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def is_retryable(exc: Exception) -> bool:
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    # connection errors / timeouts carry no status code
+    return type(exc).__name__ in ("APIConnectionError", "APITimeoutError")
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None,
+                  base: float = 0.5, cap: float = 30.0) -> float:
+    """Full-jitter exponential backoff; a server-supplied retry-after takes precedence."""
+    if retry_after is not None:
+        return min(cap, retry_after) + random.uniform(0, base)
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
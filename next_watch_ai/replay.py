@@ -0,0 +1,136 @@
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import defaultdict, deque
+from typing import Any, Dict, List, Optional
+
+from firecrawl import WebsiteNotSupportedError
+
+from next_watch_ai.firecrawl_utils import extract_html, extract_markdown, normalize_url
+
+
+class ReplayMiss(KeyError):
+    """The replay file has no recorded response for this call."""
+
+
+class ReplayedScrapeError(Exception):
+    """Stands in for a non-Firecrawl scrape error that was recorded."""
+
+
+class ReplayLog:
+    """
+    Compact record of every LLM response and scrape result of a run (gzip JSONL).
+
+    mode="record": add() appends events as they happen (thread-safe).
+    mode="replay": take() serves them back by key, in recorded order per key,
+    with no network and no rate limiting. Keys are content hashes, so replay is
+    deterministic even when calls happen in a different order (threads).
+    """
+    def __init__(self, path: str, mode: str):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown replay mode: {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.replaying = mode == "replay"
+        self._lock = threading.Lock()
+        self._events: Dict[tuple, deque] = defaultdict(deque)
+        self._last: Dict[tuple, Any] = {}
+        self.runs: List[Dict[str, Any]] = []
+
+        if self.replaying:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    e = json.loads(line)
+                    if e["kind"] == "run":
+                        self.runs.append(e["payload"])
+                    else:
+                        self._events[(e["kind"], e["key"])].append(e["payload"])
+            self._out = None
+        else:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._out = gzip.open(path, "at", encoding="utf-8")
+            atexit.register(self.close)
+
+    def add(self, kind: str, key: str, payload: Any) -> None:
+        if self._out is None:
+            return
+        line = json.dumps({"kind": kind, "key": key, "payload": payload}, ensure_ascii=False)
+        with self._lock:
+            self._out.write(line + "\n")
+
+    def take(self, kind: str, key: str) -> Any:
+        with self._lock:
+            queue = self._events.get((kind, key))
+            if queue:
+                self._last[(kind, key)] = queue.popleft()
+            elif (kind, key) not in self._last:
+                raise ReplayMiss(f"no recorded {kind} response for key {key[:16]}… in {self.path}")
+            # a key asked for more often than recorded gets its last response again
+            return self._last[(kind, key)]
+
+    def record_run(self, state: Dict[str, Any]) -> None:
+        """Store the inputs of a graph.invoke so `cli.py replay` can re-run it."""
+        self.add("run", "", state)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._out is not None:
+                self._out.close()
+                self._out = None
+
+
+_logs: Dict[str, ReplayLog] = {}
+_logs_lock = threading.Lock()
+
+def open_replay(mode: str, path: str) -> Optional[ReplayLog]:
+    """One ReplayLog per path per process, shared by the LLM and Firecrawl clients."""
+    if not mode:
+        return None
+    with _logs_lock:
+        if path not in _logs:
+            _logs[path] = ReplayLog(path, mode)
+        return _logs[path]
+
+
+def scrape_key(url: str, formats: Optional[List[str]]) -> str:
+    fmts = ",".join(sorted(formats or ["markdown"]))
+    return hashlib.sha256(f"{normalize_url(url)}|{fmts}".encode("utf-8")).hexdigest()
+
+
+class RecordingFirecrawl:
+    """Passes scrape() through and records what came back (or what was raised)."""
+    def __init__(self, firecrawl, log: ReplayLog):
+        self.firecrawl = firecrawl
+        self.log = log
+
+    def scrape(self, url: str, formats: Optional[List[str]] = None, **kwargs):
+        formats = list(formats or ["markdown"])
+        key = scrape_key(url, formats)
+        try:
+            res = self.firecrawl.scrape(url=url, formats=formats, **kwargs)
+        except Exception as e:
+            self.log.add("scrape", key, {"error": type(e).__name__, "message": str(e)})
+            raise
+        self.log.add("scrape", key, {"markdown": extract_markdown(res), "html": extract_html(res)})
+        return res
+
+    def __getattr__(self, name):
+        return getattr(self.firecrawl, name)
+
+
+class ReplayFirecrawl:
+    """Firecrawl stand-in that answers scrape() from a ReplayLog."""
+    def __init__(self, log: ReplayLog):
+        self.log = log
+
+    def scrape(self, url: str, formats: Optional[List[str]] = None, **kwargs):
+        entry = self.log.take("scrape", scrape_key(url, formats))
+        if "error" in entry:
+            if entry["error"] == "WebsiteNotSupportedError":
+                raise WebsiteNotSupportedError(entry["message"], status_code=403)
+            raise ReplayedScrapeError(f"{entry['error']}: {entry['message']}")
+        return entry
@@ -0,0 +1,123 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from next_watch_ai.cache import SQLiteCache
+from next_watch_ai.catalog import TitleCatalog, title_key
+
+# what a cached run keeps: enough to show the cards, answer questions and revise
+RESULT_FIELDS = ("taste", "candidates", "curated", "cards")
+
+_EMPTY_SPECS = {"", "none", "no", "n a", "na", "nothing", "no preference", "no preferences"}
+
+
+def normalize_specs(extra_specs: str) -> str:
+    s = re.sub(r"[^\w\s]", " ", (extra_specs or "").casefold())
+    s = re.sub(r"\s+", " ", s).strip()
+    return "" if s in _EMPTY_SPECS else s
+
+
+class RunCache:
+    """
+    Whole-run result cache keyed on the normalized inputs (see key()).
+
+    Entries are fresh for ttl_s. With stale_s > 0 an older entry is still served
+    for up to stale_s more (stale-while-revalidate) while one background thread
+    recomputes it. Size-bounded LRU eviction comes from the backing cache.
+    """
+    def __init__(self, cache, ttl_s: float, stale_s: float = 0.0, logger=None):
+        self.cache = cache
+        self.ttl_s = ttl_s
+        self.stale_s = stale_s
+        self.logger = logger
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def key(self, seed_titles: List[str], content_type: str, extra_specs: str, model: str,
+            catalog: Optional[TitleCatalog] = None) -> str:
+        """Order-, case- and alias-insensitive: seeds resolve to catalog IDs when a catalog is loaded."""
+        seeds = []
+        for t in seed_titles:
+            entry = catalog.resolve(t, content_type) if catalog else None
+            seeds.append(entry.id if entry else title_key(t))
+        raw = json.dumps([sorted(set(seeds)), content_type, normalize_specs(extra_specs), model])
+        return "run|" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """(result, "fresh" | "stale" | "miss")."""
+        raw = self.cache.get(key)
+        if raw is None:
+            return None, "miss"
+        entry = json.loads(raw)
+        age = time.time() - entry["created"]
+        return entry["result"], "fresh" if age <= self.ttl_s else "stale"
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        cards, curated = result.get("cards") or {}, result.get("curated") or {}
+        if not cards.get("cards") or cards.get("partial") or curated.get("partial"):
+            return  # never cache a run that produced nothing, or only deadline fallbacks
+        entry = {"created": time.time(), "result": {f: result.get(f) for f in RESULT_FIELDS}}
+        self.cache.set(key, json.dumps(entry, ensure_ascii=False), ttl_s=self.ttl_s + self.stale_s)
+
+    def get_or_run(self, key: str, compute: Callable[[], Dict[str, Any]],
+                   refresh: Optional[Callable[[], Dict[str, Any]]] = None) -> Tuple[Dict[str, Any], str]:
+        """
+        Serve `key` from the cache, or compute() and store it. A stale hit is
+        returned as is and refresh() (default: compute) runs in the background.
+        Returns (result, "fresh" | "stale" | "miss").
+        """
+        cached, status = self.get(key)
+        if status == "fresh":
+            self._log(f"[RunCache] hit key={key[4:16]}")
+            return cached, status
+        if status == "stale":
+            self._log(f"[RunCache] stale hit key={key[4:16]}; refreshing in the background")
+            self._refresh(key, refresh or compute)
+            return cached, status
+        result = compute()
+        self.put(key, result)
+        return result, "miss"
+
+    def _refresh(self, key: str, compute: Callable[[], Dict[str, Any]]) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def work():
+            try:
+                self.put(key, compute())
+                self._log(f"[RunCache] refreshed key={key[4:16]}")
+            except Exception as e:
+                if self.logger:
+                    self.logger.warning(f"[RunCache] background refresh failed key={key[4:16]} | {type(e).__name__}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=work, name=f"run-cache-refresh-{key[4:12]}", daemon=True).start()
+
+    def _log(self, msg: str) -> None:
+        if self.logger:
+            self.logger.info(msg)
+
+
+_run_caches: Dict[str, RunCache] = {}
+_run_caches_lock = threading.Lock()
+
+def open_run_cache(settings, logger=None) -> Optional[RunCache]:
+    """Process-wide RunCache for settings.run_cache_path; None when disabled or replaying."""
+    if not settings.run_cache_path or settings.replay_mode:
+        return None
+    with _run_caches_lock:
+        if settings.run_cache_path not in _run_caches:
+            _run_caches[settings.run_cache_path] = RunCache(
+                SQLiteCache(settings.run_cache_path, max_bytes=settings.run_cache_max_mb * 1024 * 1024),
+                ttl_s=settings.run_cache_ttl_hours * 3600,
+                stale_s=settings.run_cache_stale_hours * 3600,
+                logger=logger,
+            )
+        return _run_caches[settings.run_cache_path]
@@ -0,0 +1,138 @@
+import json
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from next_watch_ai.llm import GroqLLM, make_llm, make_llm_cache
+
+AGENTS = ("research", "fingerprint", "taste", "candidates", "curator", "explain", "critic", "controller")
+
+# Latency/quality tiers. Both default to GROQ_MODEL, so routing changes nothing until
+# GROQ_FAST_MODEL / GROQ_QUALITY_MODEL (or MODEL_ROUTES) say otherwise.
+AGENT_TIERS = {
+    "research": "fast",      # URL list
+    "fingerprint": "fast",   # structured extraction from evidence
+    "taste": "quality",
+    "candidates": "quality",
+    "curator": "quality",
+    "explain": "quality",
+    "critic": "fast",
+    "controller": "fast",    # routing decision + short Q&A answers
+}
+
+
+@dataclass(frozen=True)
+class Route:
+    model: str
+    temperature: Optional[float] = None   # None keeps the agent's own temperature
+    max_tokens: Optional[int] = None
+    fallbacks: Tuple[str, ...] = field(default_factory=tuple)
+
+
+def load_routes(settings) -> Dict[str, Route]:
+    """
+    Tier defaults, overridden per agent by settings.model_routes: inline JSON or a
+    path to a JSON file shaped like
+    {"taste": {"model": "...", "temperature": 0.3, "max_tokens": 1500, "fallbacks": ["..."]}}.
+    """
+    tiers = {"fast": settings.groq_fast_model or settings.groq_model,
+             "quality": settings.groq_quality_model or settings.groq_model}
+    routes = {
+        # no max_tokens by default: a cap that cuts a JSON answer short costs more than it saves
+        a: Route(model=tiers[AGENT_TIERS[a]],
+                 fallbacks=tuple(m for m in (settings.groq_model,) if m != tiers[AGENT_TIERS[a]]))
+        for a in AGENTS
+    }
+
+    spec = (settings.model_routes or "").strip()
+    if not spec:
+        return routes
+    if not spec.startswith("{"):
+        with open(spec, encoding="utf-8") as f:
+            spec = f.read()
+    for agent, cfg in json.loads(spec).items():
+        if agent not in routes:
+            raise ValueError(f"MODEL_ROUTES: unknown agent {agent!r} (expected one of {', '.join(AGENTS)})")
+        if isinstance(cfg, str):
+            cfg = {"model": cfg}
+        base = routes[agent]
+        routes[agent] = Route(
+            model=tiers.get(cfg.get("model"), cfg.get("model")) or base.model,
+            temperature=cfg.get("temperature", base.temperature),
+            max_tokens=cfg.get("max_tokens", base.max_tokens),
+            fallbacks=tuple(tiers.get(m, m) for m in cfg.get("fallbacks", base.fallbacks)),
+        )
+    return routes
+
+
+def routes_signature(settings) -> str:
+    """Compact description of the routing, for cache keys."""
+    return ",".join(f"{a}={r.model}" for a, r in load_routes(settings).items())
+
+
+class RoutedLLM:
+    """
+    One agent's client: applies its route's temperature, and on an error that
+    survived the primary client's own retries (rate limit, 5xx, timeout...) tries
+    the fallback models in order. Looks like a GroqLLM to the agents.
+    """
+    def __init__(self, agent: str, route: Route, clients: List[GroqLLM], logger=None):
+        self.agent = agent
+        self.route = route
+        self.clients = clients
+        self.logger = logger
+
+    @property
+    def model(self) -> str:
+        return self.clients[0].model
+
+    def chat(self, prompt: str, temperature: float = 0.2, use_cache: Optional[bool] = None,
+             on_delta: Optional[Callable[[str], None]] = None) -> str:
+        if self.route.temperature is not None:
+            temperature = self.route.temperature
+        streamed = []
+
+        def emit(delta: str) -> None:
+            streamed.append(True)
+            on_delta(delta)
+
+        for i, client in enumerate(self.clients):
+            try:
+                return client.chat(prompt, temperature=temperature, use_cache=use_cache,
+                                   on_delta=emit if on_delta else None)
+            except Exception as e:
+                # once text has been streamed, a fallback model would repeat it
+                if i == len(self.clients) - 1 or streamed:
+                    raise
+                if self.logger:
+                    self.logger.warning(f"[Routing] {self.agent}: {client.model} failed ({type(e).__name__}: {e}); "
+                                        f"falling back to {self.clients[i + 1].model}")
+
+    def __getattr__(self, name):
+        return getattr(self.clients[0], name)
+
+
+def make_agent_llms(settings, logger=None, llm=None) -> Dict[str, Any]:
+    """
+    agent name -> client. An injected `llm` (bench fakes, replay) is used for every
+    agent unchanged; otherwise each agent gets a RoutedLLM, with one underlying
+    GroqLLM per (model, max_tokens) shared across agents, and one response cache
+    shared by all of them.
+    """
+    if llm is not None:
+        return {a: llm for a in AGENTS}
+    routes = load_routes(settings)
+    cache = make_llm_cache(settings)
+    pool: Dict[Tuple[str, Optional[int]], GroqLLM] = {}
+
+    def client(model: str, max_tokens: Optional[int]) -> GroqLLM:
+        if (model, max_tokens) not in pool:
+            pool[(model, max_tokens)] = make_llm(settings, model=model, max_tokens=max_tokens, cache=cache)
+        return pool[(model, max_tokens)]
+
+    llms = {}
+    for agent, route in routes.items():
+        models = [route.model] + [m for m in route.fallbacks if m != route.model]
+        llms[agent] = RoutedLLM(agent, route, [client(m, route.max_tokens) for m in models], logger)
+    if logger:
+        logger.info("[Routing] " + ", ".join(f"{a}={r.model}" for a, r in routes.items()))
+    return llms
@@ -0,0 +1,319 @@
+"""
+Pydantic schemas for every agent's JSON output, and chat_json(), which parses a
+response against one in up to three steps:
+
+    ok          the first JSON object parses and validates (values coerced, defaults filled)
+    repaired    it only does after json_repair (trailing commas, bare keys, truncation, ...)
+    reprompted  neither works, so the model is asked once to reformat its own output
+
+The validated dicts keep the shapes the agents always returned. How often each
+path fires, per agent, is logged and available from parse_stats().
+"""
+import threading
+from collections import Counter
+from typing import Annotated, Any, Dict, List, Optional, Tuple, Type
+
+from pydantic import AfterValidator, BaseModel, BeforeValidator, ConfigDict, Field, model_validator
+
+from next_watch_ai.json_repair import parse_repaired
+from next_watch_ai.llm import extract_first_json
+from next_watch_ai.logging_utils import truncate
+
+PATHS = ("ok", "repaired", "reprompted", "failed")
+
+REFORMAT_PROMPT = """
+You MUST output ONLY valid JSON (no prose, no markdown).
+Your previous answer could not be parsed ({error}).
+Reformat it into the required JSON schema, keeping its content.
+
+{schema}
+
+PREVIOUS ANSWER:
+{text}
+"""
+
+
+# ---- coercions ---------------------------------------------------------------
+
+def _text(v: Any) -> str:
+    if v is None:
+        return ""
+    if isinstance(v, (list, tuple)):
+        return "; ".join(t for t in (_text(x) for x in v) if t)
+    return str(v).strip()
+
+
+def _texts(v: Any) -> List[str]:
+    if v is None:
+        return []
+    if isinstance(v, dict):
+        v = list(v.values())
+    if not isinstance(v, (list, tuple)):
+        v = [v]
+    return [t for t in (_text(x) for x in v) if t]
+
+
+def _year(v: Any) -> Optional[str]:
+    if isinstance(v, float) and v.is_integer():
+        v = int(v)
+    text = _text(v)
+    return text if text and text.lower() not in ("null", "none", "n/a", "unknown") else None
+
+
+def _unit(v: Any) -> Optional[float]:
+    try:
+        x = float(str(v).strip().rstrip("%")) if v is not None else None
+    except ValueError:
+        return None
+    if x is None or x != x:
+        return None
+    if 1.0 < x <= 100.0:   # a percentage
+        x /= 100.0
+    return min(1.0, max(0.0, x))
+
+
+def _choice(*values: str, default: Optional[str] = None):
+    def check(v: Any) -> Optional[str]:
+        text = _text(v).lower().replace(" ", "_").replace("-", "_")
+        return text if text in values else default
+    return BeforeValidator(check)
+
+
+def _records(v: Any) -> List[Dict[str, Any]]:
+    # a lone object or bare titles where a list of objects belongs
+    if v is None:
+        return []
+    if isinstance(v, dict):
+        v = [v]
+    return [x if isinstance(x, dict) else {"title": x} for x in v if isinstance(x, (dict, str))] \
+        if isinstance(v, (list, tuple)) else []
+
+
+def _titled(items: List[Any]) -> List[Any]:
+    return [x for x in items if x.title]
+
+
+Text = Annotated[str, BeforeValidator(_text)]
+Texts = Annotated[List[str], BeforeValidator(_texts)]
+Year = Annotated[Optional[str], BeforeValidator(_year)]
+Unit = Annotated[Optional[float], BeforeValidator(_unit)]
+
+
+class Schema(BaseModel):
+    """Unknown keys are dropped; a null or missing section validates as its defaults."""
+    model_config = ConfigDict(extra="ignore")
+
+    @model_validator(mode="before")
+    @classmethod
+    def _none_as_empty(cls, v: Any) -> Any:
+        return {} if v is None else v
+
+
+# ---- fingerprint ---------------------------------------------------------------
+
+class AuthorshipVoice(Schema):
+    director_style: Texts = []
+    screenwriter_style: Texts = []
+    cinematography_style: Texts = []
+    editing_style: Texts = []
+
+
+class NarrativeArchitecture(Schema):
+    structure_type: Text = ""
+    inciting_incident_timing: Annotated[Optional[str], _choice("early", "mid", "late")] = None
+    pacing: Annotated[Optional[str], _choice("slow", "moderate", "fast")] = None
+    ending_type: Annotated[Optional[str], _choice("ambiguous", "resolved", "ironic", "circular")] = None
+    conflict_type: Annotated[Optional[str], _choice("internal", "external", "mixed")] = None
+
+
+class ThemesSubtext(Schema):
+    primary_themes: Texts = []
+    motifs: Texts = []
+    worldview: Annotated[Optional[str], _choice("bleak", "hopeful", "mixed")] = None
+    moral_stance: Annotated[Optional[str], _choice("compassionate", "cynical", "neutral")] = None
+
+
+class StyleTone(Schema):
+    realism_vs_stylized: Unit = None
+    humor_style: Annotated[Optional[str], _choice("none", "deadpan", "dark", "broad")] = None
+    dread_style: Annotated[Optional[str], _choice("psychological", "cosmic", "social", "bodily")] = None
+    performance_style: Annotated[Optional[str], _choice("naturalistic", "theatrical")] = None
+
+
+class Extras(Schema):
+    dialogue_density: Annotated[Optional[str], _choice("low", "med", "high")] = None
+    narrative_mode: Annotated[Optional[str], _choice("linear", "nonlinear", "elliptical")] = None
+    intensity_curve: Annotated[Optional[str], _choice("gradual", "spiky", "constant")] = None
+
+
+class Confidence(Schema):
+    overall: Unit = None
+    low_confidence_fields: Texts = []
+
+
+# at least one of these must carry something for a fingerprint to count
+FINGERPRINT_SECTIONS = ("authorship_voice", "narrative_architecture", "themes_subtext", "style_tone", "extras")
+
+
+class Fingerprint(Schema):
+    authorship_voice: AuthorshipVoice = AuthorshipVoice()
+    narrative_architecture: NarrativeArchitecture = NarrativeArchitecture()
+    themes_subtext: ThemesSubtext = ThemesSubtext()
+    style_tone: StyleTone = StyleTone()
+    extras: Extras = Extras()
+    confidence: Confidence = Confidence()
+    non_spoiler_notes: Texts = []
+
+    @model_validator(mode="after")
+    def _require_content(self) -> "Fingerprint":
+        if all(getattr(self, s) == type(getattr(self, s))() for s in FINGERPRINT_SECTIONS):
+            raise ValueError(f"no content in any of {', '.join(FINGERPRINT_SECTIONS)}")
+        return self
+
+
+# ---- taste / candidates / curation / cards ---------------------------------------
+
+class QueryPack(Schema):
+    anchors: Texts = []
+    must_have: Texts = []
+    should_have: Texts = []
+    avoid: Texts = []
+
+
+class TasteProfile(Schema):
+    taste_summary: Text = ""
+    core_signals: Texts = []
+    secondary_signals: Texts = []
+    avoid_signals: Texts = []
+    query_pack: QueryPack = QueryPack()
+
+    @model_validator(mode="after")
+    def _require_signals(self) -> "TasteProfile":
+        if not self.taste_summary and not self.core_signals:
+            raise ValueError("taste profile has neither taste_summary nor core_signals")
+        return self
+
+
+class CandidateTitles(Schema):
+    titles: Annotated[Texts, Field(min_length=1)]
+
+
+class Pick(Schema):
+    title: Text = ""
+    year: Year = None
+    why_selected: Texts = []
+
+
+class Curation(Schema):
+    recommendations: Annotated[List[Pick], BeforeValidator(_records), AfterValidator(_titled), Field(min_length=1)]
+
+
+class Card(Schema):
+    title: Text = ""
+    year: Year = None
+    why_this_fits: Annotated[Texts, AfterValidator(lambda v: v[:3])] = []
+    watch_for: Text = ""
+
+
+class Cards(Schema):
+    cards: Annotated[List[Card], BeforeValidator(_records), AfterValidator(_titled), Field(min_length=1)]
+
+
+# ---- critic / controller -----------------------------------------------------------
+
+class CriticReport(Schema):
+    verdict: Annotated[Optional[str], _choice("pass", "fail")] = None
+    issues: Texts = []
+    must_fix: Texts = []
+    suggested_prompt_patch: Text = ""
+
+    @model_validator(mode="after")
+    def _infer_verdict(self) -> "CriticReport":
+        # an unreadable verdict fails only if the critic listed something to fix;
+        # with no verdict and nothing listed there is no report at all
+        if self.verdict is None:
+            if not self.must_fix and not self.issues:
+                raise ValueError("critic report has no verdict, issues or must_fix")
+            self.verdict = "fail" if self.must_fix else "pass"
+        return self
+
+
+class ControllerDecision(Schema):
+    action: Annotated[Optional[str], _choice("accept", "revise_candidates", "revise_curation",
+                                             "answer_question")] = None
+    rationale: Text = ""
+    message_to_user: Text = ""
+
+    @model_validator(mode="after")
+    def _require_action(self) -> "ControllerDecision":
+        if self.action is None:
+            raise ValueError("controller decision has no valid action")
+        return self
+
+
+# ---- parsing -------------------------------------------------------------------------
+
+_stats: Dict[str, Counter] = {}
+_stats_lock = threading.Lock()
+
+
+def _count(agent: str, path: str) -> str:
+    with _stats_lock:
+        c = _stats.setdefault(agent, Counter())
+        c[path] += 1
+        return " ".join(f"{p}={c[p]}" for p in PATHS)
+
+
+def parse_stats() -> Dict[str, Dict[str, int]]:
+    """{agent: {path: count}} since the process started."""
+    with _stats_lock:
+        return {agent: {p: c[p] for p in PATHS} for agent, c in _stats.items()}
+
+
+def parse_output(text: str, model: Type[Schema], parsed: Any = None) -> Tuple[Dict[str, Any], str]:
+    """
+    (validated dict, "ok" | "repaired"); ValueError if even the repaired text doesn't
+    validate. `parsed` is a value already parsed from `text` (e.g. while streaming).
+    """
+    if not text:
+        raise ValueError("Empty model output.")
+    try:
+        data = parsed if parsed is not None else extract_first_json(text)
+        return model.model_validate(data).model_dump(), "ok"
+    except ValueError as e:
+        first_error = e
+    try:
+        return model.model_validate(parse_repaired(text)).model_dump(), "repaired"
+    except ValueError:
+        raise first_error
+
+
+def chat_json(logger, llm, prompt: str, model: Type[Schema], agent: str, schema_hint: str,
+              temperature: float = 0.2, out: Optional[str] = None, parsed: Any = None) -> Dict[str, Any]:
+    """
+    llm.chat(prompt) (or the already received `out`, and `parsed` if it was parsed
+    on the fly) validated against `model`. Re-prompts once, at temperature 0, only
+    if local repair can't recover it.
+    """
+    if out is None:
+        out = llm.chat(prompt, temperature=temperature)
+    try:
+        data, path = parse_output(out, model, parsed)
+    except ValueError as e:
+        error = truncate(" ".join(str(e).split()), 200)  # pydantic errors span several lines
+        logger.warning(f"[Schemas] {agent}: unparseable output ({error}); re-prompting to reformat")
+        fixed = llm.chat(REFORMAT_PROMPT.format(error=error, schema=schema_hint, text=out),
+                         temperature=0.0)
+        try:
+            data, _ = parse_output(fixed, model)
+        except ValueError:
+            logger.error(f"[Schemas] {agent}: reformatted output still invalid | {_count(agent, 'failed')}")
+            raise
+        logger.info(f"[Schemas] {agent}: reformatted by re-prompt | {_count(agent, 'reprompted')}")
+        return data
+    stats = _count(agent, path)
+    if path == "repaired":
+        logger.info(f"[Schemas] {agent}: repaired locally, no re-prompt | {stats}")
+    else:
+        logger.debug(f"[Schemas] {agent}: parsed | {stats}")
+    return data
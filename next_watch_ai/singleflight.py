@@ -0,0 +1,68 @@
+import asyncio
+import copy
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller (leader) runs
+    the function, everyone arriving while it runs waits on the same future.
+    A failure propagates to every waiter, and nothing is remembered once the
+    call finishes. Waiters get a deep copy so callers can't mutate each other's results.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.leaders = 0
+        self.joined = 0
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key: Hashable):
+        with self._lock:
+            fut = self._calls.get(key)
+            if fut is not None:
+                self.joined += 1
+                return fut, False
+            fut = self._calls[key] = Future()
+            self.leaders += 1
+            return fut, True
+
+    def _finish(self, key: Hashable) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        fut, leader = self._join(key)
+        if not leader:
+            return copy.deepcopy(fut.result())
+        try:
+            result = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            self._finish(key)
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Async variant; shares futures with do(), so sync and async callers coalesce too."""
+        fut, leader = self._join(key)
+        if not leader:
+            return copy.deepcopy(await asyncio.wrap_future(fut))
+        try:
+            result = await fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            self._finish(key)
+
+    def stats(self) -> str:
+        return f"{self.name}: leaders={self.leaders} joined={self.joined}"
@@ -0,0 +1,22 @@
+"""Title helpers shared by the store, catalog, index and agents."""
+import re
+import unicodedata
+from typing import Optional, Tuple
+
+_YEAR_RE = re.compile(r"\s*[(\[]\s*((?:18|19|20)\d{2})\s*(?:[–-]\s*(?:\d{4})?\s*)?[)\]]\s*$")
+
+
+def split_year(text: str) -> Tuple[str, Optional[int]]:
+    """'Parasite (2019)' -> ('Parasite', 2019); 'Twin Peaks' -> ('Twin Peaks', None)."""
+    m = _YEAR_RE.search(text or "")
+    if not m:
+        return (text or "").strip(), None
+    return text[:m.start()].strip(), int(m.group(1))
+
+
+def normalize_title(title: str) -> str:
+    """Case/accent/punctuation-insensitive form of a title: "Twin Peaks " -> "twin peaks"."""
+    t = unicodedata.normalize("NFKD", title or "")
+    t = "".join(ch for ch in t if not unicodedata.combining(ch)).casefold()
+    t = re.sub(r"[^\w\s]", " ", t)
+    return re.sub(r"\s+", " ", t).strip()
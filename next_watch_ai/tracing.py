@@ -0,0 +1,129 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+# USD per 1M tokens (input, output); unknown models are costed at 0.
+MODEL_PRICES = {
+    "llama-3.1-8b-instant": (0.05, 0.08),
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+    "openai/gpt-oss-20b": (0.075, 0.30),
+    "openai/gpt-oss-120b": (0.15, 0.60),
+}
+
+_trace: ContextVar[Optional["RunTrace"]] = ContextVar("next_watch_trace", default=None)
+_node: ContextVar[Optional[str]] = ContextVar("next_watch_node", default=None)
+
+
+class RunTrace:
+    """
+    Structured record of one run: node spans, LLM calls and scrape calls.
+    Events are attributed to the graph node active in the calling context,
+    so worker threads must be started with a copied context (see concurrency.py).
+    """
+    def __init__(self, run_id: Optional[str] = None):
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.started = time.time()
+        self.events: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, **fields) -> None:
+        event = {"kind": kind, "node": _node.get(), "t": round(time.time() - self.started, 4), **fields}
+        with self._lock:
+            self.events.append(event)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """One row per node (in first-seen order) plus a TOTAL row."""
+        rows: Dict[str, Dict[str, Any]] = {}
+
+        def row(name):
+            return rows.setdefault(name, {
+                "node": name, "runs": 0, "latency_s": 0.0, "llm_calls": 0, "llm_latency_s": 0.0,
+                "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0,
+                "scrapes": 0, "scrape_latency_s": 0.0, "scrape_bytes": 0,
+            })
+
+        with self._lock:
+            events = list(self.events)
+        for e in events:
+            if e["kind"] == "node":
+                r = row(e["name"])
+                r["runs"] += 1
+                r["latency_s"] += e["latency_s"]
+                continue
+            r = row(e.get("node") or "-")
+            if e["kind"] == "llm":
+                r["llm_calls"] += 1
+                r["llm_latency_s"] += e["latency_s"]
+                r["prompt_tokens"] += e.get("prompt_tokens") or 0
+                r["completion_tokens"] += e.get("completion_tokens") or 0
+                r["cost_usd"] += llm_cost(e.get("model", ""), e.get("prompt_tokens"), e.get("completion_tokens"))
+            elif e["kind"] == "scrape":
+                r["scrapes"] += 1
+                r["scrape_latency_s"] += e["latency_s"]
+                r["scrape_bytes"] += e.get("bytes") or 0
+
+        out = list(rows.values())
+        total = {"node": "TOTAL", "runs": 0, "latency_s": round(time.time() - self.started, 3)}
+        for key in ("llm_calls", "llm_latency_s", "prompt_tokens", "completion_tokens", "cost_usd",
+                    "scrapes", "scrape_latency_s", "scrape_bytes"):
+            total[key] = sum(r[key] for r in out)
+        return out + [total]
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            events = list(self.events)
+        return {"run_id": self.run_id, "started": self.started, "events": events, "summary": self.summary()}
+
+    def save(self, directory: str = "logs") -> str:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"trace_{self.run_id}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        return path
+
+
+def llm_cost(model: str, prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> float:
+    price_in, price_out = MODEL_PRICES.get(model, (0.0, 0.0))
+    return ((prompt_tokens or 0) * price_in + (completion_tokens or 0) * price_out) / 1_000_000
+
+def start_trace(run_id: Optional[str] = None) -> RunTrace:
+    """Make a new trace current for this context (and the threads it spawns)."""
+    trace = RunTrace(run_id)
+    _trace.set(trace)
+    return trace
+
+def current_trace() -> Optional[RunTrace]:
+    return _trace.get()
+
+def current_node() -> Optional[str]:
+    return _node.get()
+
+def record(kind: str, **fields) -> None:
+    trace = _trace.get()
+    if trace is not None:
+        trace.record(kind, **fields)
+
+@contextmanager
+def node_span(name: str):
+    token = _node.set(name)
+    t0 = time.monotonic()
+    try:
+        yield
+    finally:
+        _node.reset(token)
+        trace = _trace.get()
+        if trace is not None:
+            trace.record("node", name=name, latency_s=round(time.monotonic() - t0, 4))
+
+def traced_node(name: str, fn: Callable) -> Callable:
+    """Wrap a LangGraph node so its latency and the calls it makes are attributed to it."""
+    def wrapper(state):
+        with node_span(name):
+            return fn(state)
+    wrapper.__name__ = getattr(fn, "__name__", name)
+    return wrapper
@@ -0,0 +1,159 @@
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from next_watch_ai.features import FEATURE_DIM, FEATURE_VERSION, encode_fingerprint, taste_similarity
+from next_watch_ai.titles import normalize_title
+
+
+class FingerprintIndex:
+    """
+    Flat float32 nearest-neighbour index over fingerprint vectors, persisted as
+    <path>.f32 (row-major vectors, memory-mapped on load) plus <path>.jsonl (one
+    metadata line per row, after a header line). Rows are keyed like the store's
+    entries, by (title, content_type, fingerprint model); re-inserting one
+    supersedes its old row. A FEATURE_VERSION, fingerprint schema version,
+    LAYOUT or dimension change discards the files and starts over.
+    """
+    LAYOUT = 2  # 2: rows carry the fingerprint model
+
+    def __init__(self, path: str, dim: int = FEATURE_DIM, version: int = FEATURE_VERSION,
+                 schema_version: int = 0):
+        self.path = path
+        self.dim = dim
+        self.version = version
+        self.schema_version = schema_version
+        self._lock = threading.Lock()
+        self._meta: List[Dict[str, str]] = []
+        self._latest: Dict[Tuple[str, str, str], int] = {}
+        self._matrix: Optional[np.ndarray] = None
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._load()
+
+    @property
+    def _vec_path(self) -> str:
+        return self.path + ".f32"
+
+    @property
+    def _meta_path(self) -> str:
+        return self.path + ".jsonl"
+
+    def _load(self) -> None:
+        header = {"version": self.version, "dim": self.dim, "schema_version": self.schema_version,
+                  "layout": self.LAYOUT}
+        meta: List[Dict[str, str]] = []
+        ok = False
+        if os.path.exists(self._meta_path) and os.path.exists(self._vec_path):
+            with open(self._meta_path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+            if lines and json.loads(lines[0]) == header:
+                ok = True
+                for line in lines[1:]:
+                    try:
+                        meta.append(json.loads(line))
+                    except ValueError:
+                        break  # torn write at the end of the file
+        if not ok:
+            with open(self._meta_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps(header) + "\n")
+            open(self._vec_path, "wb").close()
+
+        # rows and metadata can disagree after a crash mid-append; keep the common prefix
+        n = min(len(meta), os.path.getsize(self._vec_path) // (4 * self.dim))
+        if n < len(meta) or os.path.getsize(self._vec_path) != n * 4 * self.dim:
+            with open(self._vec_path, "r+b") as f:
+                f.truncate(n * 4 * self.dim)
+            with open(self._meta_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps(header) + "\n")
+                for m in meta[:n]:
+                    f.write(json.dumps(m, ensure_ascii=False) + "\n")
+        self._meta = meta[:n]
+        self._latest = {(m["key"], m["content_type"], m["model"]): i for i, m in enumerate(self._meta)}
+        self._matrix = None
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+    def _rows(self) -> np.ndarray:
+        if self._matrix is None:
+            n = len(self._meta)
+            self._matrix = (np.memmap(self._vec_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+                            if n else np.zeros((0, self.dim), dtype=np.float32))
+        return self._matrix
+
+    def add(self, title: str, content_type: str, model: str, fingerprint: Dict[str, Any]) -> None:
+        vec = encode_fingerprint(fingerprint).astype(np.float32)
+        meta = {"key": normalize_title(title), "title": title.strip(), "content_type": content_type, "model": model}
+        with self._lock:
+            with open(self._vec_path, "ab") as f:
+                f.write(vec.tobytes())
+            with open(self._meta_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(meta, ensure_ascii=False) + "\n")
+            self._latest[(meta["key"], content_type, model)] = len(self._meta)
+            self._meta.append(meta)
+            self._matrix = None  # remapped on the next search
+
+    def backfill(self, items: Iterable[Tuple[str, str, str, Dict[str, Any]]]) -> int:
+        """Add (title, content_type, model, fingerprint) items not indexed yet; returns how many."""
+        added = 0
+        for title, content_type, model, fp in items:
+            if (normalize_title(title), content_type, model) not in self._latest:
+                self.add(title, content_type, model, fp)
+                added += 1
+        return added
+
+    def search(self, centroid: np.ndarray, weights: np.ndarray, k: int,
+               content_type: str = "both", exclude: Optional[Set[str]] = None,
+               model: Optional[str] = None) -> List[Tuple[str, float]]:
+        """
+        Top-k titles by taste similarity (features.taste_similarity) to the centroid,
+        one vectorized pass over the live rows. content_type "movie"/"tv" keeps rows
+        of that type or "both"; `exclude` holds normalized titles to skip; `model`
+        keeps only fingerprints made by that model (as FingerprintStore lookups do).
+        """
+        with self._lock:
+            rows = sorted(self._latest.values())
+            matrix = self._rows()
+            meta = self._meta
+        if not rows or k <= 0:
+            return []
+        exclude = exclude or set()
+        keep = [i for i in rows
+                if meta[i]["key"] not in exclude
+                and (model is None or meta[i]["model"] == model)
+                and (content_type not in ("movie", "tv") or meta[i]["content_type"] in (content_type, "both"))]
+        if not keep:
+            return []
+        idx = np.asarray(keep)
+        sim = taste_similarity(np.asarray(matrix[idx]), centroid, weights)
+        sim = np.where(np.isnan(sim), -1.0, sim)
+        top = np.argsort(-sim, kind="stable")[:k]
+        out, seen = [], set()
+        for j in top:
+            if sim[j] < 0:
+                break
+            m = meta[idx[j]]
+            if m["key"] not in seen:  # same title indexed under several content types
+                seen.add(m["key"])
+                out.append((m["title"], float(sim[j])))
+        return out
+
+
+_indexes: Dict[str, FingerprintIndex] = {}
+_indexes_lock = threading.Lock()
+
+def open_index(path: str, schema_version: int = 0) -> Optional[FingerprintIndex]:
+    """
+    One index per path per process (it is append-only and shared by every run),
+    holding fingerprints of one schema version.
+    """
+    if not path:
+        return None
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = FingerprintIndex(path, schema_version=schema_version)
+        return _indexes[path]
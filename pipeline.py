@@ -1,46 +1,225 @@
-from typing import Dict, Any, List
-from next_watch_ai.llm import GroqLLM
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional
+from next_watch_ai.concurrency import BoundedLLM, submit_in_context
+from next_watch_ai.routing import make_agent_llms, routes_signature
 from next_watch_ai.firecrawl_utils import make_firecrawl
-from agents.research_agent import research_one
-from agents.fingerprint_agent import fingerprint_one
+from next_watch_ai.fingerprint_store import FingerprintStore
+from next_watch_ai.catalog import load_catalog
+from next_watch_ai.vector_index import open_index
+from next_watch_ai.result_cache import open_run_cache
+from next_watch_ai.replay import open_replay
+from next_watch_ai.tracing import node_span
+from next_watch_ai import deadline
+from agents.research_agent import research_many
+from agents.fingerprint_agent import (
+    fingerprint_one, fingerprint_many, FINGERPRINT_SCHEMA_VERSION, MIN_EVIDENCE_CHARS,
+)
 from agents.taste_agent import taste_profile
-from agents.candidate_agent import propose_candidates
-from agents.curator_agent import curate
-from agents.explanation_agent import explain
+from agents.candidate_agent import gather_candidates
+from agents.curator_agent import curate, fallback_curation, shortlist_candidates
+from agents.explanation_agent import explain, fallback_cards
 
-def run_pipeline(logger, settings, content_type: str, seed_titles: List[str], extra_specs: str) -> Dict[str, Any]:
-    llm = GroqLLM(api_key=settings.groq_api_key, model=settings.groq_model)
-    firecrawl = make_firecrawl(settings.firecrawl_api_key)
+# seconds a skippable step needs; with less left before the run deadline it falls back
+DEADLINE_RESERVE_S = {"curate": 20.0, "explain": 15.0, "critic": 10.0, "controller": 5.0}
 
-    # 1) Research
-    research: Dict[str, str] = {}
-    for t in seed_titles:
-        research[t] = research_one(logger, llm, firecrawl, t, content_type, max_pages=3)
+def make_firecrawl_client(settings):
+    return make_firecrawl(
+        settings.firecrawl_api_key,
+        cache_path=settings.scrape_cache_path,
+        cache_ttl_s=settings.scrape_cache_ttl_hours * 3600,
+        cache_max_bytes=settings.scrape_cache_max_mb * 1024 * 1024,
+        replay=open_replay(settings.replay_mode, settings.replay_path),
+    )
 
-    # 2) Fingerprints
+def make_store(settings, logger=None) -> Optional[FingerprintStore]:
+    # record/replay traces must be self-contained, so they bypass the store
+    if not settings.fingerprint_store_path or settings.replay_mode:
+        return None
+    index = open_index(settings.vector_index_path, FINGERPRINT_SCHEMA_VERSION)
+    store = FingerprintStore(settings.fingerprint_store_path, FINGERPRINT_SCHEMA_VERSION, index=index)
+    if index is not None and not len(index):
+        added = index.backfill(store.items())
+        if added and logger:
+            logger.info(f"[Pipeline] indexed {added} stored fingerprints")
+    return store
+
+def within_deadline(logger, step: str, call: Callable[[], Any], fallback: Callable[[], Any]) -> Any:
+    """
+    call(), unless the run deadline leaves less than DEADLINE_RESERVE_S[step]
+    (or call() fails once it has passed): then fallback().
+    """
+    if deadline.expired(DEADLINE_RESERVE_S[step]):
+        logger.warning(f"[Pipeline] run deadline: skipping {step} ({deadline.remaining():.1f}s left)")
+        return fallback()
+    try:
+        return call()
+    except Exception as e:
+        if not deadline.expired():
+            raise
+        logger.warning(f"[Pipeline] run deadline: {step} failed past the deadline | {type(e).__name__}: {e}")
+        return fallback()
+
+def research_and_fingerprint(logger, settings, llm, firecrawl, store, content_type: str,
+                             titles: List[str], fingerprint_llm=None):
+    """
+    Research + fingerprint titles, reusing stored fingerprints where possible.
+    `llm` generates research URLs; `fingerprint_llm` (default: llm) fingerprints.
+
+    With settings.stream_fingerprints, each title's fingerprint starts as soon as
+    its own research finishes instead of waiting for the slowest title. Research
+    and fingerprint calls share one settings.llm_max_in_flight limit either way.
+    Returns (research, fingerprints), both in the order of `titles`.
+    """
+    fp_llm = fingerprint_llm or llm
+    bounded_llm = BoundedLLM(llm, settings.llm_max_in_flight)
+    bounded_fp_llm = bounded_llm.sharing(fp_llm)
     fingerprints: Dict[str, Any] = {}
-    for t in seed_titles:
-        evidence = research.get(t, "")
-        if evidence and len(evidence) >= 400:
-            fingerprints[t] = fingerprint_one(logger, llm, t, content_type, evidence)
-        else:
+    if store:
+        for t in titles:
+            fp = store.get(t, content_type, fp_llm.model)
+            if fp:
+                fingerprints[t] = fp
+        if fingerprints:
+            logger.info(f"[Pipeline] fingerprint store hits={list(fingerprints)} (research skipped)")
+    todo = [t for t in titles if t not in fingerprints]
+
+    research_kwargs = dict(
+        max_pages=3,
+        max_workers=settings.research_workers,
+        llm_max_in_flight=settings.llm_max_in_flight,
+        scrape_max_in_flight=settings.scrape_max_in_flight,
+        parallel=settings.scrape_parallel,
+        url_timeout=settings.scrape_url_timeout,
+        deadline=settings.scrape_deadline,
+    )
+
+    new_fps: Dict[str, Any] = {}
+    if settings.stream_fingerprints and todo:
+        pending = {}
+
+        with ThreadPoolExecutor(max_workers=max(1, settings.research_workers)) as pool:
+            def on_researched(title: str, evidence: str):
+                if evidence and len(evidence) >= MIN_EVIDENCE_CHARS:
+                    pending[title] = submit_in_context(pool, fingerprint_one, logger, bounded_fp_llm, title,
+                                                       content_type, evidence)
+
+            # 1) Research, 2) Fingerprints (overlapped per title)
+            research = research_many(logger, bounded_llm, firecrawl, todo, content_type,
+                                     on_result=on_researched, **research_kwargs)
+            for t, fut in pending.items():
+                try:
+                    new_fps[t] = fut.result()
+                except Exception as e:
+                    logger.warning(f"[Pipeline] fingerprint failed for {t!r} | {type(e).__name__}: {e}")
+    else:
+        # 1) Research
+        research = research_many(logger, bounded_llm, firecrawl, todo, content_type, **research_kwargs)
+        # 2) Fingerprints
+        new_fps = fingerprint_many(logger, bounded_fp_llm, research, content_type,
+                                   max_workers=settings.research_workers,
+                                   llm_max_in_flight=settings.llm_max_in_flight)
+
+    log_stats = getattr(firecrawl, "log_stats", None)
+    if log_stats:
+        log_stats(logger)
+
+    for t in todo:
+        if new_fps.get(t):
+            fingerprints[t] = new_fps[t]
+            if store:
+                store.put(t, content_type, fp_llm.model, new_fps[t])
+        elif len(research.get(t, "") or "") < MIN_EVIDENCE_CHARS:
             logger.warning(f"[Pipeline] Not enough evidence for fingerprint: {t}")
 
+    return research, {t: fingerprints[t] for t in titles if t in fingerprints}
+
+def warm_fingerprints(logger, settings, content_type: str, titles: List[str]) -> Dict[str, Any]:
+    """
+    Precompute and store fingerprints for a list of titles (e.g. popular seeds).
+    Titles already in the store are skipped.
+    """
+    store = make_store(settings, logger)
+    if store is None:
+        raise RuntimeError("Fingerprint store is disabled (FINGERPRINT_STORE_PATH empty or REPLAY_MODE set); nothing to warm.")
+    llms = make_agent_llms(settings, logger)
+    _, fingerprints = research_and_fingerprint(
+        logger, settings, llms["research"], make_firecrawl_client(settings), store, content_type, titles,
+        fingerprint_llm=llms["fingerprint"],
+    )
+    logger.info(f"[Pipeline] warmed {len(fingerprints)}/{len(titles)} fingerprints")
+    return fingerprints
+
+def run_pipeline(logger, settings, content_type: str, seed_titles: List[str], extra_specs: str,
+                 llm=None, firecrawl=None) -> Dict[str, Any]:
+    """
+    Full run without LangGraph. Repeated inputs are served from the run cache,
+    in which case only RESULT_FIELDS (taste, candidates, curated, cards) are returned.
+    The run is bounded by settings.run_deadline_s (see within_deadline).
+    """
+    llms = make_agent_llms(settings, logger, llm)
+
+    def compute():
+        with deadline.run_deadline(settings.run_deadline_s):
+            return _run_pipeline(logger, settings, content_type, seed_titles, extra_specs, llms, firecrawl)
+
+    run_cache = open_run_cache(settings, logger)
+    if run_cache is None:
+        return compute()
+    key = run_cache.key(seed_titles, content_type, extra_specs, llm.model if llm else routes_signature(settings),
+                        catalog=load_catalog(settings.catalog_path, logger))
+    result, _ = run_cache.get_or_run(key, compute)
+    return result
+
+def _run_pipeline(logger, settings, content_type: str, seed_titles: List[str], extra_specs: str,
+                  llms: Dict[str, Any], firecrawl=None) -> Dict[str, Any]:
+    firecrawl = firecrawl or make_firecrawl_client(settings)
+    store = make_store(settings, logger)
+
+    # 1) Research + 2) Fingerprints
+    with node_span("research"):
+        research, fingerprints = research_and_fingerprint(
+            logger, settings, llms["research"], firecrawl, store, content_type, seed_titles,
+            fingerprint_llm=llms["fingerprint"],
+        )
+
+    return {"research": research, "fingerprints": fingerprints,
+            **recommend(logger, settings, llms, store, content_type, seed_titles, extra_specs, fingerprints)}
+
+def recommend(logger, settings, llms: Dict[str, Any], store, content_type: str, seed_titles: List[str],
+              extra_specs: str, fingerprints: Dict[str, Any]) -> Dict[str, Any]:
+    """Stages 3-6 (taste, candidates, curate, explain) for seeds that are already fingerprinted."""
     # 3) Taste profile (uses fingerprints + user extra specs)
-    taste = taste_profile(logger, llm, fingerprints, content_type, extra_specs)
+    with node_span("taste"):
+        taste = taste_profile(logger, llms["taste"], fingerprints, content_type, extra_specs)
 
     # 4) Candidate pool (Groq-only)
-    candidates = propose_candidates(logger, llm, taste, seed_titles, content_type, extra_specs, n=30)
+    catalog = load_catalog(settings.catalog_path, logger)
+    with node_span("candidates"):
+        candidates = gather_candidates(logger, llms["candidates"], taste, seed_titles, content_type, extra_specs, fingerprints,
+                                       index=store.index if store else None,
+                                       catalog=catalog, source=settings.candidate_source, n=30,
+                                       fingerprint_model=llms["fingerprint"].model)
 
     # 5) Curate 5 (no ranking)
-    curated = curate(logger, llm, taste, candidates, seed_titles, content_type, extra_specs)
+    with node_span("curate"):
+        shortlist = shortlist_candidates(logger, candidates, fingerprints, store=store, model=llms["fingerprint"].model,
+                                         k=settings.curate_shortlist, catalog=catalog,
+                                         seed_titles=seed_titles, content_type=content_type)
+        curated = within_deadline(
+            logger, "curate",
+            lambda: curate(logger, llms["curator"], taste, shortlist, seed_titles, content_type, extra_specs),
+            lambda: fallback_curation(logger, shortlist),
+        )
 
     # 6) Explain
-    cards = explain(logger, llm, taste, curated, content_type, extra_specs)
+    with node_span("explain"):
+        cards = within_deadline(
+            logger, "explain",
+            lambda: explain(logger, llms["explain"], taste, curated, content_type, extra_specs),
+            lambda: fallback_cards(logger, curated),
+        )
 
     return {
-        "research": research,
-        "fingerprints": fingerprints,
         "taste": taste,
         "candidates": candidates,
         "curated": curated,
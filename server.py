@@ -0,0 +1,269 @@
+"""
+Long-running service mode: the graph is compiled once, and its Groq/Firecrawl
+clients, caches, fingerprint store and checkpointer are shared by every session.
+
+    python -m cli serve --port 8765     # HTTP
+    python -m cli serve --stdin         # JSONL requests on stdin, JSONL responses on stdout
+
+Requests:
+    {"op": "recommend", "content_type": "movie", "seed_titles": [...], "extra_specs": "", "session_id": "..."?}
+    {"op": "ask", "session_id": "...", "question": "..."}
+Over HTTP these are POST /recommend and POST /ask (op implied); GET /health returns counters.
+
+At most max_sessions runs execute at once and max_queue more wait. Beyond that,
+HTTP requests are turned away with 503 + Retry-After, while the stdin reader
+blocks until a slot frees up.
+"""
+import contextvars
+import json
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List
+
+from next_watch_ai.checkpoints import make_checkpointer
+from next_watch_ai.deadline import run_deadline
+from next_watch_ai.schemas import parse_stats
+from next_watch_ai.tracing import node_span, start_trace
+from agents.input_agent import normalize_content_type
+from agents.controller_agent import controller
+from graph import build_graph, invoke_cached, revise
+
+
+class Overloaded(Exception):
+    """Admission control turned the request away; retry later."""
+
+
+class BadRequest(ValueError):
+    pass
+
+
+class UnknownSession(LookupError):
+    pass
+
+
+class Service:
+    def __init__(self, logger, settings, llm=None, firecrawl=None, max_sessions: int = 8, max_queue: int = 32):
+        self.logger = logger
+        self.settings = settings
+        self.graph, self.qa_llm = build_graph(logger, settings, llm=llm, firecrawl=firecrawl,
+                                              checkpointer=make_checkpointer(settings.checkpoint_path, logger))
+        self.pool = ThreadPoolExecutor(max_workers=max(1, max_sessions), thread_name_prefix="session")
+        self._slots = threading.BoundedSemaphore(max(1, max_sessions) + max(0, max_queue))
+        self._session_locks: Dict[str, List[Any]] = {}  # session id -> [lock, holders + waiters]
+        self._lock = threading.Lock()
+        self.counters = {"admitted": 0, "rejected": 0, "completed": 0, "failed": 0, "in_system": 0}
+        self.started = time.time()
+
+    # ---- admission -------------------------------------------------------------
+
+    def submit(self, request: Dict[str, Any], block: bool = False) -> Future:
+        """Queue one request. Raises Overloaded when full, unless block=True (then waits for a slot)."""
+        op = request.get("op")
+        handler = {"recommend": self.recommend, "ask": self.ask}.get(op)
+        if handler is None:
+            raise BadRequest(f"unknown op {op!r} (expected 'recommend' or 'ask')")
+        if not self._slots.acquire(blocking=block):
+            self._count("rejected")
+            raise Overloaded(f"{self.counters['in_system']} requests in the system")
+        self._count("admitted")
+        self._count("in_system")
+        # a fresh context per request, so traces/deadlines never leak between sessions on a pooled thread
+        fut = self.pool.submit(contextvars.Context().run, self._run, handler, request)
+        fut.add_done_callback(self._release)
+        return fut
+
+    def _run(self, handler: Callable[[Dict[str, Any]], Dict[str, Any]], request: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            out = handler(request)
+        except Exception:
+            self._count("failed")
+            raise
+        self._count("completed")
+        return out
+
+    def _release(self, _fut: Future) -> None:
+        self._count("in_system", -1)
+        self._slots.release()
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += n
+
+    @contextmanager
+    def _session(self, session_id: str) -> Iterator[None]:
+        # requests for one session run one at a time; different sessions run concurrently.
+        # A session's lock is dropped once nobody holds or waits on it, so the map stays small.
+        with self._lock:
+            entry = self._session_locks.setdefault(session_id, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._session_locks[session_id]
+
+    def health(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        return {"uptime_s": round(time.time() - self.started, 1), **counters, "json_parse": parse_stats()}
+
+    # ---- operations (run on the session pool) ------------------------------------
+
+    def recommend(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        seeds = [str(t).strip() for t in req.get("seed_titles") or [] if str(t).strip()]
+        if not seeds:
+            raise BadRequest("seed_titles must be a non-empty list")
+        session_id = str(req.get("session_id") or uuid.uuid4().hex[:12])
+        state = {
+            "content_type": normalize_content_type(req.get("content_type", "both")),
+            "seed_titles": seeds,
+            "extra_specs": str(req.get("extra_specs", "") or "").strip(),
+            "iterations": 0,
+            "max_iters": 2,
+        }
+        trace = start_trace(session_id)
+        self.logger.info(f"[Server] recommend session={session_id} seeds={seeds}")
+        with self._session(session_id):
+            result = invoke_cached(self.logger, self.settings, self.graph, state,
+                                   {"configurable": {"thread_id": session_id}})
+        return self._response(session_id, result, trace)
+
+    def ask(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        session_id = str(req.get("session_id") or "")
+        question = str(req.get("question") or "").strip()
+        if not session_id or not question:
+            raise BadRequest("ask needs session_id and question")
+        config = {"configurable": {"thread_id": session_id}}
+        trace = start_trace(session_id)
+        with self._session(session_id):
+            state = self.graph.get_state(config).values
+            if not state.get("cards"):
+                raise UnknownSession(f"no finished session {session_id!r}")
+            with node_span("qa"):
+                ctl = controller(self.logger, self.qa_llm, {**state, "user_question": question})
+            action = ctl.get("action", "answer_question")
+            if action in ("revise_candidates", "revise_curation"):
+                with run_deadline(self.settings.run_deadline_s):
+                    state = revise(self.graph, config, action)
+        out = self._response(session_id, state, trace)
+        out.update(answer=ctl.get("message_to_user", ""), action=action)
+        return out
+
+    def _response(self, session_id: str, result: Dict[str, Any], trace) -> Dict[str, Any]:
+        total = trace.summary()[-1]
+        return {
+            "session_id": session_id,
+            "taste": result.get("taste", {}),
+            "cards": (result.get("cards", {}) or {}).get("cards", []),
+            "partial": bool((result.get("cards", {}) or {}).get("partial")),
+            "latency_s": total["latency_s"],
+            "llm_calls": total["llm_calls"],
+        }
+
+
+def _handler(service: Service, request_timeout: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/health":
+                return self._send(200, service.health())
+            self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            op = self.path.strip("/")
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                if length < 0:
+                    raise BadRequest("negative Content-Length")
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if not isinstance(body, dict):
+                    raise BadRequest("request body must be a JSON object")
+            except ValueError as e:
+                # bad Content-Length, non-UTF-8 or invalid JSON (BadRequest is one too); an
+                # unread body would be parsed as the next request, so the connection closes
+                self.close_connection = True
+                return self._send(400, {"error": str(e)})
+            try:
+                result = service.submit({**body, "op": op}).result(timeout=request_timeout)
+            except Overloaded as e:
+                return self._send(503, {"error": f"overloaded: {e}"}, {"Retry-After": "1"})
+            except BadRequest as e:
+                return self._send(400, {"error": str(e)})
+            except UnknownSession as e:
+                return self._send(404, {"error": str(e)})
+            except Exception as e:
+                service.logger.exception(f"[Server] {op} failed")
+                return self._send(500, {"error": f"{type(e).__name__}: {e}"})
+            self._send(200, result)
+
+        def _send(self, status: int, payload: Dict[str, Any], headers: Dict[str, str] = None):
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, fmt, *args):
+            service.logger.debug(f"[Server] {self.address_string()} {fmt % args}")
+
+    return Handler
+
+
+def make_http_server(service: Service, host: str = "127.0.0.1", port: int = 8765,
+                     request_timeout: float = 600.0) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), _handler(service, request_timeout))
+    server.daemon_threads = True
+    return server
+
+
+def serve_jsonl(service: Service, infile=None, outfile=None) -> None:
+    """
+    One JSON request per input line; one response line per request, in completion
+    order, echoing the request's "id". Reading blocks while the service is full.
+    """
+    infile = infile or sys.stdin
+    outfile = outfile or sys.stdout
+    write_lock = threading.Lock()
+    pending = []
+
+    def write(obj: Dict[str, Any]) -> None:
+        with write_lock:
+            outfile.write(json.dumps(obj, ensure_ascii=False) + "\n")
+            outfile.flush()
+
+    def done(req_id, written: threading.Event, fut: Future) -> None:
+        try:
+            write({"id": req_id, "ok": True, **fut.result()})
+        except Exception as e:
+            write({"id": req_id, "ok": False, "error": f"{type(e).__name__}: {e}"})
+        finally:
+            written.set()
+
+    for n, line in enumerate(infile, start=1):
+        if not line.strip():
+            continue
+        req_id = n
+        try:
+            req = json.loads(line)
+            req_id = req.get("id", n)
+            fut = service.submit(req, block=True)
+        except Exception as e:
+            write({"id": req_id, "ok": False, "error": f"{type(e).__name__}: {e}"})
+            continue
+        written = threading.Event()
+        fut.add_done_callback(lambda f, req_id=req_id, written=written: done(req_id, written, f))
+        pending.append(written)
+    for written in pending:
+        written.wait()  # every response is out before returning
@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from next_watch_ai.json_repair import parse_repaired, repair_json
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": 1, "b": [1, 2,],}', {"a": 1, "b": [1, 2]}),
+    ('{"a": 1 "b": 2}', {"a": 1, "b": 2}),
+    ('{a: 1, b: hello}', {"a": 1, "b": "hello"}),
+    ("{'a': 'it\\'s', 'b': 'say \"hi\"'}", {"a": "it's", "b": 'say "hi"'}),
+    ('{“a”: “x”, ‘b’: ‘y’}', {"a": "x", "b": "y"}),
+    ('{"a": True, "b": None, "c": False, "d": undefined}', {"a": True, "b": None, "c": False, "d": None}),
+    ('{"a": 1, // note\n "b": /* inline */ 2}', {"a": 1, "b": 2}),
+    ('{"a": [1, 2}, "b": 3]', {"a": [1, 2], "b": 3}),
+    ('{"a": 1,, "b": 2}', {"a": 1, "b": 2}),
+    ('Here you go:\n```json\n{"a": 1,}\n```', {"a": 1}),
+])
+def test_repairs_common_mistakes(text, expected):
+    assert parse_repaired(text) == expected
+
+
+def test_valid_json_is_unchanged():
+    text = '{"a": [1, {"b": "c"}], "d": null}'
+    assert json.loads(repair_json(text)) == json.loads(text)
+
+
+@pytest.mark.parametrize("text, expected", [
+    # cut back to the last complete value, then the open containers are closed
+    ('{"a": 1, "b": [1, 2', {"a": 1, "b": [1]}),
+    ('{"a": 1, "b": "unterminated', {"a": 1}),
+    ('{"a": 1, "b": {"c": 2, "d"', {"a": 1, "b": {"c": 2}}),
+    ('{"a": [], "b": [1', {"a": []}),
+    # a nested container cut before its first complete value is dropped, not closed empty
+    ('{"a": [1, 2, {"c": 3', {"a": [1, 2]}),
+    ('{"a": 1, "b": {', {"a": 1}),
+    ('{"a": 1, "b": [[', {"a": 1}),
+    ('{"a": [1', {}),
+    ('{', {}),
+])
+def test_truncation(text, expected):
+    assert parse_repaired(text) == expected
+
+
+def test_no_object_raises():
+    with pytest.raises(ValueError, match="No JSON object"):
+        repair_json("no json at all")
@@ -0,0 +1,125 @@
+import json
+
+import pytest
+
+from next_watch_ai.json_stream import JSONStream, JSONStreamError, parse_first
+
+DOC = ('{"cards": [{"title": "Aftersun", "year": 2022, "score": -1.5e2, "ok": true},'
+       ' {"title": "Caf\\u00e9 \\"Noir\\"\\n", "tags": [], "note": null}], "empty": {}}')
+
+
+def stream_values(chunks, **kwargs):
+    stream = JSONStream(**kwargs)
+    for chunk in chunks:
+        stream.feed(chunk)
+    stream.close()
+    return stream.values
+
+
+def test_whole_document_matches_json():
+    assert stream_values([DOC]) == [json.loads(DOC)]
+
+
+def test_every_two_way_split():
+    expected = json.loads(DOC)
+    for cut in range(1, len(DOC)):
+        assert stream_values([DOC[:cut], DOC[cut:]]) == [expected], cut
+
+
+def test_one_character_chunks():
+    assert stream_values(list(DOC)) == [json.loads(DOC)]
+
+
+@pytest.mark.parametrize("text, expected", [
+    (r'{"a": "quote \" inside"}', 'quote " inside'),
+    (r'{"a": "back\\slash"}', "back\\slash"),
+    (r'{"a": "tab\tnew\nline"}', "tab\tnew\nline"),
+    (r'{"a": "été"}', "été"),
+    (r'{"a": "🎬"}', "🎬"),
+])
+def test_escapes_split_anywhere(text, expected):
+    for cut in range(1, len(text)):
+        assert stream_values([text[:cut], text[cut:]]) == [{"a": expected}], cut
+
+
+def test_bad_escape_raises():
+    with pytest.raises(JSONStreamError, match="Bad string escape"):
+        stream_values([r'{"a": "\q"}'])
+
+
+def test_smart_quotes_delimit_strings():
+    assert stream_values(['{“title”: “Aftersun”}']) == [{"title": "Aftersun"}]
+
+
+def test_plain_quote_inside_smart_quoted_string_is_text():
+    text = '{“title”: “the "Twin Peaks" pilot”}'
+    for cut in range(1, len(text)):
+        assert stream_values([text[:cut], text[cut:]]) == [{"title": 'the "Twin Peaks" pilot'}], cut
+
+
+def test_smart_quotes_inside_plain_string_are_text():
+    assert stream_values(['{"title": "the “pilot” episode"}']) == [{"title": "the “pilot” episode"}]
+
+
+def test_prose_and_fences_around_value_are_skipped():
+    text = 'Sure! Here it is:\n```json\n{"a": [1, 2]}\n```\nHope that helps {not json'
+    assert stream_values([text], first_only=True) == [{"a": [1, 2]}]
+
+
+def test_first_only_ignores_trailing_garbage():
+    stream = JSONStream(first_only=True)
+    stream.feed('{"a": 1} ]]} trailing {"b": ')
+    stream.close()
+    assert stream.done and stream.values == [{"a": 1}]
+
+
+def test_several_top_level_values():
+    assert stream_values(['{"a": 1} and [2, 3] then {"b": {}}']) == [{"a": 1}, [2, 3], {"b": {}}]
+
+
+def test_on_item_reports_paths():
+    seen = []
+    stream = JSONStream(on_item=lambda path, value: seen.append((path, value)))
+    stream.feed('{"cards": [{"t": 1}, {"t": 2}], "x": [[7]]}')
+    assert seen == [(("cards", 0), {"t": 1}), (("cards", 1), {"t": 2}), (("x", 0, 0), 7), (("x", 0), [7])]
+
+
+@pytest.mark.parametrize("text, what", [
+    ('{"a": [1, 2', "array"),
+    ('{"a": {"b": 1', "object"),
+    ('{"a": "unterminated', "string"),
+])
+def test_truncation_raises_on_close(text, what):
+    stream = JSONStream()
+    stream.feed(text)
+    with pytest.raises(JSONStreamError, match=f"unterminated {what}"):
+        stream.close()
+
+
+def test_error_offset_line_and_column():
+    with pytest.raises(JSONStreamError) as err:
+        stream_values(['{"a": 1,\n  "b" 2}'])
+    assert (err.value.offset, err.value.line, err.value.column) == (15, 2, 7)
+
+
+def test_parse_first_skips_trailing_garbage():
+    assert parse_first('{"a": {"b": [1]}} }} garbage') == {"a": {"b": [1]}}
+
+
+def test_parse_first_repairs_smart_quotes():
+    assert parse_first('Answer: {“a”: “x "y" z”}') == {"a": 'x "y" z'}
+
+
+def test_parse_first_skips_a_malformed_object_whole():
+    # the nested {"b": 1} must not be returned in place of the broken outer object
+    assert parse_first('{"a": {"b": 1} oops} then {"c": 2}') == {"c": 2}
+
+
+def test_parse_first_raises_on_truncation():
+    with pytest.raises(JSONStreamError, match="Truncated"):
+        parse_first('{"a": {"b": 1}, "c": [1, 2')
+
+
+def test_parse_first_without_a_value():
+    with pytest.raises(ValueError, match="No JSON value"):
+        parse_first("no json here")
@@ -0,0 +1,97 @@
+import logging
+
+import pytest
+
+from next_watch_ai.schemas import (
+    ControllerDecision, CriticReport, Curation, Fingerprint, TasteProfile, chat_json, parse_output, parse_stats,
+)
+
+log = logging.getLogger("tests")
+
+
+class ScriptedLLM:
+    """Answers chat() with the next scripted response and records what it was asked."""
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def chat(self, prompt, temperature=0.2):
+        self.calls.append((prompt, temperature))
+        return self.responses.pop(0)
+
+
+def counts(agent):
+    return parse_stats()[agent]
+
+
+def test_ok_path():
+    llm = ScriptedLLM('{"action": "accept", "rationale": "fine"}')
+    data = chat_json(log, llm, "PROMPT", ControllerDecision, "t-ok", "SCHEMA")
+    assert data["action"] == "accept" and data["message_to_user"] == ""
+    assert len(llm.calls) == 1
+    assert counts("t-ok") == {"ok": 1, "repaired": 0, "reprompted": 0, "failed": 0}
+
+
+def test_repaired_path_needs_no_reprompt():
+    llm = ScriptedLLM('Sure: {recommendations: [{title: "Aftersun", year: 2022,},], }')
+    data = chat_json(log, llm, "PROMPT", Curation, "t-repaired", "SCHEMA")
+    assert data["recommendations"][0]["title"] == "Aftersun"
+    assert data["recommendations"][0]["year"] == "2022"
+    assert len(llm.calls) == 1
+    assert counts("t-repaired") == {"ok": 0, "repaired": 1, "reprompted": 0, "failed": 0}
+
+
+def test_reprompted_path_asks_once_at_temperature_zero():
+    llm = ScriptedLLM("I recommend you accept.", '{"action": "accept"}')
+    data = chat_json(log, llm, "PROMPT", ControllerDecision, "t-reprompted", "SCHEMA-HINT")
+    assert data["action"] == "accept"
+    assert len(llm.calls) == 2
+    prompt, temperature = llm.calls[1]
+    assert temperature == 0.0
+    assert "SCHEMA-HINT" in prompt and "I recommend you accept." in prompt
+    assert counts("t-reprompted") == {"ok": 0, "repaired": 0, "reprompted": 1, "failed": 0}
+
+
+def test_failed_path_raises_after_one_reprompt():
+    llm = ScriptedLLM("no json", "still no json")
+    with pytest.raises(ValueError):
+        chat_json(log, llm, "PROMPT", ControllerDecision, "t-failed", "SCHEMA")
+    assert len(llm.calls) == 2
+    assert counts("t-failed") == {"ok": 0, "repaired": 0, "reprompted": 0, "failed": 1}
+
+
+def test_already_received_output_is_not_requested_again():
+    llm = ScriptedLLM()
+    data = chat_json(log, llm, "PROMPT", ControllerDecision, "t-out", "SCHEMA",
+                     out='{"action": "revise curation"}')
+    assert data["action"] == "revise_curation" and not llm.calls
+
+
+def test_truncated_nested_value_does_not_validate_as_made_up_data():
+    # the cut-off object must be dropped, not closed as an empty {} that coerces to "{}"
+    data, path = parse_output('{"taste_summary": "quiet", "core_signals": ["slow burn", {"signal": "gri', TasteProfile)
+    assert path == "repaired"
+    assert data["core_signals"] == ["slow burn"]
+
+
+@pytest.mark.parametrize("schema, payload", [
+    (Fingerprint, "{}"),
+    (Fingerprint, '{"confidence": {"overall": 0.9}}'),
+    (TasteProfile, '{"avoid_signals": ["gore"]}'),
+    (CriticReport, '{"suggested_prompt_patch": ""}'),
+    (ControllerDecision, '{"action": "dance"}'),
+    (Curation, '{"recommendations": []}'),
+])
+def test_empty_payloads_are_rejected(schema, payload):
+    with pytest.raises(ValueError):
+        parse_output(payload, schema)
+
+
+def test_coercions():
+    data, _ = parse_output('{"narrative_architecture": {"pacing": "Slow", "ending_type": "open"},'
+                           ' "style_tone": {"realism_vs_stylized": "80%"},'
+                           ' "themes_subtext": {"primary_themes": "grief"}}', Fingerprint)
+    assert data["narrative_architecture"]["pacing"] == "slow"
+    assert data["narrative_architecture"]["ending_type"] is None
+    assert data["style_tone"]["realism_vs_stylized"] == pytest.approx(0.8)
+    assert data["themes_subtext"]["primary_themes"] == ["grief"]